@@ -0,0 +1,265 @@
+import glob
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from double_fonts.Coverage import Coverage
+from double_fonts.DoubleFont import DoubleFont
+from double_fonts.Font import Font
+from double_fonts.FontCatalog import FontCatalog
+from double_fonts.FontWriter import FontWriter
+from double_fonts.StackLayout import StackLayout
+from double_fonts.SuperimposeLayout import SuperimposeLayout
+
+# The axes at the end of variable fonts' file names, e.g.
+# NotoSans-VariableFont_wdth,wght.ttf or NotoSans[wdth,wght].ttf, which are
+# not part of the fonts' names.
+VARIABLE_FONT_SUFFIX = re.compile(r'(-VariableFont_.*|\[.*\])$')
+
+LAYOUTS = {
+    'stack': StackLayout,
+    'superimpose': SuperimposeLayout,
+}
+
+
+class BatchBuilder:
+    # Builds every double font described by a manifest, e.g.
+    #
+    # {
+    #     "output_dir": "build",
+    #     "builds": [
+    #         {
+    #             "font1": "fonts/Noto_Sans/static/NotoSans-*.ttf",
+    #             "font2": "Noto Sans Sinhala",
+    #             "layout": "stack",
+    #             "layout_params": {"vertical_spacing_ratio": 0.1},
+    #             "char_map": {"k": 3482},
+    #             "coverage": {"unicode_ranges": [[32, 126]], "text": "..."},
+    #             "output_name": "{font1}-{font2}.ttf",
+    #             "formats": ["ttf", "woff2"]
+    #         }
+    #     ]
+    # }
+    #
+    # font1 and font2 are paths, glob patterns or catalog names, and each
+    # entry builds every (font1, font2) combination. An entry can layer
+    # extra_fonts over font2 too, e.g. ["Noto Sans Tamil"], with a list per
+    # char map value, and can have a list of layouts instead of a layout,
+    #
+    #             "layouts": [
+    #                 {"layout": "stack", "layout_params": {...}},
+    #                 {"layout": "superimpose", "output_name": "..."}
+    #             ]
+    #
+    # which are all built from one decode of the fonts. Output names can
+    # have {font3}, etc. for extra fonts, and {layout}, which is in the
+    # default name if there are several layouts. Builds that share a
+    # font1 run together in the same worker, so each worker parses that
+    # font once, and other fonts are shared through the catalog's LRU.
+    # With a coverage, the fonts are subset to it, and to the char map,
+    # before each build. With formats, each output is written in each
+    # format, and is compressed while the worker composes the next one.
+    def __init__(self, manifest: dict):
+        self.manifest = manifest
+        self.output_dir = manifest.get('output_dir', 'build')
+
+    @staticmethod
+    def from_file(manifest_path: str) -> 'BatchBuilder':
+        if manifest_path.endswith('.toml'):
+            import tomllib
+
+            with open(manifest_path, 'rb') as fin:
+                return BatchBuilder(tomllib.load(fin))
+        with open(manifest_path) as fin:
+            return BatchBuilder(json.load(fin))
+
+    @staticmethod
+    def expand_font_paths(font: str) -> list:
+        if glob.has_magic(font):
+            return sorted(glob.glob(font))
+        if os.path.exists(font):
+            return [font]
+        return [FontCatalog.default().find(font)['path']]
+
+    @staticmethod
+    def get_font_name(font_path: str) -> str:
+        return VARIABLE_FONT_SUFFIX.sub(
+            '', os.path.splitext(os.path.basename(font_path))[0]
+        )
+
+    @staticmethod
+    def get_font(font: str) -> Font:
+        # A path, or a catalog name.
+        if os.path.exists(font):
+            return Font(name=BatchBuilder.get_font_name(font), path=font)
+        return Font(name=font)
+
+    @staticmethod
+    def get_default_output_name(n_fonts: int, n_layouts: int) -> str:
+        # e.g. '{font1}-{font2}.ttf'.
+        names = [f'{{font{i + 1}}}' for i in range(n_fonts)]
+        if n_layouts > 1:
+            names.append('{layout}')
+        return '-'.join(names) + '.ttf'
+
+    def get_builds(self) -> list:
+        builds = []
+        for entry in self.manifest['builds']:
+            layouts = entry.get('layouts') or [
+                dict(
+                    layout=entry.get('layout', 'superimpose'),
+                    layout_params=entry.get('layout_params', {}),
+                    output_name=entry.get('output_name'),
+                )
+            ]
+            fonts = [entry['font1'], entry['font2']] + entry.get(
+                'extra_fonts', []
+            )
+            default_output_name = BatchBuilder.get_default_output_name(
+                len(fonts), len(layouts)
+            )
+            for font_paths in itertools.product(
+                *[BatchBuilder.expand_font_paths(font) for font in fonts]
+            ):
+                names = {
+                    f'font{i + 1}': BatchBuilder.get_font_name(font_path)
+                    for i, font_path in enumerate(font_paths)
+                }
+                build_layouts = []
+                for layout in layouts:
+                    layout_name = layout.get('layout', 'superimpose')
+                    output_name = (
+                        layout.get('output_name') or default_output_name
+                    )
+                    build_layouts.append(
+                        dict(
+                            layout=layout_name,
+                            layout_params=layout.get('layout_params', {}),
+                            output_path=os.path.join(
+                                self.output_dir,
+                                output_name.format(layout=layout_name, **names),
+                            ),
+                        )
+                    )
+                builds.append(
+                    dict(
+                        font_path1=font_paths[0],
+                        font_path2=font_paths[1],
+                        extra_font_paths=list(font_paths[2:]),
+                        layouts=build_layouts,
+                        char_map=entry.get('char_map'),
+                        family_name=entry.get('family_name'),
+                        composite=entry.get('composite', False),
+                        remove_overlaps=entry.get('remove_overlaps', False),
+                        coverage=entry.get('coverage'),
+                        formats=entry.get('formats'),
+                    )
+                )
+        return builds
+
+    @staticmethod
+    def run_build(build: dict, writer: FontWriter = None) -> list:
+        # A result for each of the build's layouts, with the time of the
+        # whole build. With a writer, the outputs are written in its pool,
+        # and the results have no size until they are.
+        t_start = time.perf_counter()
+        font1, font2, *extra_fonts = [
+            Font(name=BatchBuilder.get_font_name(font_path), path=font_path)
+            for font_path in [build['font_path1'], build['font_path2']]
+            + build['extra_font_paths']
+        ]
+        layouts = {
+            layout['output_path']: LAYOUTS[layout['layout']](
+                **layout['layout_params']
+            )
+            for layout in build['layouts']
+        }
+        coverage = (
+            Coverage(**build['coverage']) if build['coverage'] else None
+        )
+        for output_path in layouts:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        all_stats = DoubleFont(
+            font1,
+            font2,
+            char_map=build['char_map'],
+            family_name=build['family_name'],
+            composite=build['composite'],
+            extra_fonts=extra_fonts,
+            remove_overlaps=build['remove_overlaps'],
+        ).build_layouts(
+            layouts,
+            coverage=coverage,
+            formats=build['formats'],
+            writer=writer,
+        )
+        build_time = time.perf_counter() - t_start
+        return [
+            dict(
+                output_path=layout['output_path'],
+                output_paths=FontWriter.get_output_paths(
+                    layout['output_path'], build['formats']
+                ),
+                font_path1=build['font_path1'],
+                font_path2=build['font_path2'],
+                extra_font_paths=build['extra_font_paths'],
+                layout=layout['layout'],
+                time=build_time,
+                stats=all_stats[layout['output_path']],
+            )
+            for layout in build['layouts']
+        ]
+
+    @staticmethod
+    def run_build_group(builds: list) -> list:
+        with FontWriter() as writer:
+            results = [
+                result
+                for build in builds
+                for result in BatchBuilder.run_build(build, writer)
+            ]
+        for result in results:
+            result['size'] = sum(
+                os.path.getsize(output_path)
+                for output_path in result['output_paths']
+            )
+        return results
+
+    def get_build_groups(self) -> list:
+        groups = {}
+        for build in self.get_builds():
+            groups.setdefault(build['font_path1'], []).append(build)
+        return list(groups.values())
+
+    def run(self, jobs: int = None) -> dict:
+        t_start = time.perf_counter()
+        groups = self.get_build_groups()
+        jobs = jobs or os.cpu_count()
+        results = []
+        if jobs <= 1:
+            for group in groups:
+                results.extend(BatchBuilder.run_build_group(group))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = [
+                    executor.submit(BatchBuilder.run_build_group, group)
+                    for group in groups
+                ]
+                for future in as_completed(futures):
+                    results.extend(future.result())
+        results.sort(key=lambda result: result['output_path'])
+
+        report = dict(
+            jobs=jobs,
+            n_builds=len(results),
+            total_time=time.perf_counter() - t_start,
+            total_size=sum(result['size'] for result in results),
+            builds=results,
+        )
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, 'report.json'), 'w') as fout:
+            json.dump(report, fout, indent=2)
+        return report
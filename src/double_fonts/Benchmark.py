@@ -0,0 +1,390 @@
+import json
+import multiprocessing
+import os
+import platform
+import string
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fontTools
+import numpy as np
+
+from double_fonts.BatchBuilder import LAYOUTS
+from double_fonts.BuildProfiler import BuildProfiler
+from double_fonts.DoubleFont import DoubleFont
+from double_fonts.Font import Font
+from double_fonts.FontCatalog import FontCatalog
+from double_fonts.SyntheticFont import FIRST_CODEPOINT, SyntheticFont
+
+DEFAULT_SYNTHETIC_SIZES = [10_000, 20_000, 40_000, 60_000]
+# The glyphs of the synthetic secondary font of stack_large_secondary.
+LARGE_SECONDARY_SIZE = 60_000
+
+# As in testing_examples/stack_english_sinhala, for both cases.
+ENGLISH_SINHALA_CHAR_MAP = {
+    c: sinhala_c
+    for letter, sinhala_c in zip(
+        'bcdfghjklmnpqrstvwxyz', 'බචදෆගහජකලමනපකරසතවවකයස'
+    )
+    for c in [letter, letter.upper()]
+}
+
+# The letters, vowel signs and digits of testing_examples/stack_sinhala_tamil.
+TAMIL_SINHALA_CHAR_MAP = dict(
+    zip(
+        'கஙசஜஞடணதநனபமயரறலளழவஶஷஸஹஅஆஇஈஉஊஎஏஐஒஓஔாிீுூெேைொோௌஃ்௧௨௩௪௫௬௭௮௯',
+        'කඞචජඤටණතනනපමයරරලළලවශෂසහඅආඉඊඋඌඑඒඓඔඕඖාිීුූෙේෛොෝෞඃ්෧෨෩෪෫෬෭෮෯',
+    )
+)
+
+
+class Benchmark:
+    # Times full builds of each composition mode, over the bundled fonts and
+    # over synthetic fonts of increasing size, for scaling curves. Cases with
+    # layouts build an output for each, in one pass.
+    #
+    # Each build runs in a fresh process, so that its peak RSS is its own,
+    # and the fastest of its repeats is kept. Results are saved as JSON,
+    # with the environment, so that runs can be compared.
+    #
+    # Each build is then rebuilt incrementally in its process, which
+    # should recompose no glyphs, and is timed too.
+    #
+    # Sources are memory mapped. With compare_memory_map, each case is also
+    # built with them read into memory, and the reductions in peak RSS, and
+    # in private RSS at the end of the build, are reported. Mapping only
+    # saves memory when most of a large source is never read, as in
+    # stack_large_secondary. Builds that read most glyphs of their sources,
+    # as the other cases do, gain nothing from it.
+    def __init__(
+        self,
+        output_dir: str = os.path.join('build', 'benchmarks'),
+        synthetic_sizes: list = None,
+        repeats: int = 1,
+        jobs: int = 1,
+        compare_memory_map: bool = False,
+    ):
+        self.output_dir = output_dir
+        self.synthetic_sizes = (
+            DEFAULT_SYNTHETIC_SIZES
+            if synthetic_sizes is None
+            else synthetic_sizes
+        )
+        self.repeats = repeats
+        self.jobs = jobs
+        self.compare_memory_map = compare_memory_map
+
+    def get_cases(self, names: list = None) -> list:
+        # The cases with the given names, or all of them. Synthetic fonts are
+        # generated on first use, and kept in the output directory.
+        noto_sans_dir = os.path.join('fonts', 'Noto_Sans', 'static')
+        bhashitha_sans = os.path.join('fonts', 'Bhashitha-Sans.ttf')
+        noto_sans_tamil = os.path.join(
+            'fonts', 'Noto_Sans_Tamil', 'static', 'NotoSansTamil-Regular.ttf'
+        )
+        noto_sans_sinhala = os.path.join(
+            'fonts',
+            'Noto_Sans_Sinhala',
+            'static',
+            'NotoSansSinhala-Regular.ttf',
+        )
+        cases = [
+            dict(
+                name='superimpose',
+                font_path1=os.path.join(noto_sans_dir, 'NotoSans-Medium.ttf'),
+                font_path2=os.path.join(
+                    'fonts', 'Sevillana', 'Sevillana-Regular.ttf'
+                ),
+                layout='superimpose',
+            ),
+            dict(
+                name='stack_and_superimpose',
+                font_path1=os.path.join(noto_sans_dir, 'NotoSans-Medium.ttf'),
+                font_path2=os.path.join(
+                    'fonts', 'Sevillana', 'Sevillana-Regular.ttf'
+                ),
+                layouts=dict(stack={}, superimpose={}),
+            ),
+            dict(
+                name='superimpose_tamil_sinhala_stacked',
+                font_path1='TamilSinhalaStackedFont.ttf',
+                font_path2=noto_sans_tamil,
+                layout='superimpose',
+            ),
+            dict(
+                name='stack_english_sinhala',
+                font_path1=bhashitha_sans,
+                font_path2=bhashitha_sans,
+                layout='stack',
+                layout_params=dict(vertical_spacing_ratio=0.1),
+                char_map=ENGLISH_SINHALA_CHAR_MAP,
+            ),
+            dict(
+                name='stack_tamil_sinhala',
+                font_path1=noto_sans_tamil,
+                font_path2=noto_sans_sinhala,
+                layout='stack',
+                layout_params=dict(
+                    vertical_spacing_ratio=0.0,
+                    secondary_scale=0.7,
+                    center=True,
+                ),
+                char_map=TAMIL_SINHALA_CHAR_MAP,
+            ),
+            dict(
+                name='stack_unicode_offset',
+                font_path1=bhashitha_sans,
+                font_path2=bhashitha_sans,
+                layout='stack',
+                layout_params=dict(vertical_spacing_ratio=0.1),
+                offset=3450,
+            ),
+        ]
+        font_dir = os.path.join(self.output_dir, 'fonts')
+        # A Latin font over a few glyphs of a large font, as over a CJK
+        # font.
+        if not names or 'stack_large_secondary' in names:
+            cases.append(
+                dict(
+                    name='stack_large_secondary',
+                    font_path1=os.path.join(
+                        noto_sans_dir, 'NotoSans-Medium.ttf'
+                    ),
+                    font_path2=SyntheticFont(
+                        LARGE_SECONDARY_SIZE, 1
+                    ).get_path(font_dir),
+                    layout='stack',
+                    char_map={
+                        c: chr(FIRST_CODEPOINT + i)
+                        for i, c in enumerate(string.ascii_letters)
+                    },
+                )
+            )
+        for n_glyphs in self.synthetic_sizes:
+            name = f'stack_synthetic_{n_glyphs}'
+            if names and name not in names:
+                continue
+            cases.append(
+                dict(
+                    name=name,
+                    font_path1=SyntheticFont(n_glyphs, 0).get_path(font_dir),
+                    font_path2=SyntheticFont(n_glyphs, 1).get_path(font_dir),
+                    layout='stack',
+                )
+            )
+        return [case for case in cases if not names or case['name'] in names]
+
+    @staticmethod
+    def get_offset_char_map(font: Font, offset: int) -> dict:
+        # As in testing_examples/stack_unicode_ranges.
+        cmap = font.cmap
+        return {cp: cp + offset for cp in cmap if cp + offset in cmap}
+
+    @staticmethod
+    def get_peak_rss() -> int:
+        # In bytes, or None where neither is available (e.g. Windows). On
+        # Linux, ru_maxrss keeps the parent's peak across exec, so VmHWM,
+        # which starts afresh, is read instead.
+        if os.path.exists('/proc/self/status'):
+            with open('/proc/self/status') as fin:
+                for line in fin:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) * 1024
+        try:
+            import resource
+        except ImportError:
+            return None
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+    @staticmethod
+    def get_rss_breakdown() -> dict:
+        # Current RSS, in bytes, as private memory and memory mapped files,
+        # which processes share. Empty where not available.
+        names = dict(RssAnon='rss_anon', RssFile='rss_file')
+        rss_breakdown = {}
+        if os.path.exists('/proc/self/status'):
+            with open('/proc/self/status') as fin:
+                for line in fin:
+                    name = line.split(':')[0]
+                    if name in names:
+                        rss_breakdown[names[name]] = (
+                            int(line.split()[1]) * 1024
+                        )
+        return rss_breakdown
+
+    @staticmethod
+    def run_case(
+        case: dict, output_path: str, jobs: int, memory_map: bool = True
+    ) -> dict:
+        catalog = FontCatalog(memory_map=memory_map)
+        font1 = Font(
+            os.path.basename(case['font_path1']),
+            path=case['font_path1'],
+            catalog=catalog,
+        )
+        font2 = Font(
+            os.path.basename(case['font_path2']),
+            path=case['font_path2'],
+            catalog=catalog,
+        )
+        char_map = case.get('char_map')
+        if 'offset' in case:
+            char_map = Benchmark.get_offset_char_map(font1, case['offset'])
+        if 'layouts' in case:
+            root, ext = os.path.splitext(output_path)
+            layouts = {
+                f'{root}-{name}{ext}': LAYOUTS[name](**layout_params)
+                for name, layout_params in case['layouts'].items()
+            }
+        else:
+            layouts = {
+                output_path: LAYOUTS[case['layout']](
+                    **case.get('layout_params', {})
+                )
+            }
+
+        profiler = BuildProfiler()
+        t_start = time.perf_counter()
+        double_font = DoubleFont(font1, font2, char_map=char_map)
+        all_stats = double_font.build_layouts(
+            layouts, jobs=jobs, incremental=False, profiler=profiler
+        )
+        dt = time.perf_counter() - t_start
+        n_glyphs = sum(stats['n_glyphs'] for stats in all_stats.values())
+        peak_rss = Benchmark.get_peak_rss()
+        rss_breakdown = Benchmark.get_rss_breakdown()
+        size = sum(os.path.getsize(path) for path in layouts)
+
+        # The same build again, incrementally, in the same process, over
+        # the same fonts, whose glyphs the first build has expanded. Every
+        # glyph should be reused.
+        t_start = time.perf_counter()
+        rebuild_stats = double_font.build_layouts(layouts, jobs=jobs)
+        rebuild_dt = time.perf_counter() - t_start
+        return dict(
+            time=dt,
+            n_glyphs=n_glyphs,
+            glyphs_per_s=n_glyphs / dt,
+            peak_rss=peak_rss,
+            **rss_breakdown,
+            size=size,
+            stats=all_stats.get(output_path, all_stats),
+            stage_times=profiler.get_stage_times(),
+            rebuild_time=rebuild_dt,
+            n_recomposed_glyphs=sum(
+                stats['n_glyphs'] for stats in rebuild_stats.values()
+            ),
+        )
+
+    def run_case_in_new_process(
+        self, case: dict, memory_map: bool = True
+    ) -> dict:
+        output_path = os.path.join(
+            self.output_dir, 'outputs', case['name'] + '.ttf'
+        )
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            return executor.submit(
+                Benchmark.run_case, case, output_path, self.jobs, memory_map
+            ).result()
+
+    @staticmethod
+    def get_git_revision() -> str:
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def get_environment(self) -> dict:
+        return dict(
+            git_revision=Benchmark.get_git_revision(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpu_count=os.cpu_count(),
+            fonttools=fontTools.version,
+            numpy=np.__version__,
+            jobs=self.jobs,
+            repeats=self.repeats,
+        )
+
+    def run(self, names: list = None) -> dict:
+        # Runs the cases with the given names, or all of them. Returns the
+        # report, which is also saved to report['path'].
+        results = []
+        for case in self.get_cases(names):
+            runs = [
+                self.run_case_in_new_process(case)
+                for _ in range(self.repeats)
+            ]
+            result = min(runs, key=lambda run: run['time'])
+            result['peak_rss'] = max(
+                (run['peak_rss'] for run in runs if run['peak_rss']),
+                default=None,
+            )
+            if self.compare_memory_map:
+                unmapped_runs = [
+                    self.run_case_in_new_process(case, memory_map=False)
+                    for _ in range(self.repeats)
+                ]
+                result['unmapped_peak_rss'] = max(
+                    (run['peak_rss'] for run in unmapped_runs),
+                    default=None,
+                )
+                result['unmapped_rss_anon'] = unmapped_runs[0].get('rss_anon')
+                for name in ['peak_rss', 'rss_anon']:
+                    if result.get(name) and result[f'unmapped_{name}']:
+                        result[f'{name}_reduction'] = (
+                            1 - result[name] / result[f'unmapped_{name}']
+                        )
+            results.append(
+                dict(
+                    name=case['name'],
+                    font_path1=case['font_path1'],
+                    font_path2=case['font_path2'],
+                    times=[run['time'] for run in runs],
+                    **result,
+                )
+            )
+
+        path = os.path.join(
+            self.output_dir,
+            'benchmark-' + time.strftime('%Y%m%d-%H%M%S') + '.json',
+        )
+        report = dict(
+            path=path,
+            time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+            environment=self.get_environment(),
+            results=results,
+        )
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(path, 'w') as fout:
+            json.dump(report, fout, indent=2)
+        return report
+
+    @staticmethod
+    def compare(report: dict, previous_report: dict) -> list:
+        # (name, time, previous time, speedup) of cases in both reports.
+        previous_times = {
+            result['name']: result['time']
+            for result in previous_report['results']
+        }
+        return [
+            (
+                result['name'],
+                result['time'],
+                previous_times[result['name']],
+                previous_times[result['name']] / result['time'],
+            )
+            for result in report['results']
+            if result['name'] in previous_times
+        ]
@@ -0,0 +1,195 @@
+import numpy as np
+from fontTools.cffLib import maxStackLimit
+from fontTools.cffLib.specializer import commandsToProgram, specializeCommands
+from fontTools.misc.psCharStrings import T2CharString
+
+from double_fonts.CharStringOutline import N_POINTS
+from double_fonts.GlyphEngine import GlyphEngine
+from double_fonts.Layout import Layout
+from double_fonts.TransformCache import TransformCache
+
+# CFF's operand stack limit. CFF2's is maxStackLimit.
+CFF_MAX_STACK = 48
+
+
+class CharStringEngine(GlyphEngine):
+    # Composes the double glyphs of CFF or CFF2 fonts from CharStringOutlines
+    # into charstring programs, rather than into glyf data.
+    #
+    # Points are placed and rounded in the same batched pass as glyf points
+    # are. Each double glyph's program is then made of the relative moves
+    # between its placed points, which the specializer packs back into the
+    # shortest operators, e.g. hlineto, so that no pen is involved.
+    #
+    # The primary glyph's own program, with its hints and subroutine calls,
+    # is kept as it is when the layout leaves it where it is, e.g. when
+    # superimposed, so that the output keeps calling the font's subroutines.
+    # Other layers are inlined, since a subroutine can only be called as it
+    # is. Inlined layers have no hints, as glyf double glyphs have no
+    # instructions.
+    def __init__(
+        self,
+        layout: Layout,
+        transform_cache: TransformCache = None,
+        is_cff2: bool = False,
+    ):
+        super().__init__(layout, transform_cache)
+        self.is_cff2 = is_cff2
+        self.n_kept_programs = 0
+
+    def get_worker_engine(self) -> 'CharStringEngine':
+        return CharStringEngine(
+            self.layout, self.get_worker_cache(), self.is_cff2
+        )
+
+    @staticmethod
+    def get_vsindex(group: tuple) -> int:
+        # The vsindex of the group's blends, or None if none of its layers
+        # blend.
+        vsindexes = set(
+            outline.vsindex
+            for outline in group
+            if outline.region_deltas is not None
+        )
+        if not vsindexes:
+            return None
+        if len(vsindexes) > 1:
+            raise ValueError('Layers blend with different variation data')
+        return vsindexes.pop()
+
+    @staticmethod
+    def get_region_deltas(group: tuple, transforms: list, kept: bool):
+        # The placed region deltas of the group's points, or None if none
+        # of its layers blend.
+        if CharStringEngine.get_vsindex(group) is None:
+            return None
+        n_regions = next(
+            outline.region_deltas.shape[2]
+            for outline in group
+            if outline.region_deltas is not None
+        )
+        layer_deltas = []
+        for i, (outline, transform) in enumerate(zip(group, transforms)):
+            if outline.region_deltas is None:
+                layer_deltas.append(
+                    np.zeros((outline.n_points, 2, n_regions))
+                )
+            elif i == 0 and kept:
+                layer_deltas.append(outline.region_deltas)
+            else:
+                layer_deltas.append(
+                    np.floor(outline.region_deltas * transform.scale + 0.5)
+                )
+        return np.concatenate(layer_deltas)
+
+    @staticmethod
+    def get_values(deltas: np.ndarray) -> list:
+        # Whole values as ints, which encode shorter than fixed values.
+        if np.array_equal(deltas, np.floor(deltas)):
+            return deltas.astype(np.int64).ravel().tolist()
+        return [
+            int(value) if value.is_integer() else value
+            for value in deltas.ravel().tolist()
+        ]
+
+    def compose_glyph(
+        self, group: tuple, transforms: list, layer_coordinates: list
+    ) -> tuple:
+        # A kept program sets the vsindex of its own blends, if any.
+        vsindex = CharStringEngine.get_vsindex(group)
+        kept = (
+            group[0].program is not None
+            and transforms[0].is_identity()
+            and vsindex in (None, group[0].vsindex)
+        )
+        if kept:
+            layer_coordinates = [group[0].coordinates] + layer_coordinates[1:]
+            self.n_kept_programs += 1
+        coordinates = np.concatenate(layer_coordinates)
+        bounds = tuple(
+            np.concatenate(
+                [coordinates.min(axis=0), coordinates.max(axis=0)]
+            ).tolist()
+        )
+
+        # Each point relative to the one before, across layers too, so that
+        # each layer's first move starts from where the layer before ended.
+        values = CharStringEngine.get_values(
+            np.diff(coordinates, axis=0, prepend=np.zeros((1, 2)))
+        )
+        region_deltas = CharStringEngine.get_region_deltas(
+            group, transforms, kept
+        )
+        if region_deltas is not None:
+            n_regions = region_deltas.shape[2]
+            region_values = CharStringEngine.get_values(
+                np.diff(
+                    region_deltas, axis=0, prepend=np.zeros((1, 2, n_regions))
+                )
+            )
+            # Blended values are [default, *deltas, 1].
+            values = [
+                [value, *deltas, 1] if any(deltas) else value
+                for value, deltas in zip(
+                    values, zip(*[iter(region_values)] * n_regions)
+                )
+            ]
+
+        commands = []
+        start = 2 * group[0].n_points if kept else 0
+        for outline in group[1:] if kept else group:
+            for operator in outline.operators:
+                end = start + 2 * N_POINTS[operator]
+                commands.append((operator, values[start:end]))
+                start = end
+
+        program = []
+        if kept:
+            program.extend(group[0].program)
+        elif vsindex:
+            program.extend([vsindex, 'vsindex'])
+        max_stack = maxStackLimit if self.is_cff2 else CFF_MAX_STACK
+        program.extend(
+            commandsToProgram(
+                specializeCommands(
+                    commands, generalizeFirst=False, maxstack=max_stack
+                )
+            )
+        )
+        if not self.is_cff2:
+            program.append('endchar')
+        charstring = T2CharString(program=program)
+        charstring.compile(self.is_cff2)
+        return (charstring.bytecode, bounds, None)
+
+    def compose_glyphs(self, groups: list, keys: list = None) -> list:
+        # Each double glyph compiled to charstring data, with its bounds.
+        # CFF data has no width yet, since that follows from the metrics.
+        if not groups:
+            return []
+        layers = [outline for group in groups for outline in group]
+        transforms = self.get_transforms(groups)
+        keys = keys or [(None,) * len(group) for group in groups]
+        layer_keys = [key for group_keys in keys for key in group_keys]
+        layer_coordinates = self.transform_layers(
+            layers, transforms, layer_keys
+        )
+        glyphs = []
+        start = 0
+        for group in groups:
+            end = start + len(group)
+            glyphs.append(
+                self.compose_glyph(
+                    group, transforms[start:end], layer_coordinates[start:end]
+                )
+            )
+            start = end
+        return glyphs
+
+    def get_stats(self) -> dict:
+        # Workers' kept programs are in the workers' stats.
+        stats = super().get_stats()
+        stats['n_kept_programs'] = (
+            stats.get('n_kept_programs', 0) + self.n_kept_programs
+        )
+        return stats
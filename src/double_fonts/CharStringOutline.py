@@ -0,0 +1,297 @@
+import numpy as np
+from fontTools.cffLib.specializer import generalizeCommands, programToCommands
+from fontTools.misc.psCharStrings import T2CharString, calcSubrBias
+from fontTools.ttLib import TTFont
+
+CFF_TAGS = ['CFF ', 'CFF2']
+HINT_OPERATORS = {
+    'cntrmask',
+    'hintmask',
+    'hstem',
+    'hstemhm',
+    'vstem',
+    'vstemhm',
+}
+# The first of these in a CFF charstring can have the glyph's width as an
+# extra first argument.
+WIDTH_OPERATORS = HINT_OPERATORS | {'endchar', 'hmoveto', 'rmoveto', 'vmoveto'}
+CALL_OPERATORS = {'callgsubr', 'callsubr'}
+N_POINTS = {'rmoveto': 1, 'rlineto': 1, 'rrcurveto': 3}
+
+
+class CharStringOutline:
+    # A CFF or CFF2 glyph's outline, read from its charstring program, with
+    # its subroutines inlined, as path commands that each draw a point, or
+    # a curve's three points, relative to the point before: rmoveto, rlineto
+    # and rrcurveto. The points are held as one NumPy array of absolute
+    # coordinates, like an Outline's, so that outlines are transformed in
+    # batches, by GlyphEngine, and only turned back into relative commands
+    # once they are placed.
+    #
+    # For CFF2, region_deltas are the blend deltas of each point, for each
+    # region of the glyph's vsindex, as absolute deltas too.
+    #
+    # program is the glyph's own program, with its hints and its calls to
+    # the font's subroutines, but without its width and its endchar, for
+    # double glyphs that keep the glyph where it is, or None if the width
+    # is set in a subroutine.
+    def __init__(
+        self,
+        operators: list,
+        coordinates: np.ndarray,
+        region_deltas: np.ndarray = None,
+        vsindex: int = 0,
+        program: list = None,
+    ):
+        self.operators = operators
+        self.coordinates = coordinates
+        self.region_deltas = region_deltas
+        self.vsindex = vsindex
+        self.program = program
+
+    @staticmethod
+    def get_table_tag(ttfont: TTFont) -> str:
+        # 'CFF ' or 'CFF2', or None for TrueType fonts.
+        for tag in CFF_TAGS:
+            if tag in ttfont:
+                return tag
+        return None
+
+    @staticmethod
+    def get_charstrings(ttfont: TTFont):
+        cff = ttfont[CharStringOutline.get_table_tag(ttfont)].cff
+        return cff.topDictIndex[0].CharStrings
+
+    @staticmethod
+    def get_privates(ttfont: TTFont) -> list:
+        # The font's private dicts, one per font dict of CID-keyed fonts.
+        tag = CharStringOutline.get_table_tag(ttfont)
+        top_dict = ttfont[tag].cff.topDictIndex[0]
+        if hasattr(top_dict, 'FDArray'):
+            return [font_dict.Private for font_dict in top_dict.FDArray]
+        return [top_dict.Private]
+
+    @staticmethod
+    def get_data(charstring: T2CharString) -> bytes:
+        if charstring.bytecode is None:
+            charstring.compile()
+        return charstring.bytecode
+
+    @staticmethod
+    def get_shared_datas(ttfont: TTFont) -> list:
+        # What every glyph's charstring depends on besides itself: the
+        # subroutines it can call, the widths its width is relative to,
+        # and, for CFF2, the variation regions of its blends.
+        tag = CharStringOutline.get_table_tag(ttfont)
+        cff = ttfont[tag].cff
+        datas = [
+            CharStringOutline.get_data(subr) for subr in cff.GlobalSubrs
+        ]
+        for private in CharStringOutline.get_privates(ttfont):
+            datas.append(
+                f"{getattr(private, 'defaultWidthX', 0)}"
+                + f"/{getattr(private, 'nominalWidthX', 0)}"
+            )
+            datas.extend(
+                CharStringOutline.get_data(subr)
+                for subr in getattr(private, 'Subrs', [])
+            )
+        var_store = getattr(cff.topDictIndex[0], 'VarStore', None)
+        if var_store is not None:
+            var_store.compile()
+            datas.append(var_store.data)
+        return datas
+
+    @staticmethod
+    def flatten(
+        program: list, local_subrs, global_subrs, tokens: list
+    ) -> bool:
+        # Appends program's tokens to tokens, with its subroutine calls
+        # replaced by the subroutines' tokens. Returns whether the program
+        # ended the glyph.
+        for token in program:
+            if token == 'callsubr':
+                subr = local_subrs[tokens.pop() + calcSubrBias(local_subrs)]
+            elif token == 'callgsubr':
+                subr = global_subrs[tokens.pop() + calcSubrBias(global_subrs)]
+            elif token == 'return':
+                return False
+            else:
+                tokens.append(token)
+                if token == 'endchar':
+                    return True
+                continue
+            if CharStringOutline.flatten(
+                subr.program, local_subrs, global_subrs, tokens
+            ):
+                return True
+        return False
+
+    @staticmethod
+    def get_own_program(
+        program: list, local_subrs, global_subrs, is_cff2: bool
+    ) -> list:
+        # The glyph's program without its width, or its endchar, inlining
+        # the subroutine that ends the glyph, if any.
+        if is_cff2:
+            return list(program)
+        n_args = 0
+        for i, token in enumerate(program):
+            if not isinstance(token, str):
+                n_args += 1
+                continue
+            if token in CALL_OPERATORS:
+                return None
+            if token in WIDTH_OPERATORS:
+                if (n_args % 2 == 1) ^ (token in ('hmoveto', 'vmoveto')):
+                    program = program[: i - n_args] + program[i - n_args + 1 :]
+                break
+            n_args = 0
+        return CharStringOutline.get_program_without_end(
+            program, local_subrs, global_subrs
+        )
+
+    @staticmethod
+    def get_program_without_end(
+        program: list, local_subrs, global_subrs
+    ) -> list:
+        if program[-1] == 'endchar':
+            if len(program) > 1 and not isinstance(program[-2], str):
+                # An accented glyph, made with seac.
+                return None
+            return program[:-1]
+        if program[-1] not in CALL_OPERATORS:
+            return None
+        subrs = local_subrs if program[-1] == 'callsubr' else global_subrs
+        subr = subrs[program[-2] + calcSubrBias(subrs)]
+        subr_program = CharStringOutline.get_program_without_end(
+            subr.program, local_subrs, global_subrs
+        )
+        if subr_program is None:
+            return None
+        return program[:-2] + subr_program
+
+    @staticmethod
+    def get_flex_commands(operator: str, args: list) -> list:
+        # The two curves of a flex, whose depth is left to the rasterizer.
+        if operator == 'flex':
+            return [('rrcurveto', args[:6]), ('rrcurveto', args[6:12])]
+        if operator == 'hflex':
+            dx1, dx2, dy2, dx3, dx4, dx5, dx6 = args
+            return [
+                ('rrcurveto', [dx1, 0, dx2, dy2, dx3, 0]),
+                ('rrcurveto', [dx4, 0, dx5, -dy2, dx6, 0]),
+            ]
+        if operator == 'hflex1':
+            dx1, dy1, dx2, dy2, dx3, dx4, dx5, dy5, dx6 = args
+            return [
+                ('rrcurveto', [dx1, dy1, dx2, dy2, dx3, 0]),
+                ('rrcurveto', [dx4, 0, dx5, dy5, dx6, -(dy1 + dy2 + dy5)]),
+            ]
+        # flex1's last argument is dx or dy, whichever is the larger.
+        dx = sum(args[0:10:2])
+        dy = sum(args[1:10:2])
+        if abs(dx) > abs(dy):
+            last = [args[10], -dy]
+        else:
+            last = [-dx, args[10]]
+        return [('rrcurveto', args[:6]), ('rrcurveto', args[6:10] + last)]
+
+    @staticmethod
+    def get_path_commands(commands: list) -> tuple:
+        # The path commands of a charstring's commands, generalized, and
+        # its vsindex.
+        vsindex = 0
+        path_commands = []
+        for operator, args in commands:
+            # Unnamed commands are the width, implicit stems and hint masks.
+            if not operator or operator in HINT_OPERATORS:
+                continue
+            if operator == 'vsindex':
+                vsindex = args[0]
+            elif operator == 'endchar':
+                if args:
+                    raise ValueError(
+                        'Accented glyphs made with seac are not supported'
+                    )
+            elif operator in ('flex', 'flex1', 'hflex', 'hflex1'):
+                if any(isinstance(arg, list) for arg in args):
+                    raise ValueError('Blended flex is not supported')
+                path_commands.extend(
+                    CharStringOutline.get_flex_commands(operator, args)
+                )
+            else:
+                path_commands.append((operator, args))
+        path_commands = generalizeCommands(path_commands)
+        for operator, _ in path_commands:
+            if operator not in N_POINTS:
+                raise ValueError(f'Unsupported operator: {operator}')
+        return path_commands, vsindex
+
+    @staticmethod
+    def from_charstring(
+        charstring: T2CharString, is_cff2: bool
+    ) -> 'CharStringOutline':
+        charstring.decompile()
+        private = charstring.private
+        local_subrs = getattr(private, 'Subrs', [])
+        global_subrs = charstring.globalSubrs
+        tokens = []
+        CharStringOutline.flatten(
+            charstring.program, local_subrs, global_subrs, tokens
+        )
+        path_commands, vsindex = CharStringOutline.get_path_commands(
+            programToCommands(
+                tokens, private.getNumRegions if is_cff2 else None
+            )
+        )
+
+        operators, values = [], []
+        for operator, args in path_commands:
+            operators.append(operator)
+            values.extend(args)
+        coordinates = np.cumsum(
+            np.array(
+                [
+                    value[0] if isinstance(value, list) else value
+                    for value in values
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 2),
+            axis=0,
+        )
+        region_deltas = None
+        blends = [value for value in values if isinstance(value, list)]
+        if blends:
+            # Blended values are [default, *deltas, 1].
+            n_regions = len(blends[0]) - 2
+            deltas = np.zeros((len(values), n_regions))
+            for i, value in enumerate(values):
+                if isinstance(value, list):
+                    deltas[i] = value[1:-1]
+            region_deltas = np.cumsum(
+                deltas.reshape(-1, 2, n_regions), axis=0
+            )
+        return CharStringOutline(
+            operators,
+            coordinates,
+            region_deltas,
+            vsindex,
+            CharStringOutline.get_own_program(
+                charstring.program, local_subrs, global_subrs, is_cff2
+            ),
+        )
+
+    @property
+    def n_points(self) -> int:
+        return len(self.coordinates)
+
+    def is_empty(self) -> bool:
+        return self.n_points == 0
+
+    def get_bounds(self) -> tuple:
+        # The bounds of all of the points, off-curve points too, as glyf
+        # bounds are.
+        x_min, y_min = self.coordinates.min(axis=0)
+        x_max, y_max = self.coordinates.max(axis=0)
+        return (x_min, y_min, x_max, y_max)
@@ -0,0 +1,131 @@
+import weakref
+
+from fontTools.ttLib import TTFont
+
+# Features that shapers always apply, whose ligatures stand for clusters:
+# composition, conjuncts and other Indic forms, and required ligatures.
+CLUSTER_FEATURES = {
+    'abvf',
+    'abvs',
+    'akhn',
+    'blwf',
+    'blws',
+    'ccmp',
+    'cjct',
+    'clig',
+    'half',
+    'haln',
+    'liga',
+    'locl',
+    'nukt',
+    'pref',
+    'pres',
+    'pstf',
+    'psts',
+    'rkrf',
+    'rlig',
+    'rphf',
+    'vatu',
+}
+LIGATURE_LOOKUP_TYPE = 4
+EXTENSION_LOOKUP_TYPE = 7
+
+
+class ClusterIndex:
+    # Maps clusters of characters to the glyphs that a font's GSUB ligates
+    # them into, e.g. Tamil 'கு' to its ku ligature, and 'ஸ்ரீ' to the
+    # ligature of its ligatures.
+    #
+    # Each ligature glyph is decomposed, once, into the characters of its
+    # components, recursively, so that clusters are looked up in constant
+    # time. Contextual substitutions are not followed. Indexes are kept
+    # with their TTFont, so that builds over a font share its index.
+    _indexes = weakref.WeakKeyDictionary()
+
+    def __init__(self, clusters: dict):
+        self.clusters = clusters
+
+    @staticmethod
+    def get_ligatures(ttfont: TTFont) -> dict:
+        # The component sequences of each ligature glyph, in the order of
+        # its lookups.
+        if 'GSUB' not in ttfont:
+            return {}
+        gsub = ttfont['GSUB'].table
+        if not gsub.FeatureList or not gsub.LookupList:
+            return {}
+        lookup_indices = sorted(
+            set(
+                lookup_index
+                for feature_record in gsub.FeatureList.FeatureRecord
+                if feature_record.FeatureTag in CLUSTER_FEATURES
+                for lookup_index in feature_record.Feature.LookupListIndex
+            )
+        )
+        ligatures = {}
+        for lookup_index in lookup_indices:
+            for subtable in gsub.LookupList.Lookup[lookup_index].SubTable:
+                if subtable.LookupType == EXTENSION_LOOKUP_TYPE:
+                    subtable = subtable.ExtSubTable
+                if subtable.LookupType != LIGATURE_LOOKUP_TYPE:
+                    continue
+                for first, ligature_set in subtable.ligatures.items():
+                    for ligature in ligature_set:
+                        ligatures.setdefault(ligature.LigGlyph, []).append(
+                            [first] + ligature.Component
+                        )
+        return ligatures
+
+    @staticmethod
+    def from_ttfont(ttfont: TTFont) -> 'ClusterIndex':
+        chars = {}
+        for codepoint, glyph_name in sorted(ttfont.getBestCmap().items()):
+            chars.setdefault(glyph_name, []).append(chr(codepoint))
+        ligatures = ClusterIndex.get_ligatures(ttfont)
+
+        decompositions = {}
+
+        def decompose(glyph_name: str, visiting: set) -> list:
+            # The clusters that form the glyph, for each of its characters.
+            if glyph_name in chars:
+                return chars[glyph_name]
+            if glyph_name in decompositions:
+                return decompositions[glyph_name]
+            if glyph_name in visiting:
+                return []
+            visiting.add(glyph_name)
+            clusters = []
+            for components in ligatures.get(glyph_name, []):
+                component_clusters = ['']
+                for component in components:
+                    component_clusters = [
+                        cluster + component_cluster
+                        for cluster in component_clusters
+                        for component_cluster in decompose(
+                            component, visiting
+                        )
+                    ]
+                clusters.extend(component_clusters)
+            visiting.discard(glyph_name)
+            decompositions[glyph_name] = clusters
+            return clusters
+
+        # The first ligature of a cluster, in lookup order, wins, as it
+        # would in shaping.
+        clusters = {}
+        for glyph_name in ligatures:
+            for cluster in decompose(glyph_name, set()):
+                clusters.setdefault(cluster, glyph_name)
+        return ClusterIndex(clusters)
+
+    @staticmethod
+    def get(ttfont: TTFont) -> 'ClusterIndex':
+        if ttfont not in ClusterIndex._indexes:
+            ClusterIndex._indexes[ttfont] = ClusterIndex.from_ttfont(ttfont)
+        return ClusterIndex._indexes[ttfont]
+
+    def get_glyph_name(self, cluster: str) -> str:
+        return self.clusters.get(cluster)
+
+    def __len__(self) -> int:
+        return len(self.clusters)
@@ -0,0 +1,177 @@
+from fontTools.misc.fixedTools import floatToFixedToFloat, otRound
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import (
+    ROUND_XY_TO_GRID,
+    Glyph,
+    GlyphComponent,
+)
+
+from double_fonts.OutputFont import OutputFont
+from double_fonts.Transform import Transform
+from double_fonts.TransformCache import TransformCache
+
+
+class CompositeBuilder:
+    # Builds double glyphs as composites of two component references, instead
+    # of copying the points of both glyphs.
+    #
+    # The primary glyph's outline moves to a new glyph named '<name>.primary',
+    # since the double glyph takes over its name, as do composites that
+    # reference a primary glyph. Secondary glyphs from another font are
+    # imported once, as '<name>.secondary', along with the glyphs they
+    # reference. Secondary glyphs from the same font are referenced the same
+    # way as the primary glyph's components.
+    PRIMARY_SUFFIX = '.primary'
+    SECONDARY_SUFFIX = '.secondary'
+
+    def __init__(
+        self,
+        output_font: OutputFont,
+        ttfont1: TTFont,
+        ttfont2: TTFont,
+        primary_glyph_names: set,
+        same_font: bool = False,
+    ):
+        self.output_font = output_font
+        self.ttfont1 = ttfont1
+        self.ttfont2 = ttfont2
+        self.primary_glyph_names = primary_glyph_names
+        self.same_font = same_font
+        # Components by (glyph name, Transform), for this build only, since
+        # the names depend on which glyphs are primary.
+        self.transform_cache = TransformCache()
+        self.imported_glyph_names = set()
+        self.references_primary_cache = {}
+
+    @staticmethod
+    def quantize(transform: Transform) -> Transform:
+        # Components store their scale as F2Dot14, and their offset as whole
+        # font units (with ROUND_XY_TO_GRID set).
+        return Transform(
+            scale=floatToFixedToFloat(transform.scale, 14),
+            dx=otRound(transform.dx),
+            dy=otRound(transform.dy),
+        )
+
+    @staticmethod
+    def transform_bounds(bounds: tuple, transform: Transform) -> tuple:
+        x_min, y_min, x_max, y_max = bounds
+        s = transform.scale
+        return (
+            otRound(x_min * s + transform.dx),
+            otRound(y_min * s + transform.dy),
+            otRound(x_max * s + transform.dx),
+            otRound(y_max * s + transform.dy),
+        )
+
+    def get_component(self, glyph_name: str, transform: Transform):
+        # Placements that recur share a single component.
+        key = (glyph_name, transform)
+        component = self.transform_cache.get(key)
+        if component is None:
+            component = CompositeBuilder.make_component(glyph_name, transform)
+            self.transform_cache.put(key, component)
+        return component
+
+    @staticmethod
+    def make_component(glyph_name: str, transform: Transform):
+        component = GlyphComponent()
+        component.glyphName = glyph_name
+        component.x, component.y = transform.dx, transform.dy
+        component.flags = ROUND_XY_TO_GRID
+        if transform.scale != 1:
+            s = transform.scale
+            component.transform = [[s, 0], [0, s]]
+        return component
+
+    def import_glyph(
+        self,
+        ttfont: TTFont,
+        glyph_name: str,
+        new_glyph_name: str,
+        get_component_name,
+    ) -> str:
+        if new_glyph_name in self.imported_glyph_names:
+            return new_glyph_name
+        self.imported_glyph_names.add(new_glyph_name)
+
+        glyf = ttfont['glyf']
+        new_glyph = glyf.glyphs[glyph_name]
+        if new_glyph.isComposite():
+            # A private copy, so that its components can be renamed. Other
+            # glyphs are shared with the source, as the output's are.
+            new_glyph = OutputFont.copy_glyph(glyf, glyph_name)
+            for component in new_glyph.components:
+                component.glyphName = get_component_name(component.glyphName)
+
+        self.output_font.add_glyph(
+            new_glyph_name, new_glyph, ttfont['hmtx'][glyph_name]
+        )
+        return new_glyph_name
+
+    def references_primary(self, glyph_name: str) -> bool:
+        # Whether the source glyph is, or references, a primary glyph, and so
+        # would change if it were referenced by its own name.
+        if glyph_name not in self.references_primary_cache:
+            self.references_primary_cache[glyph_name] = (
+                glyph_name in self.primary_glyph_names
+                or any(
+                    self.references_primary(component_name)
+                    for component_name in OutputFont.get_component_names(
+                        self.ttfont1['glyf'], glyph_name
+                    )
+                )
+            )
+        return self.references_primary_cache[glyph_name]
+
+    def get_primary_component_name(self, glyph_name: str) -> str:
+        if not self.references_primary(glyph_name):
+            return glyph_name
+        return self.import_glyph(
+            self.ttfont1,
+            glyph_name,
+            glyph_name + CompositeBuilder.PRIMARY_SUFFIX,
+            self.get_primary_component_name,
+        )
+
+    def get_secondary_component_name(self, glyph_name: str) -> str:
+        if self.same_font:
+            return self.get_primary_component_name(glyph_name)
+        return self.import_glyph(
+            self.ttfont2,
+            glyph_name,
+            glyph_name + CompositeBuilder.SECONDARY_SUFFIX,
+            self.get_secondary_component_name,
+        )
+
+    def build_glyph(
+        self,
+        glyph_name1: str,
+        glyph_name2: str,
+        bounds1: tuple,
+        bounds2: tuple,
+        transform1: Transform,
+        transform2: Transform,
+    ) -> tuple:
+        # Returns the composite glyph and its bounds. The transforms must
+        # already be quantized.
+        glyph = Glyph()
+        glyph.numberOfContours = -1
+        glyph.components = [
+            self.get_component(
+                self.get_primary_component_name(glyph_name1), transform1
+            ),
+            self.get_component(
+                self.get_secondary_component_name(glyph_name2), transform2
+            ),
+        ]
+        b1 = CompositeBuilder.transform_bounds(bounds1, transform1)
+        b2 = CompositeBuilder.transform_bounds(bounds2, transform2)
+        bounds = (
+            min(b1[0], b2[0]),
+            min(b1[1], b2[1]),
+            max(b1[2], b2[2]),
+            max(b1[3], b2[3]),
+        )
+        glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax = bounds
+        return glyph, bounds
@@ -0,0 +1,16 @@
+BASIC_LATIN = (0x0020, 0x007E)
+
+
+class Coverage:
+    # Characters that a subset double font keeps, besides those of its char
+    # map: unicode ranges, as inclusive (first, last) codepoints, and the
+    # characters of some sample text.
+    def __init__(self, unicode_ranges: list = None, text: str = None):
+        self.unicode_ranges = unicode_ranges or []
+        self.text = text or ''
+
+    def get_codepoints(self) -> set:
+        codepoints = set(ord(c) for c in self.text)
+        for first, last in self.unicode_ranges:
+            codepoints.update(range(first, last + 1))
+        return codepoints
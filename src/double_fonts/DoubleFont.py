@@ -1,7 +1,1116 @@
+import io
+import itertools
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from fontTools import subset
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+from fontTools.varLib import instancer
+
+from double_fonts.BuildProfiler import BuildProfiler
+from double_fonts.CharStringEngine import CharStringEngine
+from double_fonts.CharStringOutline import CharStringOutline
+from double_fonts.CompositeBuilder import CompositeBuilder
+from double_fonts.Coverage import Coverage
+from double_fonts.Font import Font
+from double_fonts.FontWriter import FontWriter
+from double_fonts.GlyphEngine import GlyphEngine
+from double_fonts.GlyphHashManifest import GlyphHashManifest
+from double_fonts.GlyphVariations import GlyphVariations
+from double_fonts.Layout import Layout
+from double_fonts.Outline import Outline
+from double_fonts.OutputFont import OutputFont
+from double_fonts.OverlapRemover import OverlapRemover
+from double_fonts.SpecimenRenderer import SpecimenRenderer
+from double_fonts.SuperimposeLayout import SuperimposeLayout
+from double_fonts.TransformCache import TransformCache
+
+
 class DoubleFont:
-    def __init__(self, font1, font2):
+    # Layers the glyphs of a secondary font, and of any extra_fonts, over
+    # those of a primary font, e.g. Tamil over Sinhala over Latin.
+    #
+    # With extra_fonts, each char map value is a list with a character (or
+    # cluster) per secondary font, or a single character for all of them.
+    def __init__(
+        self,
+        font1: Font,
+        font2: Font,
+        layout: Layout = None,
+        char_map: dict = None,
+        family_name: str = None,
+        composite: bool = False,
+        transform_cache: TransformCache = None,
+        style_name: str = None,
+        extra_fonts: list = None,
+        remove_overlaps: bool = False,
+    ):
         self.font1 = font1
         self.font2 = font2
+        self.extra_fonts = extra_fonts or []
+        self.layout = layout or SuperimposeLayout()
+        self.char_map = char_map
+        self.family_name = family_name or ' '.join(
+            font.name for font in self.fonts
+        )
+        # If set, double glyphs reference the source glyphs as components,
+        # instead of copying their points.
+        self.composite = composite
+        # Shared by this font's builds, so rebuilds can reuse placements.
+        self.transform_cache = transform_cache or TransformCache()
+        # For a static instance of a family, e.g. 'Bold'.
+        self.style_name = style_name
+        # If set, the overlapping contours of each double glyph are merged,
+        # and its redundant points dropped, after it is composed.
+        self.remove_overlaps = remove_overlaps
+        if composite and self.extra_fonts:
+            raise ValueError('Composite double fonts have two layers')
+        if composite and remove_overlaps:
+            raise ValueError('Overlaps are not removed from composite glyphs')
+
+    @property
+    def fonts(self) -> list:
+        # The font of each layer, primary first.
+        return [self.font1, self.font2] + self.extra_fonts
+
+    @staticmethod
+    def get_codepoint(char, cmap: dict):
+        if isinstance(char, int):
+            return char
+        if len(char) == 1:
+            return ord(char)
+        # For multi-character strings, use the first character in the cmap.
+        for c in char:
+            if ord(c) in cmap:
+                return ord(c)
+        return None
+
+    def get_secondary_chars(self, value) -> list:
+        # The character of each secondary layer, for a char map value.
+        if isinstance(value, (list, tuple)):
+            if len(value) != len(self.fonts) - 1:
+                raise ValueError(
+                    f'{value} should have a character per secondary font'
+                )
+            return list(value)
+        return [value] * (len(self.fonts) - 1)
+
+    def get_codepoint_tuples(self) -> list:
+        # The codepoint of each layer, for each double glyph.
+        cmaps = [font.cmap for font in self.fonts]
+        if self.char_map is None:
+            return [
+                (cp,) * len(cmaps)
+                for cp in cmaps[0]
+                if all(cp in cmap for cmap in cmaps[1:])
+            ]
+
+        codepoint_tuples = []
+        for char1, value in self.char_map.items():
+            codepoints = tuple(
+                DoubleFont.get_codepoint(char, cmap)
+                for char, cmap in zip(
+                    [char1] + self.get_secondary_chars(value), cmaps
+                )
+            )
+            if all(cp in cmap for cp, cmap in zip(codepoints, cmaps)):
+                codepoint_tuples.append(codepoints)
+        return codepoint_tuples
+
+    @staticmethod
+    def get_glyph_name(char, font: Font) -> str:
+        # The glyph of a codepoint or a character, or of a cluster of
+        # characters that the font's GSUB ligates into one glyph.
+        if isinstance(char, int):
+            return font.cmap.get(char)
+        if len(char) == 1:
+            return font.cmap.get(ord(char))
+        return font.cluster_index.get_glyph_name(char)
+
+    def get_glyph_name_tuples(self) -> list:
+        # The glyph name of each layer, for each double glyph.
+        fonts = self.fonts
+        if self.char_map is None:
+            return [
+                tuple(
+                    font.cmap[cp] for font, cp in zip(fonts, codepoints)
+                )
+                for codepoints in self.get_codepoint_tuples()
+            ]
+
+        # A primary cluster without a ligature is skipped, rather than
+        # replacing the glyph of one of its characters. A secondary cluster
+        # without one falls back to its first character in the cmap. If
+        # several entries map to the same primary glyph, the last wins.
+        glyph_name_tuples = {}
+        for char1, value in self.char_map.items():
+            glyph_name1 = DoubleFont.get_glyph_name(char1, self.font1)
+            glyph_names = [glyph_name1]
+            for char, font in zip(self.get_secondary_chars(value), fonts[1:]):
+                glyph_name = DoubleFont.get_glyph_name(char, font)
+                if glyph_name is None:
+                    glyph_name = font.cmap.get(
+                        DoubleFont.get_codepoint(char, font.cmap)
+                    )
+                glyph_names.append(glyph_name)
+            if None not in glyph_names:
+                glyph_name_tuples[glyph_name1] = tuple(glyph_names)
+        return list(glyph_name_tuples.values())
+
+    @staticmethod
+    def get_char_codepoints(chars: list) -> set:
+        # All the characters of multi-character entries, which a font may
+        # need to shape them.
+        codepoints = set()
+        for char in chars:
+            if isinstance(char, int):
+                codepoints.add(char)
+            else:
+                codepoints.update(ord(c) for c in char)
+        return codepoints
+
+    def get_primary_codepoints(self) -> set:
+        if self.char_map is None:
+            return set(
+                codepoints[0] for codepoints in self.get_codepoint_tuples()
+            )
+        return DoubleFont.get_char_codepoints(list(self.char_map))
+
+    def get_secondary_codepoints(self, layer: int = 1) -> set:
+        if self.char_map is None:
+            return set(
+                codepoints[layer]
+                for codepoints in self.get_codepoint_tuples()
+            )
+        return DoubleFont.get_char_codepoints(
+            [
+                self.get_secondary_chars(value)[layer - 1]
+                for value in self.char_map.values()
+            ]
+        )
+
+    def get_secondary_glyph_names(self, layer: int = 1) -> set:
+        return set(
+            glyph_names[layer]
+            for glyph_names in self.get_glyph_name_tuples()
+        )
+
+    @staticmethod
+    def get_font_data(ttfont: TTFont) -> bytes:
+        data = io.BytesIO()
+        ttfont.save(data)
+        return data.getvalue()
+
+    @staticmethod
+    def open_font_data(font_data: bytes) -> TTFont:
+        # Read lazily, like any other source font. TTFont.save compares the
+        # output path with a lazy font's file name, so it needs one.
+        file = io.BytesIO(font_data)
+        file.name = None
+        return TTFont(file, lazy=True)
+
+    @staticmethod
+    def get_subset_font_data(
+        font_path: str,
+        unicodes: set,
+        layout_features: list = None,
+        glyph_names: set = None,
+    ) -> bytes:
+        # Glyph names are kept, since glyphs are matched and hashed by name.
+        # glyph_names are kept too, e.g. ligatures, even without the layout
+        # that reaches them.
+        ttfont = TTFont(font_path, lazy=True)
+        options = subset.Options()
+        options.glyph_names = True
+        options.notdef_outline = True
+        options.name_IDs = ['*']
+        options.name_languages = ['*']
+        options.layout_features = (
+            ['*'] if layout_features is None else layout_features
+        )
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=unicodes, glyphs=glyph_names or [])
+        subsetter.subset(ttfont)
+        return DoubleFont.get_font_data(ttfont)
+
+    def get_secondary_subset_font_data(self, layer: int) -> bytes:
+        # A secondary font only keeps its mapped glyphs.
+        return DoubleFont.get_subset_font_data(
+            self.fonts[layer].path,
+            self.get_secondary_codepoints(layer),
+            layout_features=[],
+            glyph_names=self.get_secondary_glyph_names(layer),
+        )
+
+    def get_subset_font_datas(self, coverage: Coverage) -> list:
+        # The subset of each layer's font. The primary font keeps the
+        # characters of the char map and of the coverage, with their layout,
+        # and those of secondary layers that are the same font, which are
+        # None.
+        unicodes1 = self.get_primary_codepoints() | coverage.get_codepoints()
+        glyph_names1 = set()
+        font_datas = [None]
+        for layer, font in enumerate(self.fonts[1:], start=1):
+            if os.path.samefile(self.font1.path, font.path):
+                unicodes1 |= self.get_secondary_codepoints(layer)
+                glyph_names1 |= self.get_secondary_glyph_names(layer)
+                font_datas.append(None)
+            else:
+                font_datas.append(self.get_secondary_subset_font_data(layer))
+        font_datas[0] = DoubleFont.get_subset_font_data(
+            self.font1.path, unicodes1, glyph_names=glyph_names1
+        )
+        return font_datas
+
+    def get_subset(self, coverage: Coverage) -> 'DoubleFont':
+        # This double font, over subsets of its fonts. Subsetting keeps
+        # outlines as they are, so the transform cache is shared.
+        font_datas = self.get_subset_font_datas(coverage)
+        ttfont1 = DoubleFont.open_font_data(font_datas[0])
+        fonts = [
+            Font(
+                font.name,
+                path=font.path,
+                ttfont=ttfont1
+                if font_data is None
+                else DoubleFont.open_font_data(font_data),
+            )
+            for font, font_data in zip(self.fonts[1:], font_datas[1:])
+        ]
+        return DoubleFont(
+            Font(self.font1.name, path=self.font1.path, ttfont=ttfont1),
+            fonts[0],
+            layout=self.layout,
+            char_map=self.char_map,
+            family_name=self.family_name,
+            composite=self.composite,
+            transform_cache=self.transform_cache,
+            style_name=self.style_name,
+            extra_fonts=fonts[1:],
+            remove_overlaps=self.remove_overlaps,
+        )
+
+    def compose(self, *outlines: Outline) -> Outline:
+        # A double glyph of the outline of each layer.
+        return GlyphEngine(self.layout).compose([outlines])[0]
+
+    def set_names(self, new_font: TTFont):
+        name = new_font['name']
+        family_name = self.family_name
+        if self.style_name is None:
+            name.setName(family_name, 1, 3, 1, 1033)
+            name.setName("Regular", 2, 3, 1, 1033)
+            name.setName(f"{family_name} Regular", 4, 3, 1, 1033)
+            name.setName(
+                f"{family_name.replace(' ', '')}-Regular", 6, 3, 1, 1033
+            )
+            return
+
+        # Styles other than Regular and Bold are families of their own, for
+        # apps that only know those two, with typographic names for others.
+        style_name = self.style_name
+        if style_name in ['Regular', 'Bold']:
+            name.setName(family_name, 1, 3, 1, 1033)
+            name.setName(style_name, 2, 3, 1, 1033)
+        else:
+            name.setName(f"{family_name} {style_name}", 1, 3, 1, 1033)
+            name.setName("Regular", 2, 3, 1, 1033)
+        name.setName(f"{family_name} {style_name}", 4, 3, 1, 1033)
+        name.setName(
+            f"{family_name.replace(' ', '')}-{style_name.replace(' ', '')}",
+            6,
+            3,
+            1,
+            1033,
+        )
+        name.setName(family_name, 16, 3, 1, 1033)
+        name.setName(style_name, 17, 3, 1, 1033)
+        instancer.setRibbiBits(new_font)
+
+    def get_variations_key(self) -> str:
+        # Identifies every font's variation data. Glyph variations are not
+        # hashed one by one, since that would decompile all of them.
+        #
+        # The data that CFF charstrings share, e.g. their subroutines, is
+        # identified here too.
+        parts = []
+        for ttfont in [font.ttfont for font in self.fonts]:
+            for tag in ['fvar', 'avar', 'gvar']:
+                if tag in ttfont.reader:
+                    parts.append(ttfont.reader[tag])
+            if CharStringOutline.get_table_tag(ttfont) is not None:
+                parts.extend(CharStringOutline.get_shared_datas(ttfont))
+        return GlyphHashManifest.get_hash(*parts)
+
+    def get_outline_tag(self) -> str:
+        # The table of the primary font's outlines, which the output's
+        # follow: 'glyf', 'CFF ' or 'CFF2'.
+        ttfonts = [font.ttfont for font in self.fonts]
+        is_cffs = [
+            CharStringOutline.get_table_tag(ttfont) is not None
+            for ttfont in ttfonts
+        ]
+        if len(set(is_cffs)) > 1:
+            raise ValueError('Fonts with glyf and CFF outlines cannot mix')
+        if not is_cffs[0]:
+            return 'glyf'
+        if self.composite:
+            raise ValueError('Composite double fonts need glyf outlines')
+        if self.remove_overlaps:
+            raise ValueError('Overlaps are only removed from glyf outlines')
+        for font in self.fonts[1:]:
+            if 'fvar' in font.ttfont and font.path != self.font1.path:
+                raise ValueError(
+                    f'{font.name} is a variable CFF2 font'
+                    + ' other than the primary font'
+                )
+        return CharStringOutline.get_table_tag(ttfonts[0])
+
+    def get_source_parts(
+        self, glyph_names: tuple, variations_key: str = ''
+    ) -> list:
+        # What a double glyph is composed from, but its layout, for its
+        # hash: the name, data and advance of the glyph of each layer.
+        ttfonts = [font.ttfont for font in self.fonts]
+        return (
+            [variations_key]
+            + list(glyph_names)
+            + [
+                GlyphHashManifest.get_source_data(ttfont, glyph_name)
+                for ttfont, glyph_name in zip(ttfonts, glyph_names)
+            ]
+            + [
+                str(ttfont['hmtx'][glyph_name][0])
+                for ttfont, glyph_name in zip(ttfonts, glyph_names)
+            ]
+        )
+
+    def build_composite_glyphs(
+        self, output_font: OutputFont, layout: Layout = None
+    ) -> dict:
+        layout = layout or self.layout
+        ttfont1 = self.font1.ttfont
+        ttfont2 = self.font2.ttfont
+        glyf1, glyf2 = ttfont1['glyf'], ttfont2['glyf']
+
+        glyph_name_pairs = []
+        for glyph_name1, glyph_name2 in self.get_glyph_name_tuples():
+            bounds1 = OutputFont.get_header_bounds(glyf1, glyph_name1)
+            bounds2 = OutputFont.get_header_bounds(glyf2, glyph_name2)
+            if bounds1 is None or bounds2 is None:
+                continue
+            glyph_name_pairs.append(
+                (glyph_name1, glyph_name2, bounds1, bounds2)
+            )
+
+        builder = CompositeBuilder(
+            output_font,
+            ttfont1,
+            ttfont2,
+            set(glyph_name1 for glyph_name1, *_ in glyph_name_pairs),
+            same_font=os.path.samefile(self.font1.path, self.font2.path),
+        )
+        glyphs, bounds_list = [], []
+        for glyph_name1, glyph_name2, bounds1, bounds2 in glyph_name_pairs:
+            transform1, transform2 = [
+                CompositeBuilder.quantize(transform)
+                for transform in layout.get_transforms([bounds1, bounds2])
+            ]
+            glyph, bounds = builder.build_glyph(
+                glyph_name1,
+                glyph_name2,
+                bounds1,
+                bounds2,
+                transform1,
+                transform2,
+            )
+            glyphs.append(glyph)
+            bounds_list.append(bounds)
+        if glyph_name_pairs:
+            glyph_names1, glyph_names2, *_ = zip(*glyph_name_pairs)
+            output_font.set_glyphs(
+                glyph_names1,
+                glyphs,
+                self.get_metrics(
+                    list(zip(glyph_names1, glyph_names2)), bounds_list, layout
+                ),
+            )
+        return dict(
+            n_glyphs=len(glyph_name_pairs),
+            n_imported_glyphs=len(output_font.added_glyph_names),
+            **builder.transform_cache.get_stats(),
+        )
+
+    def get_metrics(
+        self, glyph_name_tuples: list, bounds_list: list, layout: Layout
+    ) -> np.ndarray:
+        # The (advance, lsb) of each double glyph, for all of them at once.
+        hmtxs = [font.ttfont['hmtx'] for font in self.fonts]
+        return layout.get_metrics_batch(
+            np.array(
+                [
+                    [
+                        hmtx[glyph_name][0]
+                        for hmtx, glyph_name in zip(hmtxs, glyph_names)
+                    ]
+                    for glyph_names in glyph_name_tuples
+                ]
+            ).reshape(-1, len(hmtxs)),
+            np.array(bounds_list, dtype=float).reshape(-1, 4),
+        )
+
+    @staticmethod
+    def save(
+        output_font: OutputFont,
+        output_paths: list,
+        save_manifest,
+        writer: FontWriter = None,
+    ):
+        # The manifest is only saved once the outputs are, so that it never
+        # describes an older output.
+        font_data = output_font.compile()
+        if writer is None:
+            FontWriter.write_all(font_data, output_paths, save_manifest)
+        else:
+            writer.submit(font_data, output_paths, save_manifest)
+
+    def build(
+        self,
+        output_path: str,
+        jobs: int = 1,
+        incremental: bool = True,
+        coverage: Coverage = None,
+        formats: list = None,
+        writer: FontWriter = None,
+        profiler: BuildProfiler = None,
+    ) -> dict:
+        # Returns the build's stats. With a coverage, the fonts are subset
+        # first, and the output only has the glyphs that it covers.
+        #
+        # The output's format follows its extension, or it is written in
+        # each of formats, e.g. ['ttf', 'woff2'], with the manifest next to
+        # the first uncompressed one, which is the quickest to read back.
+        # With a writer, the output is written in the writer's pool, and
+        # this returns before it is.
+        #
+        # Each stage of the build is reported to the profiler, if any.
+        return self.build_layouts(
+            {output_path: self.layout},
+            jobs,
+            incremental,
+            coverage,
+            formats,
+            writer,
+            profiler,
+        )[output_path]
+
+    def build_layouts(
+        self,
+        layouts: dict,
+        jobs: int = 1,
+        incremental: bool = True,
+        coverage: Coverage = None,
+        formats: list = None,
+        writer: FontWriter = None,
+        profiler: BuildProfiler = None,
+    ) -> dict:
+        # Builds an output for each of layouts, which maps output paths to
+        # layouts, e.g. {'Stack.ttf': StackLayout(), 'Superimpose.ttf':
+        # SuperimposeLayout()}, and returns the stats of each, as build
+        # does. The fonts are loaded, mapped, hashed and decoded once, for
+        # all of them, and only composition and saving are per layout.
+        profiler = profiler or BuildProfiler()
+        profiler.start()
+        try:
+            return self.build_stages(
+                layouts,
+                jobs,
+                incremental,
+                coverage,
+                formats,
+                writer,
+                profiler,
+            )
+        finally:
+            profiler.stop()
+
+    def build_stages(
+        self,
+        layouts: dict,
+        jobs: int,
+        incremental: bool,
+        coverage: Coverage,
+        formats: list,
+        writer: FontWriter,
+        profiler: BuildProfiler,
+    ) -> dict:
+        if coverage is not None:
+            with profiler.stage('subset'):
+                double_font = self.get_subset(coverage)
+            return double_font.build_layouts(
+                layouts,
+                jobs,
+                incremental,
+                formats=formats,
+                writer=writer,
+                profiler=profiler,
+            )
+
+        with profiler.stage('load') as event:
+            ttfonts = [font.ttfont for font in self.fonts]
+            outline_tag = self.get_outline_tag()
+            if self.remove_overlaps and any(
+                'fvar' in ttfont for ttfont in ttfonts
+            ):
+                # Merged contours would not interpolate.
+                raise ValueError('Overlaps are only removed from static fonts')
+            if outline_tag == 'glyf':
+                glyfs = [ttfont['glyf'] for ttfont in ttfonts]
+                n_glyphs = sum(len(glyf.glyphs) for glyf in glyfs)
+            else:
+                charstrings = [
+                    CharStringOutline.get_charstrings(ttfont)
+                    for ttfont in ttfonts
+                ]
+                n_glyphs = sum(
+                    len(ttfont.getGlyphOrder()) for ttfont in ttfonts
+                )
+            builds = {}
+            for output_path, layout in layouts.items():
+                output_font = OutputFont(ttfonts[0])
+                for ttfont in ttfonts[1:]:
+                    output_font.merge_axes(ttfont)
+                output_paths = FontWriter.get_output_paths(
+                    output_path, formats
+                )
+                manifest = GlyphHashManifest(
+                    next(
+                        (
+                            path
+                            for path in output_paths
+                            if FontWriter.get_flavor(path) is None
+                        ),
+                        output_paths[0],
+                    )
+                )
+                builds[output_path] = dict(
+                    layout=layout,
+                    outline_tag=outline_tag,
+                    output_font=output_font,
+                    output_paths=output_paths,
+                    manifest=manifest,
+                )
+            event['n_items'] = n_glyphs
+        if self.composite:
+            # Composite output is quick to build, and is not reused, so an
+            # empty manifest is saved over any previous one.
+            all_stats = {}
+            for output_path, build in builds.items():
+                with profiler.stage('compose') as event:
+                    all_stats[output_path] = self.build_composite_glyphs(
+                        build['output_font'], build['layout']
+                    )
+                    event['n_items'] = all_stats[output_path]['n_glyphs']
+                self.save_build(build, writer, profiler)
+            return all_stats
+
+        with profiler.stage('cmap') as event:
+            glyph_name_tuples = self.get_glyph_name_tuples()
+            event['n_items'] = len(glyph_name_tuples)
+
+        # Glyphs whose hash is unchanged are reused from the previous output.
+        with profiler.stage('hash') as event:
+            variations_key = self.get_variations_key()
+            source_parts = {
+                glyph_names[0]: self.get_source_parts(
+                    glyph_names, variations_key
+                )
+                for glyph_names in glyph_name_tuples
+            }
+            for build in builds.values():
+                layout_key = build['layout'].get_key()
+                if self.remove_overlaps:
+                    layout_key += OverlapRemover.get_key()
+                build['glyph_hashes'] = {
+                    glyph_name1: GlyphHashManifest.get_hash(layout_key, *parts)
+                    for glyph_name1, parts in source_parts.items()
+                }
+                build['previous_glyph_hashes'] = (
+                    build['manifest'].load() if incremental else {}
+                )
+            event['n_items'] = len(source_parts)
+
+        with profiler.stage('read') as event:
+            # Deltas of variable fonts are read along with the outlines.
+            variations = [
+                GlyphVariations(ttfont) if 'gvar' in ttfont else None
+                for ttfont in ttfonts
+            ]
+            # Each source glyph is decoded once, for every layout, and for
+            # every double glyph that it is a layer of.
+            outlines = {}
+
+            def get_outline(layer: int, glyph_name: str) -> Outline:
+                if (layer, glyph_name) in outlines:
+                    return outlines[(layer, glyph_name)]
+                if outline_tag == 'glyf':
+                    outline = Outline.from_glyph(
+                        glyfs[layer][glyph_name],
+                        glyfs[layer],
+                        variations[layer].get_deltas(glyph_name)
+                        if variations[layer]
+                        else None,
+                    )
+                else:
+                    outline = CharStringOutline.from_charstring(
+                        charstrings[layer][glyph_name],
+                        'CFF2' in ttfonts[layer],
+                    )
+                outlines[(layer, glyph_name)] = outline
+                return outline
+
+            groups, keys = [], []
+            for build in builds.values():
+                build['reused_glyph_names'] = []
+                build['composed_indices'] = []
+            for glyph_names in glyph_name_tuples:
+                glyph_name1 = glyph_names[0]
+                composing_builds = []
+                for build in builds.values():
+                    glyph_hash = build['glyph_hashes'].get(glyph_name1)
+                    if (
+                        glyph_hash is not None
+                        and build['previous_glyph_hashes'].get(glyph_name1)
+                        == glyph_hash
+                    ):
+                        build['reused_glyph_names'].append(glyph_name1)
+                    else:
+                        composing_builds.append(build)
+                if not composing_builds:
+                    continue
+
+                group = tuple(
+                    get_outline(layer, glyph_name)
+                    for layer, glyph_name in enumerate(glyph_names)
+                )
+                if any(outline.is_empty() for outline in group):
+                    for build in composing_builds:
+                        build['glyph_hashes'].pop(glyph_name1, None)
+                    continue
+                for build in composing_builds:
+                    build['composed_indices'].append(len(groups))
+                groups.append((glyph_names, group))
+                keys.append(
+                    tuple(
+                        (font.path, glyph_name)
+                        for font, glyph_name in zip(self.fonts, glyph_names)
+                    )
+                )
+            for build in builds.values():
+                self.reuse_glyphs(build)
+            event['n_items'] = len(groups)
+
+        all_stats = {}
+        for output_path, build in builds.items():
+            all_stats[output_path] = self.compose_build(
+                build, groups, keys, jobs, profiler
+            )
+            self.save_build(build, writer, profiler)
+        return all_stats
+
+    @staticmethod
+    def reuse_glyphs(build: dict):
+        # Copies the build's reused glyphs from its previous output.
+        reused_glyph_names = build['reused_glyph_names']
+        if not reused_glyph_names:
+            return
+        previous_font = build['manifest'].load_output()
+        previous_hmtx = previous_font['hmtx']
+        if build['outline_tag'] != 'glyf':
+            # Their data has their widths already, and their bounds are
+            # those of their points.
+            previous_charstrings = CharStringOutline.get_charstrings(
+                previous_font
+            )
+            is_cff2 = build['outline_tag'] == 'CFF2'
+            charstrings = [
+                previous_charstrings[glyph_name]
+                for glyph_name in reused_glyph_names
+            ]
+            build['output_font'].set_charstrings(
+                reused_glyph_names,
+                [
+                    CharStringOutline.get_data(charstring)
+                    for charstring in charstrings
+                ],
+                [
+                    CharStringOutline.from_charstring(
+                        charstring, is_cff2
+                    ).get_bounds()
+                    for charstring in charstrings
+                ],
+                [
+                    previous_hmtx[glyph_name]
+                    for glyph_name in reused_glyph_names
+                ],
+                add_widths=False,
+            )
+            return
+        previous_glyf = previous_font['glyf']
+        previous_gvar = previous_font.get('gvar')
+        build['output_font'].set_glyphs(
+            reused_glyph_names,
+            [
+                Glyph(previous_glyf.glyphs[glyph_name].data)
+                for glyph_name in reused_glyph_names
+            ],
+            [previous_hmtx[glyph_name] for glyph_name in reused_glyph_names],
+            [
+                previous_gvar.variations[glyph_name]
+                for glyph_name in reused_glyph_names
+            ]
+            if previous_gvar
+            else None,
+        )
+
+    def compose_build(
+        self,
+        build: dict,
+        groups: list,
+        keys: list,
+        jobs: int,
+        profiler: BuildProfiler,
+    ) -> dict:
+        # Composes the build's glyphs that are not reused, from the decoded
+        # groups, and returns its stats.
+        indices = build['composed_indices']
+        with profiler.stage('compose') as event:
+            if build['outline_tag'] == 'glyf':
+                engine = GlyphEngine(build['layout'], self.transform_cache)
+            else:
+                engine = CharStringEngine(
+                    build['layout'],
+                    self.transform_cache,
+                    build['outline_tag'] == 'CFF2',
+                )
+            glyphs = engine.compose_glyphs_parallel(
+                [groups[i][1] for i in indices],
+                jobs or os.cpu_count(),
+                [keys[i] for i in indices],
+            )
+            event['n_items'] = len(glyphs)
+
+        overlap_stats = {}
+        if self.remove_overlaps:
+            with profiler.stage('overlaps') as event:
+                remover = OverlapRemover()
+                glyphs = remover.remove_overlaps_parallel(
+                    glyphs, jobs or os.cpu_count()
+                )
+                overlap_stats = remover.get_stats()
+                event['n_items'] = len(glyphs)
+
+        # Only the composed glyphs' metrics are computed, in one pass.
+        with profiler.stage('metrics') as event:
+            if glyphs:
+                glyph_name_tuples = [groups[i][0] for i in indices]
+                datas, bounds_list, variations = zip(*glyphs)
+                glyph_names = [
+                    glyph_names[0] for glyph_names in glyph_name_tuples
+                ]
+                metrics = self.get_metrics(
+                    glyph_name_tuples, bounds_list, build['layout']
+                )
+                if build['outline_tag'] == 'glyf':
+                    build['output_font'].set_glyphs(
+                        glyph_names,
+                        [Glyph(data) for data in datas],
+                        metrics,
+                        variations,
+                    )
+                else:
+                    build['output_font'].set_charstrings(
+                        glyph_names, datas, bounds_list, metrics
+                    )
+            event['n_items'] = len(glyphs)
+        return dict(
+            n_glyphs=len(indices),
+            n_reused_glyphs=len(build['reused_glyph_names']),
+            **engine.get_stats(),
+            **overlap_stats,
+        )
+
+    def save_build(
+        self, build: dict, writer: FontWriter, profiler: BuildProfiler
+    ):
+        # Names and saves the build's output, with its glyph hashes, and
+        # those of the glyphs built, in its manifest. Builds without glyph
+        # hashes save an empty manifest.
+        output_ttfont = build['output_font'].ttfont
+        with profiler.stage('names'):
+            self.set_names(output_ttfont)
+        with profiler.stage('save') as event:
+            glyph_hashes = build.get('glyph_hashes', {})
+            output_hashes = {
+                glyph_name: GlyphHashManifest.get_output_hash(
+                    output_ttfont, glyph_name
+                )
+                for glyph_name in glyph_hashes
+            }
+            manifest = build['manifest']
+            DoubleFont.save(
+                build['output_font'],
+                build['output_paths'],
+                lambda: manifest.save(glyph_hashes, output_hashes),
+                writer,
+            )
+            event['n_items'] = len(build['output_paths'])
+
+    def get_variants(self, grid: dict) -> list:
+        # The layout parameters of each point of grid, which maps parameters
+        # of this font's layout to the values to try, e.g.
+        # {'vertical_spacing_ratio': [0, 0.1], 'secondary_scale': [0.6, 0.7]}.
+        params = vars(self.layout)
+        for name in grid:
+            if name not in params:
+                raise ValueError(f'Unknown parameter: {name}')
+        return [
+            dict(zip(grid, values))
+            for values in itertools.product(*grid.values())
+        ]
+
+    @staticmethod
+    def get_file_name(name: str) -> str:
+        # The name, without spaces, or characters that do not belong in a
+        # file name, e.g. the commas of a variable font's file name.
+        return re.sub(r'[^\w.=-]', '', name)
+
+    def get_variant_name(self, variant: dict) -> str:
+        # e.g. 'TamilSinhala-secondary_scale=0.7'.
+        return DoubleFont.get_file_name(
+            self.family_name
+            + ''.join(f'-{name}={value}' for name, value in variant.items())
+        )
+
+    def sweep(
+        self,
+        output_dir: str,
+        grid: dict,
+        jobs: int = 1,
+        incremental: bool = True,
+        coverage: Coverage = None,
+        formats: list = None,
+        specimen_texts: list = None,
+        specimen_sizes: list = None,
+    ) -> dict:
+        # Builds a variant of this font for each point of a grid of its
+        # layout's parameters, with the others as they are, and returns
+        # their stats. The variants are built in one pass, so that the fonts
+        # are loaded, mapped and decoded once, and only composed and saved
+        # for each. With specimen_texts, a specimen of each variant is
+        # rendered next to it.
+        t_start = time.perf_counter()
+        variants = self.get_variants(grid)
+        layout_type = type(self.layout)
+        layouts = {
+            os.path.join(
+                output_dir, self.get_variant_name(variant) + '.ttf'
+            ): layout_type(**dict(vars(self.layout), **variant))
+            for variant in variants
+        }
+        os.makedirs(output_dir, exist_ok=True)
+        all_stats = self.build_layouts(
+            layouts, jobs, incremental, coverage, formats
+        )
+        results = [
+            dict(
+                params=variant,
+                output_path=output_path,
+                output_paths=FontWriter.get_output_paths(
+                    output_path, formats
+                ),
+                stats=all_stats[output_path],
+            )
+            for variant, output_path in zip(variants, layouts)
+        ]
+        build_time = time.perf_counter() - t_start
+
+        specimens = None
+        if specimen_texts:
+            specimens = SpecimenRenderer(output_dir, jobs=jobs).render_all(
+                [result['output_paths'][0] for result in results],
+                specimen_texts,
+                specimen_sizes,
+            )
+        return dict(
+            n_variants=len(results),
+            build_time=build_time,
+            total_time=time.perf_counter() - t_start,
+            variants=results,
+            specimens=specimens,
+        )
+
+    def get_instances(self) -> list:
+        # The primary font's named instances, as (style name, primary
+        # location, secondary location). The secondary location has the same
+        # coordinates, within the secondary font's axis ranges, or is None if
+        # the secondary font is static.
+        ttfont1 = self.font1.ttfont
+        ttfont2 = self.font2.ttfont
+        if 'fvar' not in ttfont1:
+            raise ValueError(f'{self.font1.name} is not a variable font')
+
+        instances = []
+        for instance in ttfont1['fvar'].instances:
+            style_name = ttfont1['name'].getDebugName(instance.subfamilyNameID)
+            location1 = dict(instance.coordinates)
+            location2 = None
+            if 'fvar' in ttfont2:
+                location2 = {
+                    axis.axisTag: min(
+                        max(
+                            location1.get(axis.axisTag, axis.defaultValue),
+                            axis.minValue,
+                        ),
+                        axis.maxValue,
+                    )
+                    for axis in ttfont2['fvar'].axes
+                }
+            instances.append((style_name, location1, location2))
+        return instances
+
+    @staticmethod
+    def instantiate(ttfont: TTFont, location: dict) -> TTFont:
+        instancer.instantiateVariableFont(ttfont, location, inplace=True)
+        return DoubleFont.open_font_data(DoubleFont.get_font_data(ttfont))
+
+    @staticmethod
+    def build_instance(build: dict) -> dict:
+        t_start = time.perf_counter()
+        if build['font_data1'] is None:
+            ttfont1 = TTFont(build['font_path1'])
+        else:
+            ttfont1 = TTFont(io.BytesIO(build['font_data1']))
+        ttfont1 = DoubleFont.instantiate(ttfont1, build['location1'])
+        if build['font_data2'] is None:
+            # The same font, at the same location.
+            ttfont2 = ttfont1
+        else:
+            ttfont2 = DoubleFont.open_font_data(build['font_data2'])
+            if build['location2'] is not None:
+                ttfont2 = DoubleFont.instantiate(ttfont2, build['location2'])
+
+        style_name = build['style_name']
+        output_path = build['output_path']
+        stats = DoubleFont(
+            Font(
+                f"{build['font_name1']} {style_name}",
+                path=build['font_path1'],
+                ttfont=ttfont1,
+            ),
+            Font(
+                f"{build['font_name2']} {style_name}",
+                path=build['font_path2'],
+                ttfont=ttfont2,
+            ),
+            layout=build['layout'],
+            char_map=build['char_map'],
+            family_name=build['family_name'],
+            composite=build['composite'],
+            style_name=style_name,
+            remove_overlaps=build['remove_overlaps'],
+        ).build(
+            output_path,
+            jobs=1,
+            incremental=build['incremental'],
+            formats=build['formats'],
+        )
+        output_paths = FontWriter.get_output_paths(
+            output_path, build['formats']
+        )
+        return dict(
+            style_name=style_name,
+            location=build['location1'],
+            output_path=output_path,
+            output_paths=output_paths,
+            time=time.perf_counter() - t_start,
+            size=sum(
+                os.path.getsize(output_path) for output_path in output_paths
+            ),
+            stats=stats,
+        )
+
+    def build_instances(
+        self,
+        output_dir: str,
+        jobs: int = None,
+        incremental: bool = True,
+        coverage: Coverage = None,
+        formats: list = None,
+    ) -> dict:
+        # Builds a static double font for each of the primary font's named
+        # instances, from instances of both fonts, in a process pool.
+        # Returns the builds' stats.
+        #
+        # The fonts are subset once, before instancing, so that each
+        # instance only instantiates the glyphs it needs: the secondary font
+        # always, and the primary font too if there is a coverage. Instances
+        # have two layers.
+        if self.extra_fonts:
+            raise ValueError('Instances of double fonts have two layers')
+        t_start = time.perf_counter()
+        if coverage is not None:
+            font_data1, font_data2 = self.get_subset_font_datas(coverage)
+        else:
+            font_data1 = None
+            font_data2 = None
+            if not os.path.samefile(self.font1.path, self.font2.path):
+                font_data2 = self.get_secondary_subset_font_data(1)
+        builds = []
+        for style_name, location1, location2 in self.get_instances():
+            builds.append(
+                dict(
+                    font_name1=self.font1.name,
+                    font_path1=self.font1.path,
+                    font_data1=font_data1,
+                    location1=location1,
+                    font_name2=self.font2.name,
+                    font_path2=self.font2.path,
+                    font_data2=font_data2,
+                    location2=location2,
+                    layout=self.layout,
+                    char_map=self.char_map,
+                    family_name=self.family_name,
+                    composite=self.composite,
+                    remove_overlaps=self.remove_overlaps,
+                    style_name=style_name,
+                    incremental=incremental,
+                    formats=formats,
+                    output_path=os.path.join(
+                        output_dir,
+                        DoubleFont.get_file_name(
+                            f'{self.family_name}-{style_name}'
+                        )
+                        + '.ttf',
+                    ),
+                )
+            )
 
-    def build(self, output_path: str):
-        pass
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = min(jobs or os.cpu_count(), len(builds))
+        if jobs <= 1:
+            results = [DoubleFont.build_instance(build) for build in builds]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(DoubleFont.build_instance, builds))
+        return dict(
+            jobs=jobs,
+            n_instances=len(results),
+            total_time=time.perf_counter() - t_start,
+            total_size=sum(result['size'] for result in results),
+            instances=results,
+        )
@@ -1,3 +1,42 @@
+from fontTools.ttLib import TTFont
+
+from double_fonts.ClusterIndex import ClusterIndex
+from double_fonts.FontCatalog import FontCatalog
+
+
 class Font:
-    def __init__(self, name: str):
+    def __init__(
+        self,
+        name: str,
+        path: str = None,
+        catalog: FontCatalog = None,
+        ttfont: TTFont = None,
+    ):
         self.name = name
+        self._path = path
+        # Set for fonts that are not read from path as is, e.g. instances.
+        self._ttfont = ttfont
+        self.catalog = catalog or FontCatalog.default()
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = self.catalog.find(self.name)['path']
+        return self._path
+
+    @property
+    def ttfont(self) -> TTFont:
+        if self._ttfont is None:
+            self._ttfont = self.catalog.open(self.path)
+        return self._ttfont
+
+    @property
+    def cmap(self) -> dict:
+        # Fonts, e.g. subsets, may have no Unicode cmap.
+        return self.ttfont.getBestCmap() or {}
+
+    @property
+    def cluster_index(self) -> ClusterIndex:
+        # Of the font at path, whose GSUB subsets and instances may not
+        # keep, but whose glyph names they do.
+        return ClusterIndex.get(self.catalog.open(self.path))
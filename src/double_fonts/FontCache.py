@@ -0,0 +1,118 @@
+import os
+from collections import OrderedDict
+
+
+class FontCache:
+    # A size-bounded LRU cache of built fonts, by key, in memory and in
+    # cache_dir, like TransformCache but sized in bytes.
+    #
+    # Fonts evicted from memory stay on disk, and fonts read back from disk
+    # are kept in memory again. Disk recency is the files' mtime, so the
+    # disk cache outlives the process, and is trimmed in LRU order when it
+    # is reopened.
+    def __init__(
+        self,
+        cache_dir: str,
+        max_memory_size: int = 64_000_000,
+        max_disk_size: int = 1_000_000_000,
+    ):
+        self.cache_dir = cache_dir
+        self.max_memory_size = max_memory_size
+        self.max_disk_size = max_disk_size
+        self.memory_size = 0
+        self.disk_size = 0
+        self.n_memory_hits = 0
+        self.n_disk_hits = 0
+        self.n_misses = 0
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load_disk_index()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.font')
+
+    def load_disk_index(self):
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(file_name)
+            if ext != '.font':
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, file_name))
+            entries.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self.disk_size += size
+        self.evict_disk()
+
+    def evict_memory(self):
+        while self.memory_size > self.max_memory_size and self._memory:
+            _, evicted_font_data = self._memory.popitem(last=False)
+            self.memory_size -= len(evicted_font_data)
+
+    def evict_disk(self):
+        while self.disk_size > self.max_disk_size and self._disk:
+            evicted_key, evicted_size = self._disk.popitem(last=False)
+            self.disk_size -= evicted_size
+            try:
+                os.remove(self.get_path(evicted_key))
+            except FileNotFoundError:
+                pass
+
+    def put_memory(self, key: str, font_data: bytes):
+        if key in self._memory:
+            self.memory_size -= len(self._memory.pop(key))
+        self._memory[key] = font_data
+        self.memory_size += len(font_data)
+        self.evict_memory()
+
+    def read_disk(self, key: str) -> bytes:
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as fin:
+                font_data = fin.read()
+        except FileNotFoundError:
+            self.disk_size -= self._disk.pop(key)
+            return None
+        os.utime(path)
+        self._disk.move_to_end(key)
+        return font_data
+
+    def get(self, key: str) -> bytes:
+        if key in self._memory:
+            self.n_memory_hits += 1
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        font_data = self.read_disk(key) if key in self._disk else None
+        if font_data is None:
+            self.n_misses += 1
+            return None
+        self.n_disk_hits += 1
+        self.put_memory(key, font_data)
+        return font_data
+
+    def put(self, key: str, font_data: bytes):
+        self.put_memory(key, font_data)
+        # Written whole, and then renamed, so that a reader never sees part
+        # of a font.
+        path = self.get_path(key)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as fout:
+            fout.write(font_data)
+        os.replace(temp_path, path)
+        if key in self._disk:
+            self.disk_size -= self._disk.pop(key)
+        self._disk[key] = len(font_data)
+        self.disk_size += len(font_data)
+        self.evict_disk()
+
+    def get_stats(self) -> dict:
+        return dict(
+            n_memory_fonts=len(self._memory),
+            memory_size=self.memory_size,
+            n_disk_fonts=len(self._disk),
+            disk_size=self.disk_size,
+            n_memory_hits=self.n_memory_hits,
+            n_disk_hits=self.n_disk_hits,
+            n_misses=self.n_misses,
+        )
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from fontTools.ttLib import TTFont
+
+from double_fonts.MappedFont import MappedFont
+
+FONT_EXTENSIONS = ('.ttf', '.otf')
+DEFAULT_FONT_DIRS = ['fonts']
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser('~'), '.cache', 'double_fonts', 'catalog.json'
+)
+
+
+class FontCatalog:
+    # Resolves font names to files, through an on-disk index of font
+    # metadata. A file is only reopened when its mtime changes, and only
+    # re-indexed when its content hash changes too. Parsed fonts are kept
+    # in an in-process LRU, and read through a memory map, unless
+    # memory_map is False.
+    _default = None
+
+    def __init__(
+        self,
+        font_dirs: list = None,
+        cache_path: str = DEFAULT_CACHE_PATH,
+        max_open_fonts: int = 16,
+        memory_map: bool = True,
+    ):
+        self.font_dirs = font_dirs or DEFAULT_FONT_DIRS
+        self.cache_path = cache_path
+        self.max_open_fonts = max_open_fonts
+        self.memory_map = memory_map
+        self._entries = None
+        self._name_index = None
+        self._open_fonts = OrderedDict()
+
+    @staticmethod
+    def default() -> 'FontCatalog':
+        if FontCatalog._default is None:
+            FontCatalog._default = FontCatalog()
+        return FontCatalog._default
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        return ''.join(c for c in name.lower() if c.isalnum())
+
+    @staticmethod
+    def get_hash(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, 'rb') as fin:
+            for chunk in iter(lambda: fin.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def get_cmap_ranges(cmap: dict) -> list:
+        ranges = []
+        for codepoint in sorted(cmap):
+            if ranges and ranges[-1][1] == codepoint - 1:
+                ranges[-1][1] = codepoint
+            else:
+                ranges.append([codepoint, codepoint])
+        return ranges
+
+    @staticmethod
+    def read_entry(path: str) -> dict:
+        ttfont = TTFont(path, lazy=True)
+        name = ttfont['name']
+
+        def get_name(*name_ids):
+            for name_id in name_ids:
+                value = name.getDebugName(name_id)
+                if value:
+                    return value
+            return None
+
+        head = ttfont['head']
+        entry = dict(
+            path=path,
+            family=get_name(16, 1),
+            style=get_name(17, 2),
+            full_name=get_name(4),
+            postscript_name=get_name(6),
+            tables=sorted(ttfont.reader.keys()),
+            cmap=FontCatalog.get_cmap_ranges(ttfont.getBestCmap() or {}),
+            units_per_em=head.unitsPerEm,
+            bounds=[head.xMin, head.yMin, head.xMax, head.yMax],
+        )
+        ttfont.close()
+        return entry
+
+    def load_cache(self) -> dict:
+        if not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path) as fin:
+            return json.load(fin)
+
+    def save_cache(self, entries: dict):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temp_path = self.cache_path + '.tmp'
+        with open(temp_path, 'w') as fout:
+            json.dump(entries, fout)
+        os.replace(temp_path, self.cache_path)
+
+    def list_font_paths(self) -> list:
+        paths = []
+        for font_dir in self.font_dirs:
+            for dir_path, _, file_names in os.walk(font_dir):
+                for file_name in file_names:
+                    if file_name.lower().endswith(FONT_EXTENSIONS):
+                        paths.append(
+                            os.path.abspath(os.path.join(dir_path, file_name))
+                        )
+        return sorted(paths)
+
+    def get_entry(self, path: str, cached_entry: dict) -> dict:
+        stat = os.stat(path)
+        if cached_entry and cached_entry['mtime'] == stat.st_mtime:
+            return cached_entry
+
+        file_hash = FontCatalog.get_hash(path)
+        if cached_entry and cached_entry['hash'] == file_hash:
+            entry = dict(cached_entry)
+        else:
+            entry = FontCatalog.read_entry(path)
+        entry['mtime'] = stat.st_mtime
+        entry['hash'] = file_hash
+        return entry
+
+    @property
+    def entries(self) -> dict:
+        if self._entries is None:
+            cached_entries = self.load_cache()
+            entries = {}
+            for path in self.list_font_paths():
+                entries[path] = self.get_entry(path, cached_entries.get(path))
+            # Keep entries for fonts outside this catalog's font_dirs, so
+            # that catalogs over different directories share one cache.
+            all_entries = cached_entries | entries
+            if all_entries != cached_entries:
+                self.save_cache(all_entries)
+            self._entries = entries
+        return self._entries
+
+    @staticmethod
+    def get_entry_names(entry: dict) -> list:
+        names = [
+            entry['full_name'],
+            entry['postscript_name'],
+            f"{entry['family']} {entry['style']}",
+            os.path.splitext(os.path.basename(entry['path']))[0],
+        ]
+        if entry['style'] == 'Regular':
+            names.append(entry['family'])
+        return [name for name in names if name]
+
+    @property
+    def name_index(self) -> dict:
+        if self._name_index is None:
+            name_index = {}
+            # Static fonts take precedence over variable fonts of the same
+            # name, and otherwise the first path in sort order wins.
+            for entry in sorted(
+                self.entries.values(),
+                key=lambda entry: ('fvar' in entry['tables'], entry['path']),
+            ):
+                for name in FontCatalog.get_entry_names(entry):
+                    name_index.setdefault(
+                        FontCatalog.normalize_name(name), entry
+                    )
+            self._name_index = name_index
+        return self._name_index
+
+    def find(self, name: str) -> dict:
+        entry = self.name_index.get(FontCatalog.normalize_name(name))
+        if entry is None:
+            raise ValueError(f'Font "{name}" not found in {self.font_dirs}')
+        return entry
+
+    def open(self, path: str) -> TTFont:
+        key = (os.path.abspath(path), os.stat(path).st_mtime)
+        if key in self._open_fonts:
+            self._open_fonts.move_to_end(key)
+            return self._open_fonts[key]
+
+        # Tables, and glyphs within glyf, are only decompiled when read.
+        if self.memory_map:
+            ttfont = MappedFont(path)
+        else:
+            ttfont = TTFont(path, lazy=True)
+        self._open_fonts[key] = ttfont
+        if len(self._open_fonts) > self.max_open_fonts:
+            self._open_fonts.popitem(last=False)
+        return ttfont
@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from double_fonts.BatchBuilder import LAYOUTS
+from double_fonts.Coverage import Coverage
+from double_fonts.DoubleFont import DoubleFont
+from double_fonts.Font import Font
+from double_fonts.FontCache import FontCache
+from double_fonts.FontCatalog import FontCatalog
+
+# Bumped when the same request would build a different font.
+BUILD_VERSION = 1
+REQUEST_TIMEOUT = 30
+MAX_HEADERS = 100
+
+
+class FontService:
+    # An HTTP service that builds double fonts for just the characters of
+    # a text, like the text= parameter of Google Fonts, e.g.
+    #
+    # GET /font?font1=Noto+Sans&font2=Noto+Sans+Sinhala&layout=stack
+    #     &vertical_spacing_ratio=0.2&text=...
+    #
+    # returns a WOFF2 font that maps each character of the text (or of
+    # unicodes, e.g. U+0D80-0DFF,U+0020) to the double glyph of both fonts.
+    # Fonts are catalog names, and other parameters are the layout's.
+    # GET /stats returns the service's counters as JSON.
+    #
+    # Fonts are built in a process pool, and cached by a hash of the source
+    # fonts' content and of the normalized request, so that the same
+    # request, in any parameter order, is built once. Identical requests
+    # that arrive while a font is being built wait for that build. The
+    # hash is also the font's ETag.
+    def __init__(
+        self,
+        cache: FontCache,
+        catalog: FontCatalog = None,
+        jobs: int = None,
+    ):
+        self.cache = cache
+        self.catalog = catalog or FontCatalog.default()
+        # Workers are spawned, rather than forked from a request handler,
+        # which would give them the open client connections, whose clients
+        # then never see them close.
+        self.executor = ProcessPoolExecutor(
+            max_workers=jobs or os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        self.n_requests = 0
+        self.n_builds = 0
+        self.n_coalesced = 0
+        self.n_errors = 0
+        self.build_time = 0
+        self._pending = {}
+
+    @staticmethod
+    def parse_unicodes(unicodes: str) -> set:
+        # Comma separated codepoints and ranges, in hex, with or without U+.
+        codepoints = set()
+        for item in unicodes.split(','):
+            item = item.strip().upper().replace('U+', '')
+            if not item:
+                continue
+            first, _, last = item.partition('-')
+            try:
+                first, last = int(first, 16), int(last or first, 16)
+            except ValueError:
+                raise ValueError(f'Invalid unicodes: {item}')
+            if not 0 <= first <= last <= 0x10FFFF:
+                raise ValueError(f'Invalid unicodes: {item}')
+            codepoints.update(range(first, last + 1))
+        return codepoints
+
+    @staticmethod
+    def parse_layout_params(layout: str, params: dict) -> dict:
+        # Typed like the defaults of the layout's parameters.
+        if layout not in LAYOUTS:
+            raise ValueError(f'Unknown layout: {layout}')
+        parameters = inspect.signature(LAYOUTS[layout]).parameters
+        layout_params = {}
+        for name, value in params.items():
+            if name not in parameters:
+                raise ValueError(f'Unknown parameter: {name}')
+            default = parameters[name].default
+            if isinstance(default, bool):
+                layout_params[name] = value.lower() in ('1', 'true', 'yes')
+            else:
+                try:
+                    layout_params[name] = type(default)(value)
+                except ValueError:
+                    raise ValueError(f'Invalid {name}: {value}')
+        return layout_params
+
+    def get_build(self, query: str) -> dict:
+        # The build for a request's query string, or a ValueError.
+        params = {
+            name: values[-1]
+            for name, values in parse_qs(query, keep_blank_values=True).items()
+        }
+        if 'font1' not in params or 'font2' not in params:
+            raise ValueError('font1 and font2 are required')
+        entry1 = self.catalog.find(params.pop('font1'))
+        entry2 = self.catalog.find(params.pop('font2'))
+        codepoints = set(ord(c) for c in params.pop('text', ''))
+        codepoints |= FontService.parse_unicodes(params.pop('unicodes', ''))
+        if not codepoints:
+            raise ValueError('text or unicodes is required')
+        layout = params.pop('layout', 'superimpose')
+        return dict(
+            font_path1=entry1['path'],
+            font_path2=entry2['path'],
+            font_hash1=entry1['hash'],
+            font_hash2=entry2['hash'],
+            family_name=f"{entry1['family']} {entry2['family']}",
+            layout=layout,
+            layout_params=FontService.parse_layout_params(layout, params),
+            codepoints=sorted(codepoints),
+        )
+
+    @staticmethod
+    def get_key(build: dict) -> str:
+        # Paths are left out, so that moved fonts still hit the cache.
+        key_build = {
+            name: value
+            for name, value in build.items()
+            if name not in ('font_path1', 'font_path2')
+        }
+        key_build['version'] = BUILD_VERSION
+        return hashlib.sha256(
+            json.dumps(key_build, sort_keys=True).encode()
+        ).hexdigest()
+
+    @staticmethod
+    def build_font(build: dict) -> bytes:
+        # Runs in a worker, whose catalog keeps the source fonts parsed for
+        # later builds.
+        text = ''.join(chr(codepoint) for codepoint in build['codepoints'])
+        double_font = DoubleFont(
+            Font(build['family_name'], path=build['font_path1']),
+            Font(build['family_name'], path=build['font_path2']),
+            layout=LAYOUTS[build['layout']](**build['layout_params']),
+            char_map={
+                codepoint: codepoint for codepoint in build['codepoints']
+            },
+            family_name=build['family_name'],
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, 'font.woff2')
+            double_font.build(
+                output_path, incremental=False, coverage=Coverage(text=text)
+            )
+            with open(output_path, 'rb') as fin:
+                return fin.read()
+
+    async def build_and_cache(self, key: str, build: dict) -> bytes:
+        try:
+            loop = asyncio.get_running_loop()
+            t_start = loop.time()
+            font_data = await loop.run_in_executor(
+                self.executor, FontService.build_font, build
+            )
+            self.build_time += loop.time() - t_start
+            self.cache.put(key, font_data)
+            return font_data
+        finally:
+            del self._pending[key]
+
+    async def get_font(self, key: str, build: dict) -> tuple:
+        # The font's data, and whether it was a cache 'hit', a 'miss' that
+        # was built, or 'coalesced' with a build in progress.
+        font_data = self.cache.get(key)
+        if font_data is not None:
+            return font_data, 'hit'
+        if key in self._pending:
+            self.n_coalesced += 1
+            source = 'coalesced'
+        else:
+            self.n_builds += 1
+            self._pending[key] = asyncio.ensure_future(
+                self.build_and_cache(key, build)
+            )
+            source = 'miss'
+        # Shielded, so that a client that hangs up does not cancel the
+        # build for the others.
+        return await asyncio.shield(self._pending[key]), source
+
+    def get_stats(self) -> dict:
+        return dict(
+            n_requests=self.n_requests,
+            n_builds=self.n_builds,
+            n_coalesced=self.n_coalesced,
+            n_errors=self.n_errors,
+            n_pending=len(self._pending),
+            build_time=self.build_time,
+            cache=self.cache.get_stats(),
+        )
+
+    async def respond(self, method: str, target: str, headers: dict) -> tuple:
+        # The response's status, headers and body.
+        if method not in ('GET', 'HEAD'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, {}, b''
+        url = urlsplit(target)
+        if url.path == '/stats':
+            return (
+                HTTPStatus.OK,
+                {'Content-Type': 'application/json'},
+                json.dumps(self.get_stats()).encode(),
+            )
+        if url.path != '/font':
+            return HTTPStatus.NOT_FOUND, {}, b''
+
+        build = self.get_build(url.query)
+        key = FontService.get_key(build)
+        # The key covers the sources, so a font never changes.
+        response_headers = {
+            'ETag': f'"{key}"',
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'Access-Control-Allow-Origin': '*',
+        }
+        if headers.get('if-none-match') == response_headers['ETag']:
+            return HTTPStatus.NOT_MODIFIED, response_headers, b''
+        font_data, source = await self.get_font(key, build)
+        response_headers['Content-Type'] = 'font/woff2'
+        response_headers['X-Cache'] = source
+        return HTTPStatus.OK, response_headers, font_data
+
+    @staticmethod
+    async def read_request(reader: asyncio.StreamReader) -> tuple:
+        request_line = await reader.readline()
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return method, target, headers
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        # One request per connection.
+        try:
+            try:
+                method, target, headers = await asyncio.wait_for(
+                    FontService.read_request(reader), REQUEST_TIMEOUT
+                )
+            except (ValueError, asyncio.TimeoutError):
+                return
+            self.n_requests += 1
+            try:
+                status, response_headers, body = await self.respond(
+                    method, target, headers
+                )
+            except ValueError as e:
+                self.n_errors += 1
+                status, response_headers, body = (
+                    HTTPStatus.BAD_REQUEST,
+                    {'Content-Type': 'text/plain'},
+                    str(e).encode(),
+                )
+            except Exception as e:
+                self.n_errors += 1
+                status, response_headers, body = (
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    {'Content-Type': 'text/plain'},
+                    f'{type(e).__name__}: {e}'.encode(),
+                )
+            response_headers['Content-Length'] = str(len(body))
+            response_headers['Connection'] = 'close'
+            lines = [f'HTTP/1.1 {status.value} {status.phrase}'] + [
+                f'{name}: {value}' for name, value in response_headers.items()
+            ]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            if method != 'HEAD':
+                writer.write(body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000):
+        server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
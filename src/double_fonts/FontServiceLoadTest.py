@@ -0,0 +1,110 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from double_fonts.SpecimenRenderer import DEFAULT_TEXTS
+
+
+class FontServiceLoadTest:
+    # Sends n_requests font requests to a FontService, n_concurrent at a
+    # time, and reports their latency percentiles.
+    #
+    # Each request is for a text of a few words from texts, of which there
+    # are n_distinct_texts, so that requests are a mix of builds, cache
+    # hits, and requests coalesced with builds in progress.
+    def __init__(
+        self,
+        url: str,
+        params: dict,
+        n_requests: int = 200,
+        n_concurrent: int = 16,
+        n_distinct_texts: int = 20,
+        texts: list = None,
+        seed: int = 0,
+    ):
+        self.url = urlsplit(url)
+        self.params = params
+        self.n_requests = n_requests
+        self.n_concurrent = n_concurrent
+        self.n_distinct_texts = n_distinct_texts
+        self.texts = texts or DEFAULT_TEXTS
+        self.random = random.Random(seed)
+
+    def get_request_texts(self) -> list:
+        words = [word for text in self.texts for word in text.split()]
+        distinct_texts = [
+            ' '.join(self.random.sample(words, 3))
+            for _ in range(self.n_distinct_texts)
+        ]
+        return [
+            self.random.choice(distinct_texts) for _ in range(self.n_requests)
+        ]
+
+    async def get(self, text: str) -> dict:
+        query = urlencode(dict(self.params, text=text))
+        t_start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(
+            self.url.hostname, self.url.port or 80
+        )
+        writer.write(
+            (
+                f'GET /font?{query} HTTP/1.1\r\n'
+                + f'Host: {self.url.netloc}\r\n'
+                + 'Connection: close\r\n\r\n'
+            ).encode()
+        )
+        await writer.drain()
+        # The body is read to its Content-Length, rather than to the end of
+        # the connection.
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')[:-2]
+        headers = dict(line.split(': ', 1) for line in lines[1:])
+        body = await reader.readexactly(int(headers.get('Content-Length', 0)))
+        writer.close()
+        latency = time.perf_counter() - t_start
+        return dict(
+            status=int(lines[0].split(' ')[1]),
+            source=headers.get('X-Cache'),
+            size=len(body),
+            latency=latency,
+        )
+
+    async def run_async(self) -> list:
+        semaphore = asyncio.Semaphore(self.n_concurrent)
+
+        async def get(text: str) -> dict:
+            async with semaphore:
+                return await self.get(text)
+
+        return await asyncio.gather(
+            *[get(text) for text in self.get_request_texts()]
+        )
+
+    def run(self) -> dict:
+        t_start = time.perf_counter()
+        results = asyncio.run(self.run_async())
+        total_time = time.perf_counter() - t_start
+        latencies = np.array([result['latency'] for result in results])
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99]).tolist()
+
+        def count(name: str) -> dict:
+            counts = {}
+            for result in results:
+                counts[result[name]] = counts.get(result[name], 0) + 1
+            return counts
+
+        return dict(
+            n_requests=len(results),
+            n_concurrent=self.n_concurrent,
+            total_time=total_time,
+            requests_per_s=len(results) / total_time,
+            p50=p50,
+            p90=p90,
+            p99=p99,
+            max=latencies.max().item(),
+            statuses=count('status'),
+            sources=count('source'),
+        )
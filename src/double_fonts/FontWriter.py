@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from fontTools.ttLib import TTFont
+
+# Font format, as TTFont.flavor, by output file extension.
+FLAVORS = {
+    '.ttf': None,
+    '.otf': None,
+    '.woff': 'woff',
+    '.woff2': 'woff2',
+}
+
+
+class FontWriter:
+    # Writes compiled fonts as TTF, WOFF or WOFF2, by output file extension.
+    #
+    # WOFF and WOFF2 outputs are compressed from the compiled font data in
+    # memory. Submitted fonts are written in a thread pool: zlib and brotli
+    # release the GIL, so compression overlaps with composing the next
+    # font, and several fonts are compressed concurrently.
+    def __init__(self, max_workers: int = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = []
+
+    @staticmethod
+    def get_flavor(output_path: str) -> str:
+        ext = os.path.splitext(output_path)[1].lower()
+        if ext not in FLAVORS:
+            raise ValueError(f'Unknown font format: {output_path}')
+        return FLAVORS[ext]
+
+    @staticmethod
+    def get_output_paths(output_path: str, formats: list = None) -> list:
+        # For formats, e.g. ['ttf', 'woff2'], the output path with each
+        # format's extension.
+        if not formats:
+            return [output_path]
+        base_path = os.path.splitext(output_path)[0]
+        return [f'{base_path}.{font_format}' for font_format in formats]
+
+    @staticmethod
+    def compress(font_data: bytes, flavor: str) -> bytes:
+        # Tables other than glyf and loca (which WOFF2 transforms) are
+        # compressed as compiled, without being decompiled.
+        ttfont = TTFont(BytesIO(font_data), lazy=True)
+        ttfont.flavor = flavor
+        compressed_font_data = BytesIO()
+        ttfont.save(compressed_font_data, reorderTables=False)
+        return compressed_font_data.getvalue()
+
+    @staticmethod
+    def write(font_data: bytes, output_path: str) -> str:
+        flavor = FontWriter.get_flavor(output_path)
+        if flavor is not None:
+            font_data = FontWriter.compress(font_data, flavor)
+        with open(output_path, 'wb') as fout:
+            fout.write(font_data)
+        return output_path
+
+    @staticmethod
+    def write_all(
+        font_data: bytes, output_paths: list, on_written=None
+    ) -> list:
+        for output_path in output_paths:
+            FontWriter.write(font_data, output_path)
+        if on_written is not None:
+            on_written()
+        return output_paths
+
+    def submit(self, font_data: bytes, output_paths: list, on_written=None):
+        # Unknown formats fail here, rather than in the pool.
+        for output_path in output_paths:
+            FontWriter.get_flavor(output_path)
+        future = self.executor.submit(
+            FontWriter.write_all, font_data, output_paths, on_written
+        )
+        self.futures.append(future)
+        return future
+
+    def wait(self) -> list:
+        # Waits for every write so far, raising the first error, and returns
+        # their output paths.
+        futures, self.futures = self.futures, []
+        output_paths = []
+        for future in futures:
+            output_paths.extend(future.result())
+        return output_paths
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown()
+
+    def __enter__(self) -> 'FontWriter':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,265 @@
+import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from double_fonts.GlyphVariations import GlyphVariations
+from double_fonts.Layout import Layout
+from double_fonts.Outline import Outline
+from double_fonts.TransformCache import TransformCache
+
+
+class GlyphEngine:
+    # Composes many double glyphs in one batched NumPy pass.
+    #
+    # Each double glyph is composed from a group of outlines, one per layer:
+    # the primary glyph's, then those of one or more secondary fonts. The
+    # points of every layer of every group are laid out back to back in a
+    # single array, so that scaling, offsetting, rounding and bounds for all
+    # glyphs are a handful of vectorized operations, and each double glyph
+    # is a contiguous slice of the result.
+    def __init__(self, layout: Layout, transform_cache: TransformCache = None):
+        self.layout = layout
+        self.transform_cache = transform_cache
+        # The cache is shared by builds, so its counts are kept from here.
+        self.cache_stats_start = (
+            transform_cache.get_stats() if transform_cache else {}
+        )
+        self.n_transformed_points = 0
+        self.n_reused_points = 0
+        self.worker_stats = []
+
+    def get_transforms(self, groups: list) -> list:
+        # The transform of each layer of each group, flattened.
+        bounds = iter(
+            Outline.get_bounds_batch(
+                [outline for group in groups for outline in group]
+            ).tolist()
+        )
+        transforms = []
+        for group in groups:
+            transforms.extend(
+                self.layout.get_transforms([next(bounds) for _ in group])
+            )
+        return transforms
+
+    def transform_layers(
+        self, layers: list, transforms: list, keys: list
+    ) -> list:
+        # The rounded, transformed coordinates of each layer. With a cache,
+        # layers with the same key and transform are only transformed once.
+        layer_coordinates = [None] * len(layers)
+        first_indices = {}
+        indices = []
+        for i, (transform, key) in enumerate(zip(transforms, keys)):
+            if key is None or self.transform_cache is None:
+                indices.append(i)
+                continue
+            cache_key = (key, transform)
+            if cache_key in first_indices:
+                continue
+            layer_coordinates[i] = self.transform_cache.get(cache_key)
+            if layer_coordinates[i] is None:
+                first_indices[cache_key] = i
+                indices.append(i)
+
+        counts = np.array([layers[i].n_points for i in indices], dtype=int)
+        if indices:
+            scales = np.repeat([transforms[i].scale for i in indices], counts)
+            offsets = np.repeat(
+                [(transforms[i].dx, transforms[i].dy) for i in indices],
+                counts,
+                axis=0,
+            )
+            coordinates = np.concatenate(
+                [layers[i].coordinates for i in indices]
+            )
+            # Round half up, as fontTools' otRound does.
+            coordinates = np.floor(
+                coordinates * scales[:, None] + offsets + 0.5
+            )
+            ends = np.cumsum(counts)
+            for i, start, end in zip(indices, ends - counts, ends):
+                layer_coordinates[i] = coordinates[start:end]
+
+        for cache_key, i in first_indices.items():
+            self.transform_cache.put(
+                cache_key, layer_coordinates[i], layers[i].n_points
+            )
+        for i, (transform, key) in enumerate(zip(transforms, keys)):
+            if layer_coordinates[i] is None:
+                layer_coordinates[i] = layer_coordinates[
+                    first_indices[(key, transform)]
+                ]
+
+        n_transformed_points = int(counts.sum())
+        self.n_transformed_points += n_transformed_points
+        self.n_reused_points += (
+            sum(layer.n_points for layer in layers) - n_transformed_points
+        )
+        return layer_coordinates
+
+    def compose_variations(self, groups: list, transforms: list) -> list:
+        # The deltas of each double glyph, for variable fonts. The point
+        # deltas of all layers are scaled in one pass; offsets do not apply
+        # to deltas. The phantom points keep the primary glyph's deltas, so
+        # the advance varies as the primary's does.
+        blocks, scales = [], []
+        layers = [outline for group in groups for outline in group]
+        for outline, transform in zip(layers, transforms):
+            for deltas in outline.variations.values():
+                blocks.append(deltas[:-4])
+                scales.append(transform.scale)
+        if not blocks:
+            return [{} for _ in groups]
+
+        counts = np.array([len(block) for block in blocks])
+        deltas = np.concatenate(blocks) * np.repeat(scales, counts)[:, None]
+        deltas = np.floor(deltas + 0.5).astype(np.int64)
+        ends = np.cumsum(counts)
+        scaled_blocks = iter(
+            deltas[start:end] for start, end in zip(ends - counts, ends)
+        )
+
+        variations = []
+        for group in groups:
+            n_points = sum(outline.n_points for outline in group)
+            merged = {}
+            start = 0
+            for i, outline in enumerate(group):
+                end = start + outline.n_points
+                for key, region_deltas in outline.variations.items():
+                    if key not in merged:
+                        merged[key] = np.zeros(
+                            (n_points + 4, 2), dtype=np.int64
+                        )
+                    merged[key][start:end] = next(scaled_blocks)
+                    if i == 0:
+                        merged[key][-4:] = np.floor(region_deltas[-4:] + 0.5)
+                start = end
+            variations.append(merged)
+        return variations
+
+    def compose(self, groups: list, keys: list = None) -> list:
+        # keys, if given, identify the source glyphs of each group, as a
+        # tuple with a key per layer, for the transform cache.
+        if not groups:
+            return []
+        layers = [outline for group in groups for outline in group]
+        transforms = self.get_transforms(groups)
+        keys = keys or [(None,) * len(group) for group in groups]
+        layer_keys = [key for group_keys in keys for key in group_keys]
+
+        counts = np.array([layer.n_points for layer in layers])
+        coordinates = np.concatenate(
+            self.transform_layers(layers, transforms, layer_keys)
+        )
+        flags = np.concatenate([layer.flags for layer in layers])
+
+        group_sizes = [len(group) for group in groups]
+        glyph_counts = np.add.reduceat(
+            counts, np.cumsum([0] + group_sizes[:-1])
+        )
+        glyph_ends = np.cumsum(glyph_counts)
+        glyph_starts = glyph_ends - glyph_counts
+        mins = np.minimum.reduceat(coordinates, glyph_starts, axis=0)
+        maxs = np.maximum.reduceat(coordinates, glyph_starts, axis=0)
+        bounds = np.hstack([mins, maxs]).tolist()
+
+        variations = self.compose_variations(groups, transforms)
+        layer_counts = iter(counts.tolist())
+        outlines = []
+        for i, group in enumerate(groups):
+            start, end = glyph_starts[i], glyph_ends[i]
+            end_pts, layer_start = [], 0
+            for outline in group:
+                end_pts.append(outline.end_pts + layer_start)
+                layer_start += next(layer_counts)
+            outlines.append(
+                Outline(
+                    coordinates[start:end],
+                    flags[start:end],
+                    np.concatenate(end_pts),
+                    bounds=tuple(bounds[i]),
+                    variations=variations[i],
+                )
+            )
+        return outlines
+
+    def compose_glyphs(self, groups: list, keys: list = None) -> list:
+        # Each double glyph compiled to glyf data, with its bounds and its
+        # gvar TupleVariations.
+        glyphs = []
+        for outline in self.compose(groups, keys):
+            data = outline.to_glyph().compile(None, recalcBBoxes=False)
+            glyphs.append(
+                (
+                    data,
+                    outline.get_bounds(),
+                    GlyphVariations.to_tuple_variations(outline.variations),
+                )
+            )
+        return glyphs
+
+    def get_stats(self) -> dict:
+        # This engine's counts, and its workers'. Cache counts are those of
+        # the workers' caches if there were workers, and n_worker_caches
+        # says how many.
+        stats = Counter(
+            n_transformed_points=self.n_transformed_points,
+            n_reused_points=self.n_reused_points,
+        )
+        if self.transform_cache is not None:
+            stats.update(self.transform_cache.get_stats())
+            stats.subtract(self.cache_stats_start)
+        for worker_stats in self.worker_stats:
+            stats.update(worker_stats)
+        if self.worker_stats and self.transform_cache is not None:
+            stats['n_worker_caches'] = len(self.worker_stats)
+        return dict(stats)
+
+    def get_worker_cache(self) -> TransformCache:
+        # An empty transform cache of the same size as this engine's.
+        max_cache_size = (
+            self.transform_cache.max_size if self.transform_cache else 0
+        )
+        return TransformCache(max_cache_size) if max_cache_size else None
+
+    def get_worker_engine(self) -> 'GlyphEngine':
+        return GlyphEngine(self.layout, self.get_worker_cache())
+
+    @staticmethod
+    def compose_glyphs_in_worker(
+        engine: 'GlyphEngine', groups: list, keys: list
+    ) -> tuple:
+        return engine.compose_glyphs(groups, keys), engine.get_stats()
+
+    def compose_glyphs_parallel(
+        self, groups: list, jobs: int, keys: list = None
+    ) -> list:
+        # Workers get outline arrays rather than fonts, and compile glyph
+        # data too, since that is the costliest per-glyph step. Chunks are
+        # returned in order, so the result is the same as a serial run. Each
+        # chunk has its own engine, with its own empty transform cache, of
+        # the same size, which is dropped with it. So parallel builds
+        # neither use nor fill this engine's cache, which is shared by
+        # builds.
+        if jobs <= 1 or len(groups) < 2:
+            return self.compose_glyphs(groups, keys)
+        keys = keys or [(None,) * len(group) for group in groups]
+        chunk_size = math.ceil(len(groups) / (jobs * 4))
+        starts = range(0, len(groups), chunk_size)
+        glyphs = []
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(
+                GlyphEngine.compose_glyphs_in_worker,
+                repeat(self.get_worker_engine()),
+                [groups[i : i + chunk_size] for i in starts],
+                [keys[i : i + chunk_size] for i in starts],
+            )
+            for chunk_glyphs, worker_stats in results:
+                glyphs.extend(chunk_glyphs)
+                self.worker_stats.append(worker_stats)
+        return glyphs
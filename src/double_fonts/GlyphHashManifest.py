@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import weakref
+from io import BytesIO
+
+from fontTools.ttLib import TTFont
+
+from double_fonts.CharStringOutline import CharStringOutline
+from double_fonts.OutputFont import OutputFont
+
+# Bump when a change to composition would change output for the same
+# inputs, so that stale manifests are ignored.
+MANIFEST_VERSION = 2
+
+
+class GlyphHashManifest:
+    # Sidecar file, next to a built font, with a content hash per double
+    # glyph. A glyph whose hash is unchanged since the previous build is
+    # copied from the previous output instead of being recomposed.
+    #
+    # The hashes of the built glyphs themselves are kept too, so that two
+    # builds can be compared without reading their glyphs, and that of the
+    # whole output, so that an output that has since been replaced, e.g.
+    # by a checkout, is not read as the one the manifest describes.
+    #
+    # Source glyphs are hashed from their font file's glyf data, which is
+    # kept with their TTFont, rather than from its glyf table, whose glyphs
+    # are shared with other builds, and compile to other data once they
+    # have been expanded.
+    _source_glyfs = weakref.WeakKeyDictionary()
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.path = output_path + '.glyphs.json'
+        self.output_data = None
+
+    @staticmethod
+    def get_glyph_data(glyf, glyph_name: str) -> bytes:
+        # Raw glyf data of a glyph, followed by that of its components.
+        glyph = glyf.glyphs[glyph_name]
+        if hasattr(glyph, 'data') and glyph.data[:2] != b'\xff\xff':
+            return glyph.data
+        glyph = glyf[glyph_name]
+        data = glyph.compile(glyf, recalcBBoxes=False)
+        if glyph.isComposite():
+            for component in glyph.components:
+                data += GlyphHashManifest.get_glyph_data(
+                    glyf, component.glyphName
+                )
+        return data
+
+    @staticmethod
+    def get_source_glyf(ttfont: TTFont) -> tuple:
+        # The glyf data of a source font's file, and its loca offsets.
+        source_glyf = GlyphHashManifest._source_glyfs.get(ttfont)
+        if source_glyf is None:
+            source_glyf = (ttfont.reader['glyf'], ttfont['loca'].locations)
+            GlyphHashManifest._source_glyfs[ttfont] = source_glyf
+        return source_glyf
+
+    @staticmethod
+    def get_source_glyph_data(ttfont: TTFont, glyph_id: int) -> bytes:
+        # Raw glyf data of a source glyph, as it is in its font file,
+        # followed by that of its components.
+        data, locations = GlyphHashManifest.get_source_glyf(ttfont)
+        glyph_data = bytes(data[locations[glyph_id] : locations[glyph_id + 1]])
+        for component_id in OutputFont.get_component_ids(glyph_data):
+            glyph_data += GlyphHashManifest.get_source_glyph_data(
+                ttfont, component_id
+            )
+        return glyph_data
+
+    @staticmethod
+    def get_source_data(ttfont: TTFont, glyph_name: str) -> bytes:
+        # get_font_glyph_data for a source glyph, which is read from its
+        # font file if it has one.
+        if 'glyf' in ttfont and ttfont.reader and 'glyf' in ttfont.reader:
+            return GlyphHashManifest.get_source_glyph_data(
+                ttfont, ttfont.getGlyphID(glyph_name)
+            )
+        return GlyphHashManifest.get_font_glyph_data(ttfont, glyph_name)
+
+    @staticmethod
+    def get_font_glyph_data(ttfont: TTFont, glyph_name: str) -> bytes:
+        # get_glyph_data, or a CFF or CFF2 glyph's charstring data, whose
+        # subroutines are hashed with the font's variation data.
+        if 'glyf' in ttfont:
+            return GlyphHashManifest.get_glyph_data(
+                ttfont['glyf'], glyph_name
+            )
+        return CharStringOutline.get_data(
+            CharStringOutline.get_charstrings(ttfont)[glyph_name]
+        )
+
+    @staticmethod
+    def get_output_hash(ttfont: TTFont, glyph_name: str) -> str:
+        return GlyphHashManifest.get_hash(
+            GlyphHashManifest.get_font_glyph_data(ttfont, glyph_name),
+            str(ttfont['hmtx'][glyph_name][0]),
+        )
+
+    @staticmethod
+    def get_hash(*parts) -> str:
+        h = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            h.update(len(part).to_bytes(8, 'big'))
+            h.update(part)
+        return h.hexdigest()
+
+    def read_output(self) -> bytes:
+        with open(self.output_path, 'rb') as fin:
+            return fin.read()
+
+    def load_manifest(self) -> dict:
+        # The manifest, or {} if it is stale, or does not describe the
+        # output that is there now. The output is kept as it was checked,
+        # for load_output.
+        if not (os.path.exists(self.path) and os.path.exists(self.output_path)):
+            return {}
+        with open(self.path) as fin:
+            manifest = json.load(fin)
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        output_data = self.read_output()
+        if manifest.get('output_hash') != hashlib.sha256(
+            output_data
+        ).hexdigest():
+            return {}
+        self.output_data = output_data
+        return manifest
+
+    def load(self) -> dict:
+        return self.load_manifest().get('glyphs', {})
+
+    def load_output_hashes(self) -> dict:
+        return self.load_manifest().get('outputs', {})
+
+    def load_output(self) -> TTFont:
+        # The output that load_manifest checked, read into memory, since the
+        # same path is about to be overwritten.
+        return TTFont(BytesIO(self.output_data), lazy=True)
+
+    def save(self, glyph_hashes: dict, output_hashes: dict = None):
+        with open(self.path, 'w') as fout:
+            json.dump(
+                dict(
+                    version=MANIFEST_VERSION,
+                    output_hash=hashlib.sha256(
+                        self.read_output()
+                    ).hexdigest(),
+                    glyphs=glyph_hashes,
+                    outputs=output_hashes or {},
+                ),
+                fout,
+                indent=2,
+                sort_keys=True,
+            )
@@ -0,0 +1,83 @@
+from collections.abc import MutableMapping
+
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+
+
+class GlyphRecords(MutableMapping):
+    # A glyf table's glyphs by name, as table__g_l_y_f.decompile makes them,
+    # but over the table's raw data, with each Glyph only made when it is
+    # first read. So a large font whose glyphs are mostly unused, e.g. a CJK
+    # secondary font, costs its loca offsets rather than an object for each
+    # glyph.
+    #
+    # Copies share the raw data and the glyphs made from it, like copies of
+    # a dict of glyphs, and have their own glyphs set and deleted.
+    def __init__(
+        self, data, locations, glyph_order: list, glyph_ids: dict
+    ):
+        self.data = data
+        self.locations = locations
+        self.glyph_order = glyph_order
+        self.glyph_ids = glyph_ids
+        self._made = {}
+        self._set = {}
+        self._deleted = set()
+
+    def is_raw(self, glyph_name: str) -> bool:
+        return (
+            glyph_name in self.glyph_ids
+            and glyph_name not in self._set
+            and glyph_name not in self._deleted
+        )
+
+    def __getitem__(self, glyph_name: str) -> Glyph:
+        if glyph_name in self._set:
+            return self._set[glyph_name]
+        if not self.is_raw(glyph_name):
+            raise KeyError(glyph_name)
+        glyph = self._made.get(glyph_name)
+        if glyph is None:
+            glyph_id = self.glyph_ids[glyph_name]
+            start = self.locations[glyph_id]
+            end = self.locations[glyph_id + 1]
+            glyph = Glyph(bytes(self.data[start:end]))
+            self._made[glyph_name] = glyph
+        return glyph
+
+    def __setitem__(self, glyph_name: str, glyph: Glyph):
+        self._set[glyph_name] = glyph
+        self._deleted.discard(glyph_name)
+
+    def __delitem__(self, glyph_name: str):
+        if glyph_name not in self:
+            raise KeyError(glyph_name)
+        self._set.pop(glyph_name, None)
+        if glyph_name in self.glyph_ids:
+            self._deleted.add(glyph_name)
+
+    def __contains__(self, glyph_name) -> bool:
+        return glyph_name in self._set or self.is_raw(glyph_name)
+
+    def __iter__(self):
+        # In glyph order, then in the order that glyphs were added.
+        for glyph_name in self.glyph_order:
+            if glyph_name in self:
+                yield glyph_name
+        for glyph_name in self._set:
+            if glyph_name not in self.glyph_ids:
+                yield glyph_name
+
+    def __len__(self) -> int:
+        n_added = sum(
+            1 for glyph_name in self._set if glyph_name not in self.glyph_ids
+        )
+        return len(self.glyph_ids) - len(self._deleted) + n_added
+
+    def copy(self) -> 'GlyphRecords':
+        records = GlyphRecords(
+            self.data, self.locations, self.glyph_order, self.glyph_ids
+        )
+        records._made = self._made
+        records._set = dict(self._set)
+        records._deleted = set(self._deleted)
+        return records
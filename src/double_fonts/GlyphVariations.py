@@ -0,0 +1,115 @@
+import numpy as np
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables.TupleVariation import TupleVariation
+from fontTools.varLib.iup import iup_delta
+
+
+class GlyphVariations:
+    # Reads a variable font's gvar deltas as NumPy arrays, matching the
+    # points of Outline.from_glyph.
+    #
+    # Deltas are keyed by region, as sorted (axis tag, (start, peak, end))
+    # tuples, and have a row for each point, followed by the four phantom
+    # points. Inferred deltas are filled in, and composite glyphs are
+    # flattened, adding each component's own deltas to the deltas of its
+    # offset, for the union of their regions.
+    def __init__(self, ttfont: TTFont):
+        self.glyf = ttfont['glyf']
+        self.gvar = ttfont['gvar']
+        self.h_metrics = ttfont['hmtx'].metrics
+        self._deltas = {}
+        self._n_points = {}
+
+    @staticmethod
+    def get_region_key(axes: dict) -> tuple:
+        return tuple(sorted(axes.items()))
+
+    def get_tuple_deltas(self, glyph_name: str) -> dict:
+        # The glyph's own deltas, with inferred deltas filled in. For
+        # composite glyphs, there is a row for each component's offset.
+        deltas = {}
+        orig_coords, controls = None, None
+        for variation in self.gvar.variations.get(glyph_name, []):
+            coordinates = variation.coordinates
+            if None in coordinates:
+                if orig_coords is None:
+                    (
+                        orig_coords,
+                        controls,
+                    ) = self.glyf._getCoordinatesAndControls(
+                        glyph_name, self.h_metrics
+                    )
+                coordinates = iup_delta(
+                    coordinates, orig_coords, list(controls.endPts)
+                )
+            key = GlyphVariations.get_region_key(variation.axes)
+            region_deltas = np.array(coordinates, dtype=np.float64)
+            if key in deltas:
+                deltas[key] = deltas[key] + region_deltas
+            else:
+                deltas[key] = region_deltas
+        return deltas
+
+    def get_n_points(self, glyph_name: str) -> int:
+        if glyph_name not in self._n_points:
+            coordinates, _, _ = self.glyf[glyph_name].getCoordinates(self.glyf)
+            self._n_points[glyph_name] = len(coordinates)
+        return self._n_points[glyph_name]
+
+    def get_deltas(self, glyph_name: str) -> dict:
+        if glyph_name in self._deltas:
+            return self._deltas[glyph_name]
+
+        glyph = self.glyf[glyph_name]
+        own_deltas = self.get_tuple_deltas(glyph_name)
+        if not glyph.isComposite():
+            self._deltas[glyph_name] = own_deltas
+            return own_deltas
+
+        blocks = []
+        for component in glyph.components:
+            blocks.append(
+                (
+                    component,
+                    self.get_n_points(component.glyphName),
+                    self.get_deltas(component.glyphName),
+                )
+            )
+        n_glyph_points = sum(n_points for _, n_points, _ in blocks)
+
+        deltas = {}
+        # An ordered set, so that the output is the same on every run.
+        region_keys = dict.fromkeys(own_deltas)
+        for _, _, component_deltas in blocks:
+            region_keys.update(dict.fromkeys(component_deltas))
+        for key in region_keys:
+            region_deltas = np.zeros((n_glyph_points + 4, 2))
+            own_region_deltas = own_deltas.get(key)
+            start = 0
+            for i, (component, n_points, component_deltas) in enumerate(
+                blocks
+            ):
+                end = start + n_points
+                if key in component_deltas:
+                    block = component_deltas[key][:n_points]
+                    if hasattr(component, 'transform'):
+                        block = block @ np.array(component.transform)
+                    region_deltas[start:end] = block
+                if own_region_deltas is not None:
+                    region_deltas[start:end] += own_region_deltas[i]
+                start = end
+            if own_region_deltas is not None:
+                region_deltas[-4:] = own_region_deltas[-4:]
+            deltas[key] = region_deltas
+
+        self._deltas[glyph_name] = deltas
+        return deltas
+
+    @staticmethod
+    def to_tuple_variations(deltas: dict) -> list:
+        return [
+            TupleVariation(
+                dict(key), [tuple(delta) for delta in region_deltas.tolist()]
+            )
+            for key, region_deltas in deltas.items()
+        ]
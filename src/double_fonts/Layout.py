@@ -0,0 +1,39 @@
+import numpy as np
+
+
+class Layout:
+    # Decides where the glyphs of each layer go in a double glyph: the
+    # primary glyph's, then those of one or more secondary fonts.
+    def get_key(self) -> str:
+        # Identifies the layout and its parameters, for content hashes.
+        return f'{type(self).__name__}{sorted(vars(self).items())}'
+
+    def get_transforms(self, bounds_list: list) -> list:
+        # A Transform for each layer, from the bounds of each.
+        raise NotImplementedError
+
+    def get_metrics(self, advances: list, bounds: tuple) -> tuple:
+        x_min, _, x_max, _ = bounds
+        return (max(advances[0], int(x_max)), int(x_min))
+
+    def get_metrics_batch(
+        self, advances: np.ndarray, bounds: np.ndarray
+    ) -> np.ndarray:
+        # get_metrics for many glyphs at once, as an (n, 2) array of
+        # (advance, lsb), from the (n, n_layers) advances of their layers
+        # and their (n, 4) bounds.
+        return np.stack(
+            [
+                np.maximum(advances[:, 0], np.trunc(bounds[:, 2])),
+                np.trunc(bounds[:, 0]),
+            ],
+            axis=1,
+        ).astype(int)
+
+    @staticmethod
+    def get_height(bounds: tuple) -> float:
+        return bounds[3] - bounds[1]
+
+    @staticmethod
+    def get_width(bounds: tuple) -> float:
+        return bounds[2] - bounds[0]
@@ -0,0 +1,59 @@
+import io
+import mmap
+
+
+class MappedFile(io.RawIOBase):
+    # A read-only, seekable file over a memory map of path, for lazy TTFont
+    # readers.
+    #
+    # Reads from view_offsets, i.e. of the tables there, are memoryviews of
+    # the mapping, so those tables are not copied into Python bytes, and
+    # processes that read the same font share the OS's page cache of it.
+    # Other reads are bytes. Views keep the mapping open, so closing the
+    # file leaves it to them.
+    def __init__(self, path: str):
+        super().__init__()
+        self.name = path
+        with open(path, 'rb') as fin:
+            self._mmap = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._position = 0
+        self.view_offsets = set()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._mmap)
+        if offset < 0:
+            raise ValueError(f'Negative seek position: {offset}')
+        self._position = offset
+        return offset
+
+    def read(self, size: int = -1):
+        start = min(self._position, len(self._mmap))
+        if size is None or size < 0:
+            end = len(self._mmap)
+        else:
+            end = min(start + size, len(self._mmap))
+        self._position = end
+        if start in self.view_offsets:
+            return self._view[start:end]
+        return self._mmap[start:end]
+
+    def close(self):
+        super().close()
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass
@@ -0,0 +1,43 @@
+from fontTools.ttLib import TTFont, newTable
+
+from double_fonts.GlyphRecords import GlyphRecords
+from double_fonts.MappedFile import MappedFile
+
+# The tables that are read as views of the mapping. These are most of a
+# TrueType font's data, and decompile from views as they do from bytes,
+# which other tables, e.g. post and GSUB, do not.
+VIEW_TABLES = ['glyf', 'gvar', 'loca']
+
+
+class MappedFont(TTFont):
+    # A lazy TTFont read through a memory map of its file, for large source
+    # fonts.
+    #
+    # glyf, gvar and loca are read as views of the mapping, rather than as
+    # copies, and glyf's glyphs are GlyphRecords over it, so that only the
+    # glyphs that are read become Glyph objects. Compressed fonts are read
+    # as TTFont reads them.
+    def __init__(self, path: str):
+        file = MappedFile(path)
+        super().__init__(file, lazy=True)
+        if self.reader.flavor is None:
+            file.view_offsets = set(
+                self.reader.tables[tag].offset
+                for tag in VIEW_TABLES
+                if tag in self.reader
+            )
+
+    def _readTable(self, tag):
+        if tag != 'glyf' or self.reader.flavor is not None:
+            return super()._readTable(tag)
+        glyf = newTable('glyf')
+        self.tables['glyf'] = glyf
+        glyf.glyphOrder = self.getGlyphOrder()
+        glyf._reverseGlyphOrder = {}
+        glyf.glyphs = GlyphRecords(
+            self.reader['glyf'],
+            self['loca'].locations,
+            glyf.glyphOrder,
+            self.getReverseGlyphMap(),
+        )
+        return glyf
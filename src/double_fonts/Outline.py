@@ -0,0 +1,115 @@
+import numpy as np
+from fontTools.ttLib.tables import ttProgram
+from fontTools.ttLib.tables._g_l_y_f import Glyph, GlyphCoordinates
+
+from double_fonts.Transform import Transform
+
+
+class Outline:
+    # A glyph outline held as flat NumPy arrays, so that transforming and
+    # merging glyphs never iterates over points in Python.
+    #
+    # For variable fonts, variations maps each region to its deltas, as
+    # read by GlyphVariations: a row per point, then the phantom points.
+    def __init__(
+        self,
+        coordinates: np.ndarray,
+        flags: np.ndarray,
+        end_pts: np.ndarray,
+        bounds: tuple = None,
+        variations: dict = None,
+    ):
+        self.coordinates = coordinates
+        self.flags = flags
+        self.end_pts = end_pts
+        self.bounds = bounds
+        self.variations = variations or {}
+
+    @staticmethod
+    def empty() -> 'Outline':
+        return Outline(
+            np.zeros((0, 2), dtype=np.float64),
+            np.zeros(0, dtype=np.uint8),
+            np.zeros(0, dtype=np.int64),
+        )
+
+    @staticmethod
+    def from_glyph(
+        glyph: Glyph, glyf, variations: dict = None
+    ) -> 'Outline':
+        # getCoordinates also flattens composite glyphs.
+        coordinates, end_pts, flags = glyph.getCoordinates(glyf)
+        return Outline(
+            np.frombuffer(coordinates.array, dtype=np.float64).reshape(-1, 2),
+            np.frombuffer(bytes(flags), dtype=np.uint8),
+            np.asarray(end_pts, dtype=np.int64),
+            variations=variations,
+        )
+
+    @property
+    def n_points(self) -> int:
+        return len(self.coordinates)
+
+    @property
+    def n_contours(self) -> int:
+        return len(self.end_pts)
+
+    def is_empty(self) -> bool:
+        return self.n_contours == 0
+
+    def get_bounds(self) -> tuple:
+        if self.bounds is None:
+            x_min, y_min = self.coordinates.min(axis=0)
+            x_max, y_max = self.coordinates.max(axis=0)
+            self.bounds = (x_min, y_min, x_max, y_max)
+        return self.bounds
+
+    @staticmethod
+    def get_bounds_batch(outlines: list) -> np.ndarray:
+        # (xMin, yMin, xMax, yMax) of each (non-empty) outline, as one array.
+        counts = [outline.n_points for outline in outlines]
+        starts = np.cumsum([0] + counts[:-1])
+        coordinates = np.concatenate([o.coordinates for o in outlines])
+        return np.hstack(
+            [
+                np.minimum.reduceat(coordinates, starts, axis=0),
+                np.maximum.reduceat(coordinates, starts, axis=0),
+            ]
+        )
+
+    def transform(self, t: Transform) -> 'Outline':
+        if t.is_identity():
+            return self
+        # Deltas are only scaled, and phantom points keep their deltas.
+        variations = {}
+        for key, deltas in self.variations.items():
+            variations[key] = deltas.copy()
+            variations[key][:-4] *= t.scale
+        return Outline(
+            self.coordinates * t.scale + (t.dx, t.dy),
+            self.flags,
+            self.end_pts,
+            variations=variations,
+        )
+
+    def to_glyph(self) -> Glyph:
+        glyph = Glyph()
+        if self.is_empty():
+            return glyph
+
+        # Round half up, as fontTools' otRound does. Rounding is monotonic,
+        # so the rounded bounds are the bounds of the rounded points.
+        rounded = np.floor(self.coordinates + 0.5)
+        coordinates = GlyphCoordinates()
+        coordinates.array.frombytes(rounded.tobytes())
+
+        glyph.numberOfContours = self.n_contours
+        glyph.coordinates = coordinates
+        glyph.flags = bytearray(self.flags.tobytes())
+        glyph.endPtsOfContours = self.end_pts.tolist()
+        glyph.program = ttProgram.Program()
+        glyph.program.fromBytecode(b"")
+
+        bounds = np.floor(np.array(self.get_bounds()) + 0.5).astype(int)
+        glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax = bounds.tolist()
+        return glyph
@@ -0,0 +1,937 @@
+import struct
+from io import BytesIO
+
+import numpy as np
+from fontTools.misc.lazyTools import LazyDict
+from fontTools.misc.psCharStrings import T2CharString, encodeIntT2
+from fontTools.ttLib import TTFont, getTableClass, newTable
+from fontTools.ttLib.sfnt import SFNTWriter
+from fontTools.ttLib.tables import otTables
+from fontTools.ttLib.tables.DefaultTable import DefaultTable
+from fontTools.ttLib.tables._f_v_a_r import Axis
+from fontTools.ttLib.tables._g_l_y_f import (
+    ARG_1_AND_2_ARE_WORDS,
+    MORE_COMPONENTS,
+    WE_HAVE_A_SCALE,
+    WE_HAVE_A_TWO_BY_TWO,
+    WE_HAVE_AN_X_AND_Y_SCALE,
+    Glyph,
+)
+from fontTools.ttLib.tables._g_v_a_r import compileGlyph_, table__g_v_a_r
+from fontTools.ttLib.ttFont import sortedTagList
+
+from double_fonts.CharStringOutline import CharStringOutline
+
+IDENTITY_SEGMENTS = {-1.0: -1.0, 0.0: 0.0, 1.0: 1.0}
+VARIATION_STORE_TABLES = ['HVAR', 'VVAR', 'MVAR', 'GDEF']
+
+
+class OutputFont:
+    # A copy-on-write font over a lazily loaded source font.
+    #
+    # The output reads from the source's open file, so tables that are never
+    # touched are written out as raw bytes, and the glyf and hmtx tables are
+    # shallow copies whose untouched glyphs stay undecompiled. Writing to
+    # the output never modifies the source, which can keep being read from.
+    #
+    # On save, only loaded tables are compiled. Untouched glyphs and metrics
+    # are copied from the source's glyf and hmtx data as they are.
+    #
+    # CFF and CFF2 fonts get their own copy of the source's table, whose
+    # untouched charstrings are written back as their compiled data.
+    def __init__(self, source: TTFont):
+        ttfont = TTFont(source.reader.file, recalcBBoxes=False, lazy=True)
+        glyph_order = list(source.getGlyphOrder())
+        ttfont.setGlyphOrder(glyph_order)
+
+        if 'glyf' in source:
+            source_glyf = source['glyf']
+            glyf = newTable('glyf')
+            glyf.glyphs = source_glyf.glyphs.copy()
+            glyf.glyphOrder = glyph_order
+            glyf.padding = source_glyf.padding
+            ttfont['glyf'] = glyf
+
+        hmtx = newTable('hmtx')
+        hmtx.metrics = dict(source['hmtx'].metrics)
+        ttfont['hmtx'] = hmtx
+
+        if 'gvar' in source:
+            # Unread glyph variations stay unread until the font is saved.
+            variations = source['gvar'].variations
+            gvar = newTable('gvar')
+            gvar.variations = LazyDict(
+                dict(getattr(variations, 'data', variations))
+            )
+            ttfont['gvar'] = gvar
+
+        self.ttfont = ttfont
+        self.modified_glyph_names = set()
+        self.updated_composite_names = set()
+        self.added_glyph_names = []
+        self.added_axis_tags = []
+        # The bounds of the charstrings set, which, unlike glyf data, do not
+        # have them.
+        self.charstring_bounds = {}
+
+    def set_glyph(
+        self,
+        glyph_name: str,
+        glyph: Glyph,
+        metrics: tuple,
+        variations: list = None,
+    ):
+        # glyph is compiled simple glyph data, as made by GlyphEngine, or an
+        # expanded composite glyph. variations are its gvar TupleVariations.
+        self.set_glyphs([glyph_name], [glyph], [metrics], [variations])
+
+    def set_glyphs(
+        self,
+        glyph_names: list,
+        glyphs: list,
+        metrics,
+        variations: list = None,
+    ):
+        # Sets many glyphs at once, with their (advance, lsb) metrics, as an
+        # (n, 2) array or a list of pairs. Only the metrics of these glyphs
+        # are touched, and the font-wide extremes are widened to cover them
+        # in one pass.
+        glyf = self.ttfont['glyf']
+        hmtx = self.ttfont['hmtx']
+        has_vmtx = 'vmtx' in self.ttfont
+        if has_vmtx:
+            previous_bounds = [
+                OutputFont.get_header_bounds(glyf, glyph_name)
+                for glyph_name in glyph_names
+            ]
+        metrics = [tuple(m) for m in np.asarray(metrics, dtype=int).tolist()]
+        for glyph_name, glyph, glyph_metrics in zip(
+            glyph_names, glyphs, metrics
+        ):
+            glyf[glyph_name] = glyph
+            hmtx[glyph_name] = glyph_metrics
+        if 'gvar' in self.ttfont:
+            gvar_variations = self.ttfont['gvar'].variations
+            for glyph_name, glyph_variations in zip(
+                glyph_names, variations or [None] * len(glyph_names)
+            ):
+                gvar_variations[glyph_name] = glyph_variations or []
+        self.modified_glyph_names.update(glyph_names)
+
+        simple_glyphs, simple_metrics = [], []
+        for glyph, glyph_metrics in zip(glyphs, metrics):
+            if hasattr(glyph, 'data') and glyph.data[:2] != b'\xff\xff':
+                simple_glyphs.append(glyph)
+                simple_metrics.append(glyph_metrics)
+            else:
+                self.update_extremes(glyph, glyph_metrics)
+        self.update_simple_extremes(simple_glyphs, simple_metrics)
+        if has_vmtx:
+            self.update_vertical_metrics(glyph_names, previous_bounds)
+
+    @staticmethod
+    def get_width_data(private, advance: int) -> bytes:
+        # A CFF charstring's width, which is its first argument, relative to
+        # the nominal width, or nothing for the default width.
+        if advance == private.defaultWidthX:
+            return b''
+        return encodeIntT2(advance - private.nominalWidthX)
+
+    def get_charstring_bounds(self, glyph_name: str) -> tuple:
+        # A charstring's bounds, rounded, or None for empty glyphs.
+        if glyph_name in self.charstring_bounds:
+            return self.charstring_bounds[glyph_name]
+        outline = CharStringOutline.from_charstring(
+            CharStringOutline.get_charstrings(self.ttfont)[glyph_name],
+            'CFF2' in self.ttfont,
+        )
+        if outline.is_empty():
+            return None
+        return tuple(
+            np.floor(np.array(outline.get_bounds()) + 0.5).astype(int).tolist()
+        )
+
+    def set_charstrings(
+        self,
+        glyph_names: list,
+        datas: list,
+        bounds_list: list,
+        metrics,
+        add_widths: bool = True,
+    ):
+        # set_glyphs for CFF and CFF2 fonts, from compiled charstring data,
+        # as made by CharStringEngine, with the glyphs' bounds. CFF widths
+        # are added to the data from the metrics, unless add_widths is
+        # False, for data that has them.
+        charstrings = CharStringOutline.get_charstrings(self.ttfont)
+        hmtx = self.ttfont['hmtx']
+        has_vmtx = 'vmtx' in self.ttfont
+        if has_vmtx:
+            previous_bounds = [
+                self.get_charstring_bounds(glyph_name)
+                for glyph_name in glyph_names
+            ]
+        add_widths = add_widths and 'CFF ' in self.ttfont
+        metrics = [tuple(m) for m in np.asarray(metrics, dtype=int).tolist()]
+        bounds = np.floor(
+            np.array(bounds_list, dtype=float).reshape(-1, 4) + 0.5
+        ).astype(int)
+        bounds_list = [tuple(glyph_bounds) for glyph_bounds in bounds.tolist()]
+        for glyph_name, data, glyph_bounds, glyph_metrics in zip(
+            glyph_names, datas, bounds_list, metrics
+        ):
+            # The glyph's private dict is that of its font dict, for
+            # CID-keyed fonts, which the double glyph keeps.
+            source_charstring = charstrings[glyph_name]
+            private = source_charstring.private
+            if add_widths:
+                data = (
+                    OutputFont.get_width_data(private, glyph_metrics[0]) + data
+                )
+            charstrings[glyph_name] = T2CharString(
+                bytecode=data,
+                private=private,
+                globalSubrs=source_charstring.globalSubrs,
+            )
+            hmtx[glyph_name] = glyph_metrics
+            self.charstring_bounds[glyph_name] = glyph_bounds
+        self.modified_glyph_names.update(glyph_names)
+        if not bounds_list:
+            return
+
+        self.update_bounds_extremes(bounds, metrics)
+        if has_vmtx:
+            self.update_vertical_metrics(
+                glyph_names, previous_bounds, bounds_list
+            )
+
+    @staticmethod
+    def get_axis_segments(ttfont: TTFont, axis_tag: str) -> dict:
+        if 'avar' not in ttfont:
+            return IDENTITY_SEGMENTS
+        return ttfont['avar'].segments.get(axis_tag) or IDENTITY_SEGMENTS
+
+    @staticmethod
+    def get_axis_key(ttfont: TTFont, axis: Axis) -> tuple:
+        # Fonts with the same key for an axis normalize it the same way.
+        return (
+            axis.minValue,
+            axis.defaultValue,
+            axis.maxValue,
+            sorted(OutputFont.get_axis_segments(ttfont, axis.axisTag).items()),
+        )
+
+    def merge_axes(self, source2: TTFont):
+        # Adds the secondary font's variation axes to the output. Axes that
+        # both fonts have must match, since their deltas are merged as is.
+        if 'fvar' not in source2:
+            return
+        if 'fvar' not in self.ttfont:
+            raise ValueError(
+                'The primary font must be variable if the secondary font is'
+            )
+        axes = {axis.axisTag: axis for axis in self.ttfont['fvar'].axes}
+        for axis2 in source2['fvar'].axes:
+            axis = axes.get(axis2.axisTag)
+            if axis is None:
+                self.add_axis(axis2, source2)
+                continue
+            if OutputFont.get_axis_key(
+                self.ttfont, axis
+            ) != OutputFont.get_axis_key(source2, axis2):
+                raise ValueError(
+                    f'The {axis.axisTag} axis differs between the fonts'
+                )
+
+    def add_axis(self, axis2: Axis, source2: TTFont):
+        # Appends an axis, on which the primary font does not vary.
+        axis_tag = axis2.axisTag
+        axis = Axis()
+        axis.axisTag = axis_tag
+        axis.flags = axis2.flags
+        axis.minValue = axis2.minValue
+        axis.defaultValue = axis2.defaultValue
+        axis.maxValue = axis2.maxValue
+        axis.axisNameID = self.ttfont['name'].addName(
+            source2['name'].getDebugName(axis2.axisNameID)
+        )
+        fvar = self.ttfont['fvar']
+        fvar.axes.append(axis)
+        self.added_axis_tags.append(axis_tag)
+        for instance in fvar.instances:
+            instance.coordinates[axis_tag] = axis.defaultValue
+
+        segments = OutputFont.get_axis_segments(source2, axis_tag)
+        if 'avar' in self.ttfont:
+            self.ttfont['avar'].segments[axis_tag] = dict(segments)
+        elif segments != IDENTITY_SEGMENTS:
+            avar = newTable('avar')
+            avar.segments = {
+                a.axisTag: dict(IDENTITY_SEGMENTS) for a in fvar.axes
+            }
+            avar.segments[axis_tag] = dict(segments)
+            self.ttfont['avar'] = avar
+
+        # Every region in the variation stores needs a value for each axis.
+        for tag in VARIATION_STORE_TABLES:
+            if tag not in self.ttfont:
+                continue
+            var_store = getattr(self.ttfont[tag].table, 'VarStore', None)
+            if var_store is None:
+                continue
+            region_list = var_store.VarRegionList
+            region_list.RegionAxisCount = len(fvar.axes)
+            for region in region_list.Region:
+                region_axis = otTables.VarRegionAxis()
+                region_axis.StartCoord = 0.0
+                region_axis.PeakCoord = 0.0
+                region_axis.EndCoord = 0.0
+                region.VarRegionAxis.append(region_axis)
+
+        if 'STAT' in self.ttfont:
+            stat = self.ttfont['STAT'].table
+            if stat.DesignAxisRecord is None:
+                stat.DesignAxisRecord = otTables.AxisRecordArray()
+                stat.DesignAxisRecord.Axis = []
+            design_axes = stat.DesignAxisRecord.Axis
+            if axis_tag not in [a.AxisTag for a in design_axes]:
+                axis_record = otTables.AxisRecord()
+                axis_record.AxisTag = axis_tag
+                axis_record.AxisNameID = axis.axisNameID
+                axis_record.AxisOrdering = len(design_axes)
+                design_axes.append(axis_record)
+                stat.DesignAxisCount = len(design_axes)
+
+    def prepare_to_add_glyphs(self):
+        # Tables decoded against the number of glyphs must be loaded before
+        # it changes. Tables with per-glyph device data are dropped.
+        if 'gvar' in self.ttfont:
+            raise ValueError('Cannot add glyphs to a variable font')
+        for tag in ['post', 'vmtx']:
+            if tag in self.ttfont:
+                self.ttfont[tag]
+        for tag in ['hdmx', 'LTSH']:
+            if tag in self.ttfont:
+                del self.ttfont[tag]
+
+    def add_glyph(self, glyph_name: str, glyph: Glyph, metrics: tuple):
+        # Appends a glyph to the glyph order. New glyphs are only used as
+        # components, so they have no vertical metrics of their own.
+        if glyph_name in self.ttfont['glyf'].glyphs:
+            raise ValueError(f'Glyph {glyph_name} already exists')
+        if not self.added_glyph_names:
+            self.prepare_to_add_glyphs()
+        self.ttfont['glyf'][glyph_name] = glyph
+        self.ttfont['hmtx'][glyph_name] = metrics
+        if 'vmtx' in self.ttfont:
+            self.ttfont['vmtx'][glyph_name] = (0, 0)
+        self.added_glyph_names.append(glyph_name)
+        self.update_extremes(glyph, metrics)
+
+    @staticmethod
+    def read_simple_glyph_header(data: bytes) -> tuple:
+        # (numberOfContours, number of points, xMin, yMin, xMax, yMax) of
+        # compiled simple glyph data, read without expanding it.
+        n_contours, x_min, y_min, x_max, y_max = struct.unpack(
+            '>hhhhh', data[:10]
+        )
+        (last_end_pt,) = struct.unpack(
+            '>H', data[8 + 2 * n_contours : 10 + 2 * n_contours]
+        )
+        return (n_contours, last_end_pt + 1, x_min, y_min, x_max, y_max)
+
+    @staticmethod
+    def get_component_names(glyf, glyph_name: str) -> list:
+        # The names of a composite glyph's components, read without
+        # expanding it, or [] for other glyphs.
+        glyph = glyf.glyphs[glyph_name]
+        if not hasattr(glyph, 'data'):
+            if not glyph.isComposite():
+                return []
+            return [component.glyphName for component in glyph.components]
+        return [
+            glyf.getGlyphName(glyph_id)
+            for glyph_id in OutputFont.get_component_ids(glyph.data)
+        ]
+
+    @staticmethod
+    def get_component_ids(data: bytes) -> list:
+        # The glyph ids of the components in a glyph's raw glyf data, or []
+        # if it is not a composite glyph.
+        if data[:2] != b'\xff\xff':
+            return []
+
+        glyph_ids = []
+        offset = 10
+        while True:
+            flags, glyph_id = struct.unpack('>HH', data[offset : offset + 4])
+            glyph_ids.append(glyph_id)
+            offset += 8 if flags & ARG_1_AND_2_ARE_WORDS else 6
+            if flags & WE_HAVE_A_SCALE:
+                offset += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                offset += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                offset += 8
+            if not flags & MORE_COMPONENTS:
+                return glyph_ids
+
+    @staticmethod
+    def copy_glyph(glyf, glyph_name: str) -> Glyph:
+        # An expanded private copy of a glyph, leaving the shared one as is.
+        glyph = glyf.glyphs[glyph_name]
+        if hasattr(glyph, 'data'):
+            data = glyph.data
+        else:
+            data = glyph.compile(glyf, recalcBBoxes=False)
+        glyph = Glyph(data)
+        glyph.expand(glyf)
+        return glyph
+
+    def get_maxp_values(self, glyph: Glyph) -> tuple:
+        # (number of points, number of contours, component depth), like
+        # Glyph.getCompositeMaxpValues, but without expanding the shared
+        # glyphs, which would then have to be recompiled on save.
+        glyf = self.ttfont['glyf']
+        if hasattr(glyph, 'data') and glyph.data[:2] != b'\xff\xff':
+            n_contours, n_points, *_ = OutputFont.read_simple_glyph_header(
+                glyph.data
+            )
+            return (n_points, n_contours, 0)
+        if hasattr(glyph, 'data'):
+            glyph = Glyph(glyph.data)
+            glyph.expand(glyf)
+        if glyph.numberOfContours == 0:
+            return (0, 0, 0)
+        if not glyph.isComposite():
+            return (len(glyph.coordinates), glyph.numberOfContours, 0)
+
+        n_points, n_contours, depth = 0, 0, 0
+        for component in glyph.components:
+            (
+                component_n_points,
+                component_n_contours,
+                component_depth,
+            ) = self.get_maxp_values(glyf.glyphs[component.glyphName])
+            n_points += component_n_points
+            n_contours += component_n_contours
+            depth = max(depth, component_depth)
+        return (n_points, n_contours, depth + 1)
+
+    def update_extremes(self, glyph: Glyph, metrics: tuple):
+        # Bounding boxes are not recalculated on save, since that would
+        # decompile every glyph in the font. Instead, the font-wide values
+        # are widened to cover each new glyph, and, for glyf fonts, those
+        # of head, hhea and vhea are recalculated on save from the glyphs'
+        # headers by update_font_extremes.
+        maxp = self.ttfont['maxp']
+        glyf = self.ttfont['glyf']
+        if hasattr(glyph, 'data') and glyph.data[:2] == b'\xff\xff':
+            glyph = Glyph(glyph.data)
+            glyph.expand(glyf)
+        if hasattr(glyph, 'data'):
+            (
+                n_contours,
+                n_points,
+                x_min,
+                y_min,
+                x_max,
+                y_max,
+            ) = OutputFont.read_simple_glyph_header(glyph.data)
+            maxp.maxPoints = max(maxp.maxPoints, n_points)
+            maxp.maxContours = max(maxp.maxContours, n_contours)
+        elif glyph.isComposite():
+            n_points, n_contours, depth = self.get_maxp_values(glyph)
+            maxp.maxCompositePoints = max(maxp.maxCompositePoints, n_points)
+            maxp.maxCompositeContours = max(
+                maxp.maxCompositeContours, n_contours
+            )
+            maxp.maxComponentElements = max(
+                maxp.maxComponentElements, len(glyph.components)
+            )
+            maxp.maxComponentDepth = max(maxp.maxComponentDepth, depth)
+            x_min, y_min = glyph.xMin, glyph.yMin
+            x_max, y_max = glyph.xMax, glyph.yMax
+        else:
+            return
+
+        head = self.ttfont['head']
+        head.xMin = min(head.xMin, x_min)
+        head.yMin = min(head.yMin, y_min)
+        head.xMax = max(head.xMax, x_max)
+        head.yMax = max(head.yMax, y_max)
+
+        advance, lsb = metrics
+        hhea = self.ttfont['hhea']
+        hhea.advanceWidthMax = max(hhea.advanceWidthMax, advance)
+        hhea.minLeftSideBearing = min(hhea.minLeftSideBearing, lsb)
+        hhea.minRightSideBearing = min(
+            hhea.minRightSideBearing, advance - (lsb + x_max - x_min)
+        )
+        hhea.xMaxExtent = max(hhea.xMaxExtent, lsb + x_max - x_min)
+
+    def update_simple_extremes(self, glyphs: list, metrics: list):
+        # update_extremes for many compiled simple glyphs, from their
+        # headers, with the font-wide values reduced over all of them.
+        if not glyphs:
+            return
+        headers = np.array(
+            [
+                OutputFont.read_simple_glyph_header(glyph.data)
+                for glyph in glyphs
+            ]
+        )
+        n_contours, n_points = headers[:, 0], headers[:, 1]
+        maxp = self.ttfont['maxp']
+        maxp.maxPoints = max(maxp.maxPoints, int(n_points.max()))
+        maxp.maxContours = max(maxp.maxContours, int(n_contours.max()))
+        self.update_bounds_extremes(headers[:, 2:], metrics)
+
+    def update_bounds_extremes(self, bounds: np.ndarray, metrics: list):
+        # The font-wide values, widened to cover glyphs with these (n, 4)
+        # bounds and metrics, including CFF's font bounding box.
+        x_min, y_min, x_max, y_max = bounds.T
+        advance, lsb = np.array(metrics).T
+
+        head = self.ttfont['head']
+        head.xMin = min(head.xMin, int(x_min.min()))
+        head.yMin = min(head.yMin, int(y_min.min()))
+        head.xMax = max(head.xMax, int(x_max.max()))
+        head.yMax = max(head.yMax, int(y_max.max()))
+        tag = CharStringOutline.get_table_tag(self.ttfont)
+        if tag is not None:
+            top_dict = self.ttfont[tag].cff.topDictIndex[0]
+            top_dict.FontBBox = [head.xMin, head.yMin, head.xMax, head.yMax]
+
+        hhea = self.ttfont['hhea']
+        hhea.advanceWidthMax = max(hhea.advanceWidthMax, int(advance.max()))
+        hhea.minLeftSideBearing = min(hhea.minLeftSideBearing, int(lsb.min()))
+        hhea.minRightSideBearing = min(
+            hhea.minRightSideBearing,
+            int((advance - (lsb + x_max - x_min)).min()),
+        )
+        hhea.xMaxExtent = max(
+            hhea.xMaxExtent, int((lsb + x_max - x_min).max())
+        )
+
+    def update_vertical_metrics(
+        self,
+        glyph_names: list,
+        previous_bounds: list,
+        bounds_list: list = None,
+    ):
+        # Keeps the vertical origin of each glyph, top side bearing + yMax,
+        # where it was, and widens vhea's extremes to cover the new bounds,
+        # which are read from glyf if not given.
+        if bounds_list is None:
+            glyf = self.ttfont['glyf']
+            bounds_list = [
+                OutputFont.get_header_bounds(glyf, glyph_name)
+                for glyph_name in glyph_names
+            ]
+        vmtx = self.ttfont['vmtx']
+        rows = []
+        for glyph_name, previous, bounds in zip(
+            glyph_names, previous_bounds, bounds_list
+        ):
+            if bounds is None:
+                continue
+            advance, tsb = vmtx[glyph_name]
+            if previous is not None:
+                tsb += previous[3] - bounds[3]
+                vmtx[glyph_name] = (advance, tsb)
+            rows.append((advance, tsb, bounds[1], bounds[3]))
+        if not rows or 'vhea' not in self.ttfont:
+            return
+
+        advance, tsb, y_min, y_max = np.array(rows).T
+        vhea = self.ttfont['vhea']
+        vhea.advanceHeightMax = max(vhea.advanceHeightMax, int(advance.max()))
+        vhea.minTopSideBearing = min(vhea.minTopSideBearing, int(tsb.min()))
+        vhea.minBottomSideBearing = min(
+            vhea.minBottomSideBearing,
+            int((advance - tsb - (y_max - y_min)).min()),
+        )
+        vhea.yMaxExtent = max(
+            vhea.yMaxExtent, int((tsb + y_max - y_min).max())
+        )
+
+    def get_affected_composites(self) -> dict:
+        # Composite glyphs that reference a modified glyph, directly or
+        # through other composites, as private copies. Only the affected
+        # composites are decompiled.
+        glyf = self.ttfont['glyf']
+        component_names = {}
+        for glyph_name in glyf.glyphs:
+            if glyph_name in self.modified_glyph_names:
+                continue
+            names = OutputFont.get_component_names(glyf, glyph_name)
+            if names:
+                component_names[glyph_name] = set(names)
+
+        affected = {}
+        changed = set(self.modified_glyph_names)
+        while True:
+            new_affected = [
+                glyph_name
+                for glyph_name, names in component_names.items()
+                if glyph_name not in affected and names & changed
+            ]
+            if not new_affected:
+                return affected
+            for glyph_name in new_affected:
+                affected[glyph_name] = OutputFont.copy_glyph(glyf, glyph_name)
+            changed.update(new_affected)
+
+    @staticmethod
+    def get_header_bounds(glyf, glyph_name: str) -> tuple:
+        # The bounds in the glyph's header, read without expanding it, or
+        # None for empty glyphs.
+        glyph = glyf.glyphs[glyph_name]
+        if hasattr(glyph, 'data'):
+            n_contours, x_min, y_min, x_max, y_max = struct.unpack(
+                '>hhhhh', glyph.data[:10]
+            )
+        else:
+            n_contours = glyph.numberOfContours
+            if n_contours != 0:
+                x_min, y_min = glyph.xMin, glyph.yMin
+                x_max, y_max = glyph.xMax, glyph.yMax
+        if n_contours == 0:
+            return None
+        return (x_min, y_min, x_max, y_max)
+
+    @staticmethod
+    def get_composite_bounds(glyf, glyph: Glyph) -> tuple:
+        # The bounds of a composite whose components are only offset, from
+        # the components' headers, or None if they have to be recalculated
+        # from the points.
+        bounds = None
+        for component in glyph.components:
+            if hasattr(component, 'transform') or not hasattr(component, 'x'):
+                return None
+            component_bounds = OutputFont.get_header_bounds(
+                glyf, component.glyphName
+            )
+            if component_bounds is None:
+                continue
+            x_min, y_min, x_max, y_max = component_bounds
+            x_min, x_max = x_min + component.x, x_max + component.x
+            y_min, y_max = y_min + component.y, y_max + component.y
+            if bounds is not None:
+                x_min, y_min = min(bounds[0], x_min), min(bounds[1], y_min)
+                x_max, y_max = max(bounds[2], x_max), max(bounds[3], y_max)
+            bounds = (x_min, y_min, x_max, y_max)
+        return bounds
+
+    def update_composite(self, glyph_name: str, affected: dict):
+        # Components that are themselves affected are updated first, so that
+        # their headers are current.
+        glyf = self.ttfont['glyf']
+        glyph = affected.pop(glyph_name)
+        for component in glyph.components:
+            if component.glyphName in affected:
+                self.update_composite(component.glyphName, affected)
+
+        glyph = Glyph(glyph.compile(glyf, recalcBBoxes=False))
+        glyph.expand(glyf)
+        bounds = OutputFont.get_composite_bounds(glyf, glyph)
+        if bounds is None:
+            glyph.recalcBounds(glyf)
+        else:
+            glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax = bounds
+        previous_bounds = OutputFont.get_header_bounds(glyf, glyph_name)
+        glyf.glyphs[glyph_name] = glyph
+        self.updated_composite_names.add(glyph_name)
+        # Its left side bearing is its new xMin, as for other glyphs.
+        hmtx = self.ttfont['hmtx']
+        advance, _ = hmtx[glyph_name]
+        hmtx[glyph_name] = (advance, glyph.xMin)
+        self.update_extremes(glyph, hmtx[glyph_name])
+        if 'vmtx' in self.ttfont:
+            self.update_vertical_metrics([glyph_name], [previous_bounds])
+
+    def update_composites(self):
+        affected = self.get_affected_composites()
+        while affected:
+            self.update_composite(next(iter(affected)), affected)
+
+    def get_all_header_bounds(self) -> tuple:
+        # The names of the glyphs with outlines, and their (n, 4) bounds, as
+        # in their headers. Unchanged glyphs are read from the source's glyf
+        # data, without being decompiled.
+        glyf = self.ttfont['glyf']
+        source_glyph_datas = self.get_source_glyph_datas()
+        changed_glyph_names = self.get_changed_glyph_names()
+        glyph_names, bounds = [], []
+        for glyph_id, glyph_name in enumerate(glyf.glyphOrder):
+            if glyph_name in changed_glyph_names:
+                glyph_bounds = OutputFont.get_header_bounds(glyf, glyph_name)
+            else:
+                data = source_glyph_datas[glyph_id]
+                glyph_bounds = (
+                    struct.unpack('>hhhh', data[2:10]) if data else None
+                )
+            if glyph_bounds is not None:
+                glyph_names.append(glyph_name)
+                bounds.append(glyph_bounds)
+        return glyph_names, np.array(bounds, dtype=int).reshape(-1, 4)
+
+    def update_font_extremes(self):
+        # head's bounds, and hhea's and vhea's extremes, recalculated over
+        # all glyphs, so that they shrink as well as grow when the glyphs
+        # at the extremes change.
+        glyph_names, bounds = self.get_all_header_bounds()
+        hmtx = self.ttfont['hmtx']
+        hhea = self.ttfont['hhea']
+        hhea.advanceWidthMax = max(
+            advance for advance, _ in hmtx.metrics.values()
+        )
+        if not glyph_names:
+            return
+        x_min, y_min, x_max, y_max = bounds.T
+        head = self.ttfont['head']
+        head.xMin, head.yMin = int(x_min.min()), int(y_min.min())
+        head.xMax, head.yMax = int(x_max.max()), int(y_max.max())
+
+        advance, lsb = np.array(
+            [hmtx[glyph_name] for glyph_name in glyph_names]
+        ).T
+        hhea.minLeftSideBearing = int(lsb.min())
+        hhea.minRightSideBearing = int(
+            (advance - (lsb + x_max - x_min)).min()
+        )
+        hhea.xMaxExtent = int((lsb + x_max - x_min).max())
+
+        if 'vmtx' not in self.ttfont or 'vhea' not in self.ttfont:
+            return
+        vmtx = self.ttfont['vmtx']
+        vhea = self.ttfont['vhea']
+        vhea.advanceHeightMax = max(
+            advance for advance, _ in vmtx.metrics.values()
+        )
+        advance, tsb = np.array(
+            [vmtx[glyph_name] for glyph_name in glyph_names]
+        ).T
+        vhea.minTopSideBearing = int(tsb.min())
+        vhea.minBottomSideBearing = int(
+            (advance - (tsb + y_max - y_min)).min()
+        )
+        vhea.yMaxExtent = int((tsb + y_max - y_min).max())
+
+    def compile_gvar(self) -> bytes:
+        # Compiles gvar with the source's shared tuples, copying the data of
+        # unchanged glyphs, so that only changed glyphs are decompiled. This
+        # needs the source's axes, so is not used once axes are added.
+        data = self.ttfont.reader['gvar']
+        (
+            version,
+            reserved,
+            axis_count,
+            shared_tuple_count,
+            offset_to_shared_tuples,
+            glyph_count,
+            flags,
+            offset_to_data,
+        ) = struct.unpack('>HHHHLHHL', data[:20])
+        offsets = table__g_v_a_r.decompileOffsets_(
+            data[20:], tableFormat=flags & 1, glyphCount=glyph_count
+        )
+        shared_tuple_size = 2 * axis_count
+        shared_tuples = data[
+            offset_to_shared_tuples : offset_to_shared_tuples
+            + shared_tuple_count * shared_tuple_size
+        ]
+        shared_tuple_indices = {
+            shared_tuples[i * shared_tuple_size : (i + 1) * shared_tuple_size]: i
+            for i in range(shared_tuple_count)
+        }
+
+        axis_tags = [axis.axisTag for axis in self.ttfont['fvar'].axes]
+        variations = self.ttfont['gvar'].variations
+        glyph_order = self.ttfont.getGlyphOrder()
+        assert len(glyph_order) == glyph_count
+        glyphs = []
+        for glyph_id, glyph_name in enumerate(glyph_order):
+            if glyph_name in self.modified_glyph_names:
+                glyphs.append(
+                    compileGlyph_(
+                        2,
+                        variations[glyph_name],
+                        0,
+                        axis_tags,
+                        shared_tuple_indices,
+                    )
+                )
+            else:
+                glyphs.append(
+                    data[
+                        offset_to_data
+                        + offsets[glyph_id] : offset_to_data
+                        + offsets[glyph_id + 1]
+                    ]
+                )
+
+        new_offsets = [0]
+        for glyph in glyphs:
+            new_offsets.append(new_offsets[-1] + len(glyph))
+        compiled_offsets, table_format = table__g_v_a_r.compileOffsets_(
+            new_offsets
+        )
+        offset_to_shared_tuples = 20 + len(compiled_offsets)
+        header = struct.pack(
+            '>HHHHLHHL',
+            version,
+            reserved,
+            axis_count,
+            shared_tuple_count,
+            offset_to_shared_tuples,
+            glyph_count,
+            (flags & ~1) | table_format,
+            offset_to_shared_tuples + len(shared_tuples),
+        )
+        return b''.join([header, compiled_offsets, shared_tuples] + glyphs)
+
+    def get_source_glyph_datas(self) -> list:
+        # The data of each of the source's glyphs, as sliced from its glyf
+        # table by its loca table.
+        reader = self.ttfont.reader
+        glyf_data = reader['glyf']
+        (index_to_loc_format,) = struct.unpack('>h', reader['head'][50:52])
+        if index_to_loc_format == 0:
+            locations = np.frombuffer(reader['loca'], dtype='>u2') * 2
+        else:
+            locations = np.frombuffer(reader['loca'], dtype='>u4')
+        locations = locations.tolist()
+        return [
+            glyf_data[start:end]
+            for start, end in zip(locations[:-1], locations[1:])
+        ]
+
+    def get_changed_glyph_names(self) -> set:
+        return (
+            self.modified_glyph_names
+            | self.updated_composite_names
+            | set(self.added_glyph_names)
+        )
+
+    def compile_glyf(self) -> tuple:
+        # The glyf and loca data, as glyf.compile makes them, but with only
+        # the changed glyphs compiled.
+        glyf = self.ttfont['glyf']
+        source_glyph_datas = self.get_source_glyph_datas()
+        changed_glyph_names = self.get_changed_glyph_names()
+        padding = glyf.padding
+        glyph_datas = []
+        for glyph_id, glyph_name in enumerate(glyf.glyphOrder):
+            if glyph_name in changed_glyph_names:
+                glyph_data = glyf.glyphs[glyph_name].compile(
+                    glyf, recalcBBoxes=False
+                )
+            else:
+                glyph_data = source_glyph_datas[glyph_id]
+            if padding > 1 and len(glyph_data) % padding:
+                glyph_data += b'\0' * (padding - len(glyph_data) % padding)
+            glyph_datas.append(glyph_data)
+
+        # Odd glyphs are padded, if that lets loca use short offsets.
+        lengths = [len(glyph_data) for glyph_data in glyph_datas]
+        n_odd = sum(length % 2 for length in lengths)
+        if padding == 1 and n_odd and sum(lengths) + n_odd < 0x20000:
+            glyph_datas = [
+                glyph_data + b'\0' if len(glyph_data) % 2 else glyph_data
+                for glyph_data in glyph_datas
+            ]
+            lengths = [len(glyph_data) for glyph_data in glyph_datas]
+
+        loca = newTable('loca')
+        loca.set([0] + np.cumsum(lengths).tolist())
+        self.ttfont['maxp'].numGlyphs = len(glyph_datas)
+        return b''.join(glyph_datas) or b'\0', loca.compile(self.ttfont)
+
+    def compile_hmtx(self) -> bytes:
+        # Writes the changed metrics over the source's hmtx data, or returns
+        # None if the table needs to be compiled in full, since its number
+        # of metrics could change.
+        hmtx = self.ttfont['hmtx']
+        if self.added_glyph_names:
+            return None
+        data = bytearray(self.ttfont.reader['hmtx'])
+        n_metrics = self.ttfont['hhea'].numberOfHMetrics
+        (last_advance,) = struct.unpack(
+            '>H', data[4 * (n_metrics - 1) : 4 * n_metrics - 2]
+        )
+        glyph_ids = self.ttfont.getReverseGlyphMap()
+        for glyph_name in (
+            self.modified_glyph_names | self.updated_composite_names
+        ):
+            advance, lsb = hmtx[glyph_name]
+            glyph_id = glyph_ids[glyph_name]
+            if advance < 0:
+                return None
+            if glyph_id < n_metrics:
+                struct.pack_into('>Hh', data, 4 * glyph_id, advance, lsb)
+            elif advance == last_advance:
+                struct.pack_into(
+                    '>h', data, 4 * n_metrics + 2 * (glyph_id - n_metrics), lsb
+                )
+            else:
+                return None
+        return bytes(data)
+
+    def compile_table(self, tag: str, table_datas: dict):
+        # Compiles the tables that a table depends on first, as TTFont.save
+        # does. Tables that were never loaded are copied as they are.
+        if tag in table_datas:
+            return
+        for dependency in getTableClass(tag).dependencies:
+            if dependency in self.ttfont:
+                self.compile_table(dependency, table_datas)
+        if tag in table_datas:
+            return
+
+        if tag in ['glyf', 'loca']:
+            table_datas['glyf'], table_datas['loca'] = self.compile_glyf()
+            return
+        data = self.compile_hmtx() if tag == 'hmtx' else None
+        if data is None:
+            if self.ttfont.isLoaded(tag):
+                data = self.ttfont[tag].compile(self.ttfont)
+            else:
+                data = self.ttfont.reader[tag]
+        table_datas[tag] = data
+
+    def compile(self) -> bytes:
+        if 'glyf' in self.ttfont:
+            self.update_composites()
+            self.update_font_extremes()
+        if 'gvar' in self.ttfont and not self.added_axis_tags:
+            gvar = DefaultTable('gvar')
+            gvar.data = self.compile_gvar()
+            self.ttfont['gvar'] = gvar
+        if self.added_glyph_names:
+            # Resets the font's reverse glyph map, which glyf extends itself.
+            self.ttfont.setGlyphOrder(self.ttfont['glyf'].glyphOrder)
+
+        # head is loaded, so that its modified time is updated.
+        self.ttfont['head']
+        table_datas = {}
+        for tag in self.ttfont.keys():
+            if tag != 'GlyphOrder':
+                self.compile_table(tag, table_datas)
+
+        # Tables are written in the recommended order, with their checksums
+        # and offsets, and head's checkSumAdjustment, recalculated.
+        font_data = BytesIO()
+        tags = sortedTagList(list(table_datas))
+        writer = SFNTWriter(font_data, len(tags), self.ttfont.sfntVersion)
+        for tag in tags:
+            # Tables copied as they are may be views of a memory map.
+            writer[tag] = bytes(table_datas[tag])
+        writer.close()
+        return font_data.getvalue()
+
+    def save(self, output_path: str):
+        font_data = self.compile()
+        with open(output_path, 'wb') as fout:
+            fout.write(font_data)
@@ -0,0 +1,247 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pathops
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+
+from double_fonts.Outline import Outline
+
+# How far, in font units, a point can be from the point before it, or from
+# the line between its neighbours, and still be dropped.
+POINT_TOLERANCE = 0.5
+# How much, in square font units, merging must shrink a glyph's area for
+# its contours to count as overlapping, rather than only as rewritten.
+AREA_TOLERANCE = 1.0
+# The glyf flag of on-curve points.
+FLAG_ON_CURVE = 0x01
+
+
+class OverlapRemover:
+    # Merges the overlapping contours of double glyphs, whose layers are
+    # drawn over each other, with skia-pathops, and then drops the points
+    # that are redundant: duplicates of the point before, on-curve points
+    # on the line between their neighbours, and on-curve points that the
+    # off-curve points around them imply.
+    #
+    # Contours are merged glyph by glyph, since that is what pathops does.
+    # Redundant points are found for all glyphs at once, in a few
+    # vectorized passes over their points laid out back to back, as
+    # GlyphEngine lays them out.
+    def __init__(self):
+        self.n_glyphs = 0
+        self.n_merged_glyphs = 0
+        self.n_failed_glyphs = 0
+        self.n_points_before = 0
+        self.n_points_after = 0
+        self.n_bytes_before = 0
+        self.n_bytes_after = 0
+
+    @staticmethod
+    def get_key() -> str:
+        # Identifies the removal, for content hashes.
+        return f'OverlapRemover{POINT_TOLERANCE}'
+
+    @staticmethod
+    def from_data(data: bytes) -> Outline:
+        glyph = Glyph(data)
+        glyph.expand(None)
+        return Outline.from_glyph(glyph, None)
+
+    def merge_overlaps(self, outline: Outline) -> Outline:
+        # The outline with its overlapping contours merged, or as it is if
+        # none overlap, or if pathops cannot merge them, or merges them into
+        # nothing.
+        #
+        # Contours overlap if merging shrinks their area, which counts the
+        # area of each overlap twice. pathops rewrites contours that do not
+        # overlap too, e.g. it splits their curves, which are kept as they
+        # are.
+        path = pathops.Path()
+        outline.to_glyph().draw(path.getPen(), None)
+        try:
+            merged_path = pathops.simplify(path, clockwise=path.clockwise)
+        except pathops.PathOpsError:
+            self.n_failed_glyphs += 1
+            return outline
+        if path.area - merged_path.area <= AREA_TOLERANCE:
+            return outline
+        pen = TTGlyphPen(None)
+        merged_path.draw(pen)
+        merged_outline = Outline.from_glyph(
+            pen.glyph(dropImpliedOnCurves=True), None
+        )
+        if merged_outline.is_empty():
+            self.n_failed_glyphs += 1
+            return outline
+        self.n_merged_glyphs += 1
+        return merged_outline
+
+    @staticmethod
+    def get_neighbours(end_pts: np.ndarray, n_points: int) -> tuple:
+        # The index of the point before and after each point, within its
+        # contour, which is closed.
+        starts = np.concatenate([[0], end_pts[:-1] + 1])
+        indices = np.arange(n_points)
+        previous = indices - 1
+        previous[starts] = end_pts
+        following = indices + 1
+        following[end_pts] = starts
+        return previous, following
+
+    @staticmethod
+    def get_redundant_points(
+        coordinates: np.ndarray, flags: np.ndarray, end_pts: np.ndarray
+    ) -> np.ndarray:
+        # A mask of the points that can be dropped together: of each run of
+        # redundant points, the first, so that each point dropped is judged
+        # against neighbours that are kept. Contours keep three points.
+        n_points = len(coordinates)
+        previous, following = OverlapRemover.get_neighbours(end_pts, n_points)
+        on_curve = (flags & FLAG_ON_CURVE).astype(bool)
+        on_curve_neighbours = on_curve[previous] & on_curve[following]
+
+        # On-curve duplicates of the point before, and off-curve points at
+        # either end of their curve, which is then a line.
+        to_previous = coordinates - coordinates[previous]
+        to_following = coordinates[following] - coordinates
+        is_duplicate = np.hypot(*to_previous.T) <= POINT_TOLERANCE
+        is_redundant = (is_duplicate & on_curve & on_curve[previous]) | (
+            ~on_curve
+            & on_curve_neighbours
+            & (is_duplicate | (np.hypot(*to_following.T) <= POINT_TOLERANCE))
+        )
+
+        # On-curve points between on-curve neighbours, within the tolerance
+        # of the line between them, and between them along it.
+        chords = coordinates[following] - coordinates[previous]
+        chord_lengths = np.hypot(*chords.T)
+        cross = (
+            chords[:, 0] * to_previous[:, 1] - chords[:, 1] * to_previous[:, 0]
+        )
+        along = (to_previous * chords).sum(axis=1)
+        is_redundant |= (
+            on_curve
+            & on_curve_neighbours
+            & (chord_lengths > 0)
+            & (np.abs(cross) <= POINT_TOLERANCE * chord_lengths)
+            & (along >= 0)
+            & (along <= chord_lengths**2)
+        )
+
+        # On-curve points between off-curve neighbours, at their midpoint,
+        # as TrueType implies them. pathops writes each curve with its own
+        # on-curve points, which rounding moves off the midpoint.
+        midpoints = (coordinates[previous] + coordinates[following]) / 2
+        is_redundant |= (
+            on_curve
+            & ~on_curve[previous]
+            & ~on_curve[following]
+            & (np.hypot(*(coordinates - midpoints).T) <= POINT_TOLERANCE)
+        )
+
+        is_redundant &= ~is_redundant[previous]
+        contour_sizes = np.diff(np.concatenate([[-1], end_pts]))
+        contour_ids = np.repeat(np.arange(len(end_pts)), contour_sizes)
+        n_dropped = np.bincount(
+            contour_ids, weights=is_redundant, minlength=len(end_pts)
+        )
+        is_redundant &= (contour_sizes - n_dropped >= 3)[contour_ids]
+        return is_redundant
+
+    @staticmethod
+    def drop_points(outlines: list, is_redundant: np.ndarray) -> list:
+        # The outlines without the points masked, which are laid out back
+        # to back.
+        outlines_kept = []
+        start = 0
+        for outline in outlines:
+            end = start + outline.n_points
+            is_kept = ~is_redundant[start:end]
+            n_dropped_before = np.cumsum(~is_kept)
+            outlines_kept.append(
+                Outline(
+                    outline.coordinates[is_kept],
+                    outline.flags[is_kept],
+                    outline.end_pts - n_dropped_before[outline.end_pts],
+                )
+            )
+            start = end
+        return outlines_kept
+
+    @staticmethod
+    def reduce_points(outlines: list) -> list:
+        # The outlines without their redundant points, found in passes over
+        # all of them, until a pass finds none.
+        while outlines:
+            coordinates = np.concatenate([o.coordinates for o in outlines])
+            flags = np.concatenate([o.flags for o in outlines])
+            starts = np.cumsum([0] + [o.n_points for o in outlines[:-1]])
+            end_pts = np.concatenate(
+                [o.end_pts + start for o, start in zip(outlines, starts)]
+            )
+            is_redundant = OverlapRemover.get_redundant_points(
+                coordinates, flags, end_pts
+            )
+            if not is_redundant.any():
+                break
+            outlines = OverlapRemover.drop_points(outlines, is_redundant)
+        return outlines
+
+    def remove_overlaps(self, glyphs: list) -> list:
+        # Each of GlyphEngine's compiled glyphs, (data, bounds, variations),
+        # merged and reduced, with its new bounds. Glyphs have no variations,
+        # since merged contours do not interpolate.
+        outlines = [OverlapRemover.from_data(data) for data, _, _ in glyphs]
+        self.n_points_before += sum(outline.n_points for outline in outlines)
+        outlines = OverlapRemover.reduce_points(
+            [self.merge_overlaps(outline) for outline in outlines]
+        )
+        reduced_glyphs = []
+        for (data, _, variations), outline in zip(glyphs, outlines):
+            reduced_data = outline.to_glyph().compile(
+                None, recalcBBoxes=False
+            )
+            reduced_glyphs.append(
+                (reduced_data, outline.get_bounds(), variations)
+            )
+            self.n_bytes_before += len(data)
+            self.n_bytes_after += len(reduced_data)
+        self.n_glyphs += len(glyphs)
+        self.n_points_after += sum(outline.n_points for outline in outlines)
+        return reduced_glyphs
+
+    @staticmethod
+    def remove_overlaps_in_worker(glyphs: list) -> tuple:
+        remover = OverlapRemover()
+        return remover.remove_overlaps(glyphs), vars(remover)
+
+    def remove_overlaps_parallel(self, glyphs: list, jobs: int) -> list:
+        # remove_overlaps in chunks, in a process pool, as GlyphEngine
+        # composes them, since pathops merges one glyph at a time. Each
+        # chunk's points are reduced in its own batch.
+        if jobs <= 1 or len(glyphs) < 2:
+            return self.remove_overlaps(glyphs)
+        chunk_size = math.ceil(len(glyphs) / (jobs * 4))
+        reduced_glyphs = []
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for chunk_glyphs, counts in executor.map(
+                OverlapRemover.remove_overlaps_in_worker,
+                [
+                    glyphs[i : i + chunk_size]
+                    for i in range(0, len(glyphs), chunk_size)
+                ],
+            ):
+                reduced_glyphs.extend(chunk_glyphs)
+                for name, count in counts.items():
+                    setattr(self, name, getattr(self, name) + count)
+        return reduced_glyphs
+
+    def get_stats(self) -> dict:
+        return dict(
+            n_merged_glyphs=self.n_merged_glyphs,
+            n_failed_glyphs=self.n_failed_glyphs,
+            n_saved_points=self.n_points_before - self.n_points_after,
+            n_saved_bytes=self.n_bytes_before - self.n_bytes_after,
+        )
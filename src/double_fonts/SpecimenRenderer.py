@@ -0,0 +1,171 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont, features
+
+DEFAULT_IMAGE_SIZE = (1600, 900)
+DEFAULT_FONT_SIZES = [48]
+DEFAULT_TEXTS = [
+    'The quick brown fox jumps over the lazy dog',
+    'ඉක්මන් දුඹුරු හිවලෙකු කම්මැලි බල්ලා ට උඩින් පනියි',
+    'விரைவான பழுப்பு நரி சோம்பேறி நாய் மீது குதிக்கிறது',
+]
+TEXT_COLOR = (0, 0, 0)
+BG_COLOR = (255, 255, 255)
+
+
+class SpecimenRenderer:
+    # Renders a PNG specimen of each text, in each font, at each size, as
+    # testing_examples/create_test_image does for one, with the text
+    # centered in the image.
+    #
+    # Specimens are rendered in a process pool, grouped by font and size,
+    # so that each worker loads a font once for all of its texts. Text is
+    # shaped with raqm where Pillow has it, since the basic layout does not
+    # shape complex scripts, like Sinhala and Tamil.
+    def __init__(
+        self,
+        output_dir: str,
+        image_size: tuple = DEFAULT_IMAGE_SIZE,
+        jobs: int = None,
+    ):
+        self.output_dir = output_dir
+        self.image_size = tuple(image_size)
+        self.jobs = jobs or os.cpu_count()
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_layout_engine() -> int:
+        if features.check('raqm'):
+            return ImageFont.Layout.RAQM
+        return ImageFont.Layout.BASIC
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def get_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+        # Per process, so workers keep the fonts they have loaded.
+        return ImageFont.truetype(
+            font_path,
+            font_size,
+            layout_engine=SpecimenRenderer.get_layout_engine(),
+        )
+
+    @staticmethod
+    def render(
+        font_path: str, text: str, font_size: int, image_size: tuple
+    ) -> Image.Image:
+        font = SpecimenRenderer.get_font(font_path, font_size)
+        image = Image.new('RGB', image_size, BG_COLOR)
+        draw = ImageDraw.Draw(image)
+        x_min, y_min, x_max, y_max = draw.textbbox((0, 0), text, font=font)
+        position = (
+            (image_size[0] - (x_max - x_min)) / 2,
+            (image_size[1] - (y_max - y_min)) / 2,
+        )
+        draw.text(position, text, font=font, fill=TEXT_COLOR)
+        return image
+
+    @staticmethod
+    def render_specimen(specimen: dict) -> dict:
+        # Times the rendering alone, apart from writing the PNG, so that
+        # fonts can be compared by how quickly they rasterize.
+        t_start = time.perf_counter()
+        image = SpecimenRenderer.render(
+            specimen['font_path'],
+            specimen['text'],
+            specimen['font_size'],
+            specimen['image_size'],
+        )
+        render_time = time.perf_counter() - t_start
+        image.save(specimen['output_path'])
+        return dict(
+            specimen,
+            render_time=render_time,
+            time=time.perf_counter() - t_start,
+        )
+
+    def get_specimens(
+        self, font_paths: list, texts: list, font_sizes: list
+    ) -> list:
+        specimens = []
+        for font_path in font_paths:
+            font_name = os.path.splitext(os.path.basename(font_path))[0]
+            for font_size in font_sizes:
+                for i_text, text in enumerate(texts):
+                    specimens.append(
+                        dict(
+                            font_path=font_path,
+                            text=text,
+                            font_size=font_size,
+                            image_size=self.image_size,
+                            output_path=os.path.join(
+                                self.output_dir,
+                                f'{font_name}-{font_size}-{i_text:04d}.png',
+                            ),
+                        )
+                    )
+        return specimens
+
+    @staticmethod
+    def get_font_stats(results: list) -> dict:
+        # Render throughput for each font, over all its texts and sizes.
+        font_stats = {}
+        for result in results:
+            stats = font_stats.setdefault(
+                result['font_path'],
+                dict(n_specimens=0, n_chars=0, render_time=0),
+            )
+            stats['n_specimens'] += 1
+            stats['n_chars'] += len(result['text'])
+            stats['render_time'] += result['render_time']
+        for stats in font_stats.values():
+            render_time = stats['render_time'] or math.inf
+            stats['specimens_per_s'] = stats['n_specimens'] / render_time
+            stats['chars_per_s'] = stats['n_chars'] / render_time
+        return font_stats
+
+    def render_all(
+        self, font_paths: list, texts: list = None, font_sizes: list = None
+    ) -> dict:
+        specimens = self.get_specimens(
+            font_paths,
+            texts or DEFAULT_TEXTS,
+            font_sizes or DEFAULT_FONT_SIZES,
+        )
+        os.makedirs(self.output_dir, exist_ok=True)
+        t_start = time.perf_counter()
+        if self.jobs <= 1 or len(specimens) < 2:
+            results = [
+                SpecimenRenderer.render_specimen(specimen)
+                for specimen in specimens
+            ]
+        else:
+            # Specimens are in font and size order, so each chunk needs few
+            # fonts.
+            chunk_size = math.ceil(len(specimens) / (self.jobs * 4))
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                results = list(
+                    executor.map(
+                        SpecimenRenderer.render_specimen,
+                        specimens,
+                        chunksize=chunk_size,
+                    )
+                )
+        total_time = time.perf_counter() - t_start
+        return dict(
+            jobs=self.jobs,
+            layout_engine=(
+                'raqm'
+                if SpecimenRenderer.get_layout_engine()
+                == ImageFont.Layout.RAQM
+                else 'basic'
+            ),
+            n_specimens=len(results),
+            total_time=total_time,
+            specimens_per_s=len(results) / (total_time or math.inf),
+            fonts=SpecimenRenderer.get_font_stats(results),
+            specimens=results,
+        )
@@ -0,0 +1,46 @@
+from double_fonts.Layout import Layout
+from double_fonts.Transform import Transform
+
+
+class StackLayout(Layout):
+    # Shrinks every layer's glyph and stacks each secondary above the layer
+    # before it, e.g. Tamil above Sinhala above Latin.
+    #
+    # secondary_scale shrinks the secondaries further, relative to the
+    # primary (0.7 for the Tamil-Sinhala stack), and center aligns all of
+    # them horizontally.
+    def __init__(
+        self,
+        vertical_spacing_ratio: float = 0.1,
+        secondary_scale: float = 1.0,
+        center: bool = False,
+    ):
+        self.vertical_spacing_ratio = vertical_spacing_ratio
+        self.secondary_scale = secondary_scale
+        self.center = center
+
+    def get_transforms(self, bounds_list: list) -> list:
+        height1 = Layout.get_height(bounds_list[0])
+        heights2 = [Layout.get_height(bounds) for bounds in bounds_list[1:]]
+        total_height = height1 + sum(heights2) * self.secondary_scale
+        scale1 = height1 / (total_height * (1 + self.vertical_spacing_ratio))
+        scale2 = scale1 * self.secondary_scale
+        vertical_spacing = height1 * self.vertical_spacing_ratio * scale1
+
+        dxs = [0] * len(bounds_list)
+        if self.center:
+            widths = [Layout.get_width(bounds_list[0]) * scale1] + [
+                Layout.get_width(bounds) * scale2 for bounds in bounds_list[1:]
+            ]
+            max_width = max(widths)
+            dxs = [(max_width - width) / 2 for width in widths]
+
+        # Each secondary is centered vertically in the height that it would
+        # have at the primary's scale, above the layer before it.
+        transforms = [Transform(scale1, dxs[0], 0)]
+        top = height1 * scale1
+        for height2, dx2 in zip(heights2, dxs[1:]):
+            dy2 = top + vertical_spacing + height2 * (scale1 - scale2) / 2
+            transforms.append(Transform(scale2, dx2, dy2))
+            top = dy2 + height2 * scale2
+        return transforms
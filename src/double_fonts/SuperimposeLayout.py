@@ -0,0 +1,21 @@
+import numpy as np
+
+from double_fonts.Layout import Layout
+from double_fonts.Transform import Transform
+
+
+class SuperimposeLayout(Layout):
+    # Draws every layer's glyph, unscaled, on top of each other.
+    def get_transforms(self, bounds_list: list) -> list:
+        return [Transform.identity() for _ in bounds_list]
+
+    def get_metrics(self, advances: list, bounds: tuple) -> tuple:
+        return (max(advances), int(bounds[0]))
+
+    def get_metrics_batch(
+        self, advances: np.ndarray, bounds: np.ndarray
+    ) -> np.ndarray:
+        return np.stack(
+            [advances.max(axis=1), np.trunc(bounds[:, 0])],
+            axis=1,
+        ).astype(int)
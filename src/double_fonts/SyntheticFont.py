@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+from fontTools.fontBuilder import FontBuilder
+
+from double_fonts.Outline import Outline
+
+# Supplementary Private Use Area-A, which has room for 65,534 glyphs.
+FIRST_CODEPOINT = 0xF0000
+UNITS_PER_EM = 1000
+
+
+class SyntheticFont:
+    # Generates large TrueType fonts, for benchmarks beyond the bundled
+    # fonts. Each glyph has one to three closed contours, of random size and
+    # point count, with on- and off-curve points, and is mapped to a private
+    # use codepoint. The same n_glyphs and seed always give the same font.
+    def __init__(self, n_glyphs: int, seed: int = 0):
+        self.n_glyphs = n_glyphs
+        self.seed = seed
+
+    @property
+    def family_name(self) -> str:
+        return f'Synthetic {self.n_glyphs} {self.seed}'
+
+    @property
+    def glyph_names(self) -> list:
+        return [f'g{i:05d}' for i in range(self.n_glyphs)]
+
+    def get_outlines(self) -> list:
+        rng = np.random.default_rng(self.seed)
+        n_contours = rng.integers(1, 4, self.n_glyphs)
+        outlines = []
+        for i in range(self.n_glyphs):
+            n_points = rng.integers(6, 31, n_contours[i])
+            angles = np.concatenate(
+                [
+                    np.linspace(0, 2 * np.pi, n, endpoint=False)
+                    for n in n_points
+                ]
+            )
+            centers = np.repeat(
+                rng.uniform(100, 500, (len(n_points), 2)), n_points, axis=0
+            )
+            radii = np.repeat(rng.uniform(20, 250, len(n_points)), n_points)
+            radii *= rng.uniform(0.8, 1.2, len(angles))
+            coordinates = np.round(
+                centers + np.column_stack([np.cos(angles), np.sin(angles)])
+                * radii[:, None]
+            )
+            flags = (rng.random(len(angles)) < 0.6).astype(np.uint8)
+            outlines.append(
+                Outline(coordinates, flags, np.cumsum(n_points) - 1)
+            )
+        return outlines
+
+    def build(self, output_path: str):
+        glyph_names = self.glyph_names
+        glyphs = {'.notdef': Outline.empty().to_glyph()}
+        metrics = {'.notdef': (UNITS_PER_EM // 2, 0)}
+        for glyph_name, outline in zip(glyph_names, self.get_outlines()):
+            glyph = outline.to_glyph()
+            glyphs[glyph_name] = glyph
+            metrics[glyph_name] = (glyph.xMax + 100, glyph.xMin)
+
+        font_builder = FontBuilder(UNITS_PER_EM, isTTF=True)
+        font_builder.setupGlyphOrder(['.notdef'] + glyph_names)
+        font_builder.setupCharacterMap(
+            {
+                FIRST_CODEPOINT + i: glyph_name
+                for i, glyph_name in enumerate(glyph_names)
+            }
+        )
+        font_builder.setupGlyf(glyphs, calcGlyphBounds=False)
+        font_builder.setupHorizontalMetrics(metrics)
+        font_builder.setupHorizontalHeader(ascent=800, descent=-200)
+        font_builder.setupNameTable(
+            dict(familyName=self.family_name, styleName='Regular')
+        )
+        font_builder.setupOS2(sTypoAscender=800, sTypoDescender=-200)
+        font_builder.setupPost()
+        font_builder.save(output_path)
+
+    def get_path(self, font_dir: str) -> str:
+        # Builds the font into font_dir, unless it is already there.
+        path = os.path.join(
+            font_dir, f'Synthetic-{self.n_glyphs}-{self.seed}.ttf'
+        )
+        if not os.path.exists(path):
+            os.makedirs(font_dir, exist_ok=True)
+            self.build(path)
+        return path
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Transform:
+    scale: float = 1.0
+    dx: float = 0.0
+    dy: float = 0.0
+
+    @staticmethod
+    def identity() -> 'Transform':
+        return Transform()
+
+    def is_identity(self) -> bool:
+        return self.scale == 1 and self.dx == 0 and self.dy == 0
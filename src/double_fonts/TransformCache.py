@@ -0,0 +1,43 @@
+from collections import OrderedDict
+
+
+class TransformCache:
+    # A bounded cache of transformed glyphs, keyed by (source glyph,
+    # Transform), so that a glyph placed the same way for several mappings is
+    # only transformed once.
+    #
+    # Each entry has a size (its number of points, for outlines), and the
+    # least recently used entries are evicted once the total is over
+    # max_size.
+    def __init__(self, max_size: int = 1_000_000):
+        self.max_size = max_size
+        self.size = 0
+        self.n_hits = 0
+        self.n_misses = 0
+        self.n_evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key not in self._entries:
+            self.n_misses += 1
+            return None
+        self.n_hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key, value, size: int = 1):
+        if key in self._entries:
+            self.size -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.n_evictions += 1
+
+    def get_stats(self) -> dict:
+        return dict(
+            n_cache_hits=self.n_hits,
+            n_cache_misses=self.n_misses,
+            n_cache_evictions=self.n_evictions,
+        )
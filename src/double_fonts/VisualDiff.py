@@ -0,0 +1,186 @@
+import time
+
+import numpy as np
+from fontTools.pens.cu2quPen import Cu2QuPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont
+
+from double_fonts.GlyphHashManifest import GlyphHashManifest
+from double_fonts.GlyphRasterizer import GlyphRasterizer
+from double_fonts.Outline import Outline
+
+METRICS = ['pixel', 'perceptual']
+# How far, in font units, the quadratic curves CFF and CFF2 outlines are
+# rasterized as can be from their cubic curves.
+MAX_CURVE_ERROR = 1.0
+
+
+class VisualDiff:
+    # Compares two builds of a font glyph by glyph, by rasterizing the
+    # glyphs that changed, and reports the ones that look different.
+    #
+    # Glyphs with the same output hash in both builds' manifests are
+    # skipped unread, as are glyphs whose data and advance are the same.
+    # The rest are rasterized in batches, each glyph in the frame of its
+    # bounds in both builds, so that moves show up as differences. CFF and
+    # CFF2 outlines are rasterized as quadratic curves, as glyf outlines
+    # are.
+    #
+    # The pixel metric counts pixels whose coverage differs by more than
+    # threshold. The perceptual metric blurs both bitmaps first, so that
+    # edges shifted by less than a pixel are not counted.
+    def __init__(
+        self,
+        font_path1: str,
+        font_path2: str,
+        rasterizer: GlyphRasterizer = None,
+        metric: str = 'pixel',
+        threshold: float = 0.25,
+    ):
+        if metric not in METRICS:
+            raise ValueError(f'Unknown metric: {metric}')
+        self.font_path1 = font_path1
+        self.font_path2 = font_path2
+        self.rasterizer = rasterizer or GlyphRasterizer()
+        self.metric = metric
+        self.threshold = threshold
+
+    @staticmethod
+    def blur(bitmaps: np.ndarray) -> np.ndarray:
+        # A 3x3 box blur of each bitmap.
+        padded = np.pad(bitmaps, ((0, 0), (1, 1), (1, 1)), mode='edge')
+        size = bitmaps.shape[1]
+        return (
+            sum(
+                padded[:, i : i + size, j : j + size]
+                for i in range(3)
+                for j in range(3)
+            )
+            / 9
+        )
+
+    def get_diff_pixels(
+        self, bitmaps1: np.ndarray, bitmaps2: np.ndarray
+    ) -> tuple:
+        # The number of differing pixels of each glyph, and the largest
+        # coverage difference.
+        if self.metric == 'perceptual':
+            bitmaps1 = VisualDiff.blur(bitmaps1)
+            bitmaps2 = VisualDiff.blur(bitmaps2)
+        diffs = np.abs(bitmaps1 - bitmaps2)
+        return (
+            (diffs > self.threshold).sum(axis=(1, 2)),
+            diffs.max(axis=(1, 2)),
+        )
+
+    @staticmethod
+    def get_frame(outline1: Outline, outline2: Outline) -> tuple:
+        bounds = [
+            outline.get_bounds()
+            for outline in [outline1, outline2]
+            if not outline.is_empty()
+        ]
+        if not bounds:
+            return (0, 0, 1, 1)
+        x_mins, y_mins, x_maxs, y_maxs = zip(*bounds)
+        return (min(x_mins), min(y_mins), max(x_maxs), max(y_maxs))
+
+    @staticmethod
+    def is_same_glyph(
+        ttfont1: TTFont, ttfont2: TTFont, glyph_name: str
+    ) -> bool:
+        if ttfont1['hmtx'][glyph_name][0] != ttfont2['hmtx'][glyph_name][0]:
+            return False
+        return GlyphHashManifest.get_font_glyph_data(
+            ttfont1, glyph_name
+        ) == GlyphHashManifest.get_font_glyph_data(ttfont2, glyph_name)
+
+    @staticmethod
+    def get_outline(ttfont: TTFont, glyph_name: str) -> Outline:
+        if 'glyf' in ttfont:
+            glyf = ttfont['glyf']
+            return Outline.from_glyph(glyf[glyph_name], glyf)
+        pen = TTGlyphPen(None)
+        ttfont.getGlyphSet()[glyph_name].draw(
+            Cu2QuPen(pen, MAX_CURVE_ERROR, reverse_direction=True)
+        )
+        return Outline.from_glyph(pen.glyph(), None)
+
+    def get_changed_glyph_names(
+        self, ttfont1: TTFont, ttfont2: TTFont, glyph_names: list
+    ) -> list:
+        output_hashes1 = GlyphHashManifest(
+            self.font_path1
+        ).load_output_hashes()
+        output_hashes2 = GlyphHashManifest(
+            self.font_path2
+        ).load_output_hashes()
+        changed_glyph_names = []
+        for glyph_name in glyph_names:
+            output_hash = output_hashes1.get(glyph_name)
+            if output_hash and output_hash == output_hashes2.get(glyph_name):
+                continue
+            if VisualDiff.is_same_glyph(ttfont1, ttfont2, glyph_name):
+                continue
+            changed_glyph_names.append(glyph_name)
+        return changed_glyph_names
+
+    def run(self, glyph_names: list = None) -> dict:
+        # Compares the given glyphs, or all the glyphs of both builds.
+        t_start = time.perf_counter()
+        ttfont1 = TTFont(self.font_path1, lazy=True)
+        ttfont2 = TTFont(self.font_path2, lazy=True)
+        glyph_order1 = ttfont1.getGlyphOrder()
+        glyph_order2 = set(ttfont2.getGlyphOrder())
+        glyph_names = [
+            glyph_name
+            for glyph_name in glyph_names or glyph_order1
+            if glyph_name in glyph_order2
+        ]
+        missing_glyph_names = sorted(
+            set(glyph_order1).symmetric_difference(glyph_order2)
+        )
+        changed_glyph_names = self.get_changed_glyph_names(
+            ttfont1, ttfont2, glyph_names
+        )
+
+        hmtx1, hmtx2 = ttfont1['hmtx'], ttfont2['hmtx']
+        outlines1, outlines2, frames = [], [], []
+        for glyph_name in changed_glyph_names:
+            outline1 = VisualDiff.get_outline(ttfont1, glyph_name)
+            outline2 = VisualDiff.get_outline(ttfont2, glyph_name)
+            outlines1.append(outline1)
+            outlines2.append(outline2)
+            frames.append(VisualDiff.get_frame(outline1, outline2))
+        n_diff_pixels, max_diffs = self.get_diff_pixels(
+            self.rasterizer.rasterize(outlines1, frames),
+            self.rasterizer.rasterize(outlines2, frames),
+        )
+
+        different_glyphs = []
+        for glyph_name, glyph_n_diff_pixels, max_diff in zip(
+            changed_glyph_names, n_diff_pixels.tolist(), max_diffs.tolist()
+        ):
+            advance1, advance2 = hmtx1[glyph_name][0], hmtx2[glyph_name][0]
+            if glyph_n_diff_pixels == 0 and advance1 == advance2:
+                continue
+            different_glyphs.append(
+                dict(
+                    glyph_name=glyph_name,
+                    n_diff_pixels=glyph_n_diff_pixels,
+                    max_diff=max_diff,
+                    advance1=advance1,
+                    advance2=advance2,
+                )
+            )
+        return dict(
+            metric=self.metric,
+            size=self.rasterizer.size,
+            n_glyphs=len(glyph_names),
+            n_skipped=len(glyph_names) - len(changed_glyph_names),
+            n_rasterized=len(changed_glyph_names),
+            n_different=len(different_glyphs),
+            missing_glyph_names=missing_glyph_names,
+            time=time.perf_counter() - t_start,
+            different_glyphs=different_glyphs,
+        )
@@ -1,4 +1,35 @@
 # double_fonts (auto generate by build_inits.py)
 
+from double_fonts.BatchBuilder import BatchBuilder
+from double_fonts.Benchmark import Benchmark
+from double_fonts.BuildProfiler import BuildProfiler
+from double_fonts.CharStringEngine import CharStringEngine
+from double_fonts.CharStringOutline import CharStringOutline
+from double_fonts.ClusterIndex import ClusterIndex
+from double_fonts.CompositeBuilder import CompositeBuilder
+from double_fonts.Coverage import Coverage
 from double_fonts.DoubleFont import DoubleFont
 from double_fonts.Font import Font
+from double_fonts.FontCache import FontCache
+from double_fonts.FontCatalog import FontCatalog
+from double_fonts.FontService import FontService
+from double_fonts.FontServiceLoadTest import FontServiceLoadTest
+from double_fonts.FontWriter import FontWriter
+from double_fonts.GlyphEngine import GlyphEngine
+from double_fonts.GlyphHashManifest import GlyphHashManifest
+from double_fonts.GlyphRasterizer import GlyphRasterizer
+from double_fonts.GlyphRecords import GlyphRecords
+from double_fonts.GlyphVariations import GlyphVariations
+from double_fonts.Layout import Layout
+from double_fonts.MappedFile import MappedFile
+from double_fonts.MappedFont import MappedFont
+from double_fonts.Outline import Outline
+from double_fonts.OutputFont import OutputFont
+from double_fonts.OverlapRemover import OverlapRemover
+from double_fonts.SpecimenRenderer import SpecimenRenderer
+from double_fonts.StackLayout import StackLayout
+from double_fonts.SuperimposeLayout import SuperimposeLayout
+from double_fonts.SyntheticFont import SyntheticFont
+from double_fonts.Transform import Transform
+from double_fonts.TransformCache import TransformCache
+from double_fonts.VisualDiff import VisualDiff
@@ -0,0 +1,72 @@
+import os
+import time
+
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+from double_fonts import DoubleFont, Font, GlyphEngine, Outline, StackLayout
+
+
+def compose_with_pen(glyph1, glyph2, t1, t2):
+    # The per-point loop the composers used before the Outline engine.
+    pen = TTGlyphPen(None)
+    for glyph, t in [(glyph1, t1), (glyph2, t2)]:
+        for i, end_pt in enumerate(glyph.endPtsOfContours):
+            start = 0 if i == 0 else glyph.endPtsOfContours[i - 1] + 1
+            for j in range(start, end_pt + 1):
+                x, y = glyph.coordinates[j]
+                point = (x * t.scale + t.dx, y * t.scale + t.dy)
+                if j == start:
+                    pen.moveTo(point)
+                else:
+                    pen.lineTo(point)
+            pen.closePath()
+    return pen.glyph()
+
+
+def benchmark(label, font1, font2, n_repeats=5):
+    layout = StackLayout(vertical_spacing_ratio=0.1)
+    double_font = DoubleFont(font1, font2, layout=layout)
+    glyf1, glyf2 = font1.ttfont['glyf'], font2.ttfont['glyf']
+    pairs = []
+    for glyph_name1, glyph_name2 in double_font.get_glyph_name_tuples():
+        glyph1, glyph2 = glyf1[glyph_name1], glyf2[glyph_name2]
+        # The pen loop only handled simple glyphs.
+        if glyph1.numberOfContours > 0 and glyph2.numberOfContours > 0:
+            pairs.append((glyph1, glyph2))
+
+    def run_pen():
+        for glyph1, glyph2 in pairs:
+            t1, t2 = layout.get_transforms(
+                [
+                    (glyph1.xMin, glyph1.yMin, glyph1.xMax, glyph1.yMax),
+                    (glyph2.xMin, glyph2.yMin, glyph2.xMax, glyph2.yMax),
+                ]
+            )
+            compose_with_pen(glyph1, glyph2, t1, t2)
+
+    def run_engine():
+        outline_pairs = [
+            (Outline.from_glyph(glyph1, glyf1), Outline.from_glyph(glyph2, glyf2))
+            for glyph1, glyph2 in pairs
+        ]
+        for outline in GlyphEngine(layout).compose(outline_pairs):
+            outline.to_glyph()
+
+    print(f'{label} ({len(pairs)} glyph pairs)')
+    for name, func in [('TTGlyphPen', run_pen), ('GlyphEngine', run_engine)]:
+        t_start = time.perf_counter()
+        for _ in range(n_repeats):
+            func()
+        dt = time.perf_counter() - t_start
+        print(f'\t{name:<12}{len(pairs) * n_repeats / dt:10,.0f} glyphs/s')
+
+
+if __name__ == "__main__":
+    noto_sans_dir = os.path.join('fonts', 'Noto_Sans', 'static')
+    benchmark(
+        'Noto Sans Regular + Bold',
+        Font('Noto Sans', os.path.join(noto_sans_dir, 'NotoSans-Regular.ttf')),
+        Font('Noto Sans Bold', os.path.join(noto_sans_dir, 'NotoSans-Bold.ttf')),
+    )
+    bhashitha = Font('Bhashitha Sans', os.path.join('fonts', 'Bhashitha-Sans.ttf'))
+    benchmark('Bhashitha Sans + Bhashitha Sans', bhashitha, bhashitha)
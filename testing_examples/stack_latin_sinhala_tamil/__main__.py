@@ -0,0 +1,92 @@
+from double_fonts import (
+    Coverage,
+    DoubleFont,
+    Font,
+    StackLayout,
+    SuperimposeLayout,
+)
+from double_fonts.Coverage import BASIC_LATIN
+
+
+def stack_latin_sinhala_tamil(
+    latin_font_path,
+    sinhala_font_path,
+    tamil_font_path,
+    stacked_font_path,
+    superimposed_font_path,
+    char_map,
+):
+    latin_font = Font(name="Noto Sans", path=latin_font_path)
+    sinhala_font = Font(name="Noto Sans Sinhala", path=sinhala_font_path)
+    tamil_font = Font(name="Noto Sans Tamil", path=tamil_font_path)
+    # Both layouts are built from one decode of the three fonts.
+    DoubleFont(
+        latin_font,
+        sinhala_font,
+        char_map=char_map,
+        family_name="Latin-Sinhala-Tamil Font",
+        extra_fonts=[tamil_font],
+    ).build_layouts(
+        {
+            stacked_font_path: StackLayout(
+                vertical_spacing_ratio=0.1,
+                # Sinhala and Tamil at 70% of the Latin scale, center aligned
+                secondary_scale=0.7,
+                center=True,
+            ),
+            superimposed_font_path: SuperimposeLayout(),
+        },
+        # Only basic Latin, with punctuation and digits, which has the
+        # mapped characters.
+        coverage=Coverage(unicode_ranges=[BASIC_LATIN]),
+    )
+    print(f"Stacked Latin-Sinhala-Tamil font saved as {stacked_font_path}")
+    print(
+        "Superimposed Latin-Sinhala-Tamil font saved as"
+        + f" {superimposed_font_path}"
+    )
+
+
+if __name__ == "__main__":
+    import os
+
+    # Example character mapping (English to Sinhala and Tamil)
+    char_map = {
+        'b': ['බ', 'ப'],
+        'c': ['ච', 'ச'],
+        'd': ['ද', 'த'],
+        'g': ['ග', 'க'],
+        'h': ['හ', 'ஹ'],
+        'j': ['ජ', 'ஜ'],
+        'k': ['ක', 'க'],
+        'l': ['ල', 'ல'],
+        'm': ['ම', 'ம'],
+        'n': ['න', 'ந'],
+        'p': ['ප', 'ப'],
+        'r': ['ර', 'ர'],
+        's': ['ස', 'ஸ'],
+        't': ['ත', 'த'],
+        'v': ['ව', 'வ'],
+        'y': ['ය', 'ய'],
+    }
+
+    new_char_map = {}
+    for k, v in char_map.items():
+        new_char_map[k] = v
+        new_char_map[k.upper()] = v
+
+    stack_latin_sinhala_tamil(
+        os.path.join('fonts', 'Noto_Sans', 'static', 'NotoSans-Regular.ttf'),
+        os.path.join(
+            'fonts',
+            'Noto_Sans_Sinhala',
+            'static',
+            'NotoSansSinhala-Regular.ttf',
+        ),
+        os.path.join(
+            'fonts', 'Noto_Sans_Tamil', 'static', 'NotoSansTamil-Regular.ttf'
+        ),
+        "LatinSinhalaTamilStackedFont.ttf",
+        "LatinSinhalaTamilSuperimposedFont.ttf",
+        new_char_map,
+    )
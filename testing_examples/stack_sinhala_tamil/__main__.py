@@ -1,5 +1,5 @@
-from fontTools.pens.ttGlyphPen import TTGlyphPen
-from fontTools.ttLib import TTFont
+from double_fonts import Coverage, DoubleFont, Font, StackLayout
+from double_fonts.Coverage import BASIC_LATIN
 
 
 def stack_tamil_sinhala(
@@ -9,222 +9,24 @@ def stack_tamil_sinhala(
     char_map,
     vertical_spacing_ratio=0.1,
 ):
-    # Load the Tamil and Sinhala fonts
-    tamil_font = TTFont(tamil_font_path)
-    sinhala_font = TTFont(sinhala_font_path)
-
-    # Create a new font based on the Tamil font
-    new_font = TTFont(tamil_font_path)
-
-    # Get glyph sets
-    tamil_glyf = tamil_font['glyf']
-    sinhala_glyf = sinhala_font['glyf']
-    new_glyf = new_font['glyf']
-
-    tamil_cmap = tamil_font.getBestCmap()
-    sinhala_cmap = sinhala_font.getBestCmap()
-
-    # Get the glyph order from the Tamil font
-    glyph_order = tamil_font.getGlyphOrder()
-
-    # Dictionary to store new glyph metrics
-    new_glyph_metrics = {}
-
-    # Iterate through the character map
-    for tamil_char, sinhala_unicode in char_map.items():
-        # Handle single and multi-character strings
-        if len(tamil_char) == 1:
-            tamil_unicode = ord(tamil_char)
-        else:
-            # For multi-character strings, check if they are in cmap
-            tamil_unicode = None
-            for char in tamil_char:
-                if ord(char) in tamil_cmap:
-                    tamil_unicode = ord(char)
-                    break
-
-        if (
-            tamil_unicode is not None
-            and tamil_unicode in tamil_cmap
-            and sinhala_unicode in sinhala_cmap
-        ):
-            tamil_glyph_name = tamil_cmap[tamil_unicode]
-            sinhala_glyph_name = sinhala_cmap[sinhala_unicode]
-
-            # Create a new glyph
-            pen = TTGlyphPen(None)
-
-            # Get Tamil glyph
-            tamil_glyph = tamil_glyf[tamil_glyph_name]
-
-            # Get Sinhala glyph
-            sinhala_glyph = sinhala_glyf[sinhala_glyph_name]
-
-            # Check if both glyphs have contours
-            if (
-                hasattr(tamil_glyph, 'numberOfContours')
-                and tamil_glyph.numberOfContours > 0
-                and hasattr(sinhala_glyph, 'numberOfContours')
-                and sinhala_glyph.numberOfContours > 0
-            ):
-                # Calculate scaling factor and vertical spacing
-                tamil_height = tamil_glyph.yMax - tamil_glyph.yMin
-                sinhala_height = sinhala_glyph.yMax - sinhala_glyph.yMin
-                total_height = tamil_height + (
-                    sinhala_height * 0.7
-                )  # Adjust for smaller Sinhala
-                scale_factor = tamil_height / (
-                    total_height * (1 + vertical_spacing_ratio)
-                )
-                sinhala_scale_factor = (
-                    scale_factor * 0.7
-                )  # 70% of the original scale factor
-
-                vertical_spacing = (
-                    tamil_height * vertical_spacing_ratio * scale_factor
-                )
-
-                # Calculate horizontal offsets for center alignment
-                tamil_width = tamil_glyph.xMax - tamil_glyph.xMin
-                sinhala_width = sinhala_glyph.xMax - sinhala_glyph.xMin
-                max_width = max(
-                    tamil_width * scale_factor,
-                    sinhala_width * sinhala_scale_factor,
-                )
-                tamil_offset = (max_width - tamil_width * scale_factor) / 2
-                sinhala_offset = (
-                    max_width - sinhala_width * sinhala_scale_factor
-                ) / 2
-
-                # Add contours from the Tamil glyph (scaled and centered)
-                for i, end_pt in enumerate(tamil_glyph.endPtsOfContours):
-                    start = (
-                        0
-                        if i == 0
-                        else tamil_glyph.endPtsOfContours[i - 1] + 1
-                    )
-                    for j in range(start, end_pt + 1):
-                        x, y = tamil_glyph.coordinates[j]
-                        if j == start:
-                            pen.moveTo(
-                                (
-                                    x * scale_factor + tamil_offset,
-                                    y * scale_factor,
-                                )
-                            )
-                        else:
-                            pen.lineTo(
-                                (
-                                    x * scale_factor + tamil_offset,
-                                    y * scale_factor,
-                                )
-                            )
-                    pen.closePath()
-
-                # Add contours from the Sinhala glyph (scaled smaller, moved
-                # up, and centered)
-                for i, end_pt in enumerate(sinhala_glyph.endPtsOfContours):
-                    start = (
-                        0
-                        if i == 0
-                        else sinhala_glyph.endPtsOfContours[i - 1] + 1
-                    )
-                    for j in range(start, end_pt + 1):
-                        x, y = sinhala_glyph.coordinates[j]
-                        if j == start:
-                            pen.moveTo(
-                                (
-                                    x * sinhala_scale_factor + sinhala_offset,
-                                    y * sinhala_scale_factor
-                                    + tamil_height * scale_factor
-                                    + vertical_spacing
-                                    + (
-                                        sinhala_height
-                                        * (
-                                            scale_factor
-                                            - sinhala_scale_factor
-                                        )
-                                        / 2
-                                    ),
-                                )
-                            )
-                        else:
-                            pen.lineTo(
-                                (
-                                    x * sinhala_scale_factor + sinhala_offset,
-                                    y * sinhala_scale_factor
-                                    + tamil_height * scale_factor
-                                    + vertical_spacing
-                                    + (
-                                        sinhala_height
-                                        * (
-                                            scale_factor
-                                            - sinhala_scale_factor
-                                        )
-                                        / 2
-                                    ),
-                                )
-                            )
-                    pen.closePath()
-
-                # Create the new glyph
-                new_glyph = pen.glyph()
-
-                # Calculate xMin and xMax from the new glyph's coordinates
-                x_coords = [pt[0] for pt in pen.points if pt]
-                y_coords = [pt[1] for pt in pen.points if pt]
-                if x_coords and y_coords:
-                    xMin = min(x_coords)
-                    xMax = max(x_coords)
-                    yMin = min(y_coords)
-                    yMax = max(y_coords)
-                else:
-                    # Fallback to original glyph metrics if no coordinates
-                    xMin = tamil_glyph.xMin
-                    xMax = tamil_glyph.xMax
-                    yMin = tamil_glyph.yMin
-                    yMax = tamil_glyph.yMax
-
-                # Store the new glyph metrics
-                new_glyph_metrics[tamil_glyph_name] = {
-                    'xMin': xMin,
-                    'xMax': xMax,
-                    'yMin': yMin,
-                    'yMax': yMax,
-                }
-
-                # Update the glyph in the new font
-                new_glyf[tamil_glyph_name] = new_glyph
-
-    # Update horizontal metrics
-    tamil_hmtx = tamil_font['hmtx']
-    new_hmtx = new_font['hmtx']
-    for glyph_name in glyph_order:
-        if glyph_name in new_glyph_metrics:
-            # If the glyph was modified, use its new metrics
-            advance, _ = tamil_hmtx[glyph_name]
-            metrics = new_glyph_metrics[glyph_name]
-            new_hmtx[glyph_name] = (
-                max(advance, metrics['xMax']),
-                metrics['xMin'],
-            )
-        else:
-            # If the glyph wasn't modified, copy the original metrics
-            new_hmtx[glyph_name] = tamil_hmtx[glyph_name]
-
-    # Update name table
-    name = new_font['name']
-    name.setName(f"Tamil-Sinhala Stacked Font", 1, 3, 1, 1033)  # Family name
-    name.setName("Regular", 2, 3, 1, 1033)  # Subfamily name
-    name.setName(
-        f"Tamil-Sinhala Stacked Font Regular", 4, 3, 1, 1033
-    )  # Full name
-    name.setName(
-        f"TamilSinhalaStackedFont-Regular", 6, 3, 1, 1033
-    )  # PostScript name
-
-    # Save the new font
-    new_font.save(output_font_path)
+    tamil_font = Font(name="Noto Sans Tamil", path=tamil_font_path)
+    sinhala_font = Font(name="Noto Sans Sinhala", path=sinhala_font_path)
+    DoubleFont(
+        tamil_font,
+        sinhala_font,
+        layout=StackLayout(
+            vertical_spacing_ratio=vertical_spacing_ratio,
+            # Sinhala at 70% of the Tamil scale, center aligned
+            secondary_scale=0.7,
+            center=True,
+        ),
+        char_map=char_map,
+        family_name="Tamil-Sinhala Stacked Font",
+    ).build(
+        output_font_path,
+        # Only the mapped characters, and basic Latin punctuation and digits.
+        coverage=Coverage(unicode_ranges=[BASIC_LATIN]),
+    )
     print(f"Stacked Tamil-Sinhala font saved as {output_font_path}")
 
 
@@ -287,7 +89,7 @@ if __name__ == "__main__":
         '்': 0x0DCA,  # Sinhala ් (virama)
         # Grantha Characters
         'க்ஷ': 0x0D9A,  # Sinhala ක (closest approximation)
-        'ஸ்ரீ': 0x0DC1 + 0x0DCA + 0x0DBB + 0x0DD3,  # Sinhala ශ්රී
+        'ஸ்ரீ': '\u0dc1\u0dca\u200d\u0dbb\u0dd3',  # Sinhala ශ්‍රී (as ශ)
         # Numerals
         '௧': 0x0DE7,  # Sinhala ෧
         '௨': 0x0DE8,  # Sinhala ෨
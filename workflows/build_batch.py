@@ -0,0 +1,27 @@
+import argparse
+
+from double_fonts import BatchBuilder
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build every double font in a JSON/TOML manifest.'
+    )
+    parser.add_argument('manifest_path')
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    report = BatchBuilder.from_file(args.manifest_path).run(jobs=args.jobs)
+    for result in report['builds']:
+        print(
+            f"{result['output_path']:<60}"
+            + f"{result['time']:8.2f}s{result['size'] / 1_000:10,.0f}KB"
+        )
+    print(
+        f"Built {report['n_builds']} fonts in {report['total_time']:.2f}s"
+        + f" with {report['jobs']} jobs"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+
+from double_fonts import BatchBuilder, DoubleFont
+from double_fonts.BatchBuilder import LAYOUTS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build a static double font for each named instance'
+        + ' of a variable font.'
+    )
+    parser.add_argument('font1')
+    parser.add_argument('font2')
+    parser.add_argument('output_dir')
+    parser.add_argument('--layout', choices=LAYOUTS, default='superimpose')
+    parser.add_argument('--family-name', default=None)
+    parser.add_argument(
+        '--formats', nargs='+', choices=['ttf', 'woff', 'woff2'], default=None
+    )
+    parser.add_argument(
+        '--remove-overlaps',
+        action='store_true',
+        help='Merge the overlapping contours of each double glyph.',
+    )
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    report = DoubleFont(
+        BatchBuilder.get_font(args.font1),
+        BatchBuilder.get_font(args.font2),
+        layout=LAYOUTS[args.layout](),
+        family_name=args.family_name,
+        remove_overlaps=args.remove_overlaps,
+    ).build_instances(args.output_dir, jobs=args.jobs, formats=args.formats)
+    for result in report['instances']:
+        print(
+            f"{result['output_path']:<60}"
+            + f"{result['time']:8.2f}s{result['size'] / 1_000:10,.0f}KB"
+        )
+    print(
+        f"Built {report['n_instances']} instances"
+        + f" in {report['total_time']:.2f}s with {report['jobs']} jobs"
+    )
+
+
+if __name__ == "__main__":
+    main()
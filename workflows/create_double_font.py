@@ -2,9 +2,9 @@ from double_fonts import DoubleFont, Font
 
 
 def main():
-    font1 = Font(name="Arial")
-    font2 = Font(name="Times New Roman")
-    DoubleFont(font1, font2).build("Arial-Times.ttf")
+    font1 = Font(name="Noto Sans")
+    font2 = Font(name="Sevillana")
+    DoubleFont(font1, font2).build("NotoSans-Sevillana.ttf")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+import argparse
+import sys
+
+from double_fonts import GlyphRasterizer, VisualDiff
+from double_fonts.VisualDiff import METRICS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rasterize the changed glyphs of two builds of a font,'
+        + ' and list the ones that look different. Exits with 1 if any do.'
+    )
+    parser.add_argument('font_path1')
+    parser.add_argument('font_path2')
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--metric', choices=METRICS, default='pixel')
+    parser.add_argument('--threshold', type=float, default=0.25)
+    parser.add_argument(
+        '--tolerance',
+        type=int,
+        default=0,
+        help='The number of differing pixels a glyph may have.',
+    )
+    args = parser.parse_args()
+
+    report = VisualDiff(
+        args.font_path1,
+        args.font_path2,
+        rasterizer=GlyphRasterizer(size=args.size),
+        metric=args.metric,
+        threshold=args.threshold,
+    ).run()
+    different_glyphs = [
+        glyph
+        for glyph in report['different_glyphs']
+        if glyph['n_diff_pixels'] > args.tolerance
+        or glyph['advance1'] != glyph['advance2']
+    ]
+    for glyph in different_glyphs:
+        print(
+            f"{glyph['glyph_name']:<40}"
+            + f"{glyph['n_diff_pixels']:8,} pixels"
+            + f"{glyph['max_diff']:8.2f} max"
+            + f"{glyph['advance1']:8}{glyph['advance2']:8}"
+        )
+    for glyph_name in report['missing_glyph_names']:
+        print(f'{glyph_name:<40} in only one build')
+    print(
+        f"{len(different_glyphs)} of {report['n_glyphs']} glyphs differ"
+        + f" ({report['n_skipped']} skipped, {report['n_rasterized']}"
+        + f" rasterized, in {report['time']:.2f}s)"
+    )
+    if different_glyphs or report['missing_glyph_names']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
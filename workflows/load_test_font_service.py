@@ -0,0 +1,39 @@
+import argparse
+
+from double_fonts import FontServiceLoadTest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load test a running font service (serve_fonts.py),'
+        + ' and report its latency percentiles.'
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--font1', default='Noto Sans')
+    parser.add_argument('--font2', default='Noto Sans Bold')
+    parser.add_argument('--layout', default='stack')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--distinct-texts', type=int, default=20)
+    args = parser.parse_args()
+
+    report = FontServiceLoadTest(
+        args.url,
+        dict(font1=args.font1, font2=args.font2, layout=args.layout),
+        n_requests=args.requests,
+        n_concurrent=args.concurrency,
+        n_distinct_texts=args.distinct_texts,
+    ).run()
+    print(
+        f"{report['n_requests']} requests, {report['n_concurrent']}"
+        + f" concurrent, in {report['total_time']:.2f}s"
+        + f" ({report['requests_per_s']:.1f} requests/s)"
+    )
+    for name in ['p50', 'p90', 'p99', 'max']:
+        print(f'{name:<4}{report[name] * 1_000:10.1f}ms')
+    print(f"Statuses: {report['statuses']}")
+    print(f"Sources: {report['sources']}")
+
+
+if __name__ == "__main__":
+    main()
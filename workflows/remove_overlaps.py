@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+
+from double_fonts import BatchBuilder, DoubleFont, SpecimenRenderer
+from double_fonts.BatchBuilder import LAYOUTS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build a double font with and without its overlaps'
+        + ' removed, and report the points and bytes saved, and how much'
+        + ' quicker its specimens render.'
+    )
+    parser.add_argument('font1')
+    parser.add_argument('font2')
+    parser.add_argument('output_dir')
+    parser.add_argument('--layout', choices=LAYOUTS, default='superimpose')
+    parser.add_argument(
+        '--char-map', default=None, help='A JSON file with the char map.'
+    )
+    parser.add_argument('--texts', nargs='+', default=None)
+    parser.add_argument('--sizes', nargs='+', type=int, default=None)
+    parser.add_argument(
+        '--rounds',
+        type=int,
+        default=5,
+        help='How many times to render the specimens, for steadier times.',
+    )
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    char_map = None
+    if args.char_map:
+        with open(args.char_map, encoding='utf-8') as fin:
+            char_map = json.load(fin)
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_paths = {}
+    for remove_overlaps in [False, True]:
+        output_path = os.path.join(
+            args.output_dir,
+            'merged.ttf' if remove_overlaps else 'overlapping.ttf',
+        )
+        stats = DoubleFont(
+            BatchBuilder.get_font(args.font1),
+            BatchBuilder.get_font(args.font2),
+            layout=LAYOUTS[args.layout](),
+            char_map=char_map,
+            remove_overlaps=remove_overlaps,
+        ).build(output_path, jobs=args.jobs, incremental=False)
+        output_paths[output_path] = stats
+
+    # Specimens are rendered in one process, so that render times are not
+    # shared with other renders, after a first round that loads the fonts.
+    render_times = dict.fromkeys(output_paths, 0)
+    renderer = SpecimenRenderer(args.output_dir, jobs=1)
+    renderer.render_all(list(output_paths), args.texts, args.sizes)
+    for _ in range(args.rounds):
+        report = renderer.render_all(
+            list(output_paths), args.texts, args.sizes
+        )
+        for font_path, font_stats in report['fonts'].items():
+            render_times[font_path] += font_stats['render_time']
+
+    for output_path, stats in output_paths.items():
+        print(
+            f"{output_path:<60}"
+            + f"{os.path.getsize(output_path) / 1_000:10,.0f}KB"
+            + f"{render_times[output_path]:10.3f}s"
+        )
+    overlapping_time, merged_time = render_times.values()
+    stats = output_paths[os.path.join(args.output_dir, 'merged.ttf')]
+    print(
+        f"Merged {stats['n_merged_glyphs']:,} of {stats['n_glyphs']:,}"
+        + f" glyphs, saving {stats['n_saved_points']:,} points"
+        + f" and {stats['n_saved_bytes']:,} bytes"
+        + f" ({stats['n_failed_glyphs']:,} could not be merged)"
+    )
+    print(
+        'Specimens render'
+        + f" {(overlapping_time / (merged_time or 1) - 1) * 100:+.1f}%"
+        + ' quicker with overlaps removed'
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+
+from double_fonts import SpecimenRenderer
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Render PNG specimens of fonts, for each text and size,'
+        + ' and report how quickly each font renders.'
+    )
+    parser.add_argument('output_dir')
+    parser.add_argument('font_paths', nargs='+')
+    parser.add_argument('--texts', nargs='+', default=None)
+    parser.add_argument(
+        '--text-file',
+        default=None,
+        help='A file with a text on each line, instead of --texts.',
+    )
+    parser.add_argument('--sizes', nargs='+', type=int, default=None)
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    texts = args.texts
+    if args.text_file:
+        with open(args.text_file, encoding='utf-8') as fin:
+            texts = [line.strip() for line in fin if line.strip()]
+
+    report = SpecimenRenderer(args.output_dir, jobs=args.jobs).render_all(
+        args.font_paths, texts, args.sizes
+    )
+    for font_path, stats in report['fonts'].items():
+        print(
+            f"{font_path:<60}"
+            + f"{stats['specimens_per_s']:10,.1f} specimens/s"
+            + f"{stats['chars_per_s']:12,.0f} chars/s"
+        )
+    print(
+        f"Rendered {report['n_specimens']} specimens"
+        + f" in {report['total_time']:.2f}s with {report['jobs']} jobs"
+        + f" ({report['layout_engine']} layout)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import json
+
+from double_fonts import Benchmark
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark each composition mode, and save the results'
+        + ' as JSON.'
+    )
+    parser.add_argument('names', nargs='*', help='cases to run (default: all)')
+    parser.add_argument('--output-dir', default='build/benchmarks')
+    parser.add_argument(
+        '--synthetic-sizes', type=int, nargs='*', default=None
+    )
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument(
+        '--compare-memory-map',
+        action='store_true',
+        help='also build with sources read into memory, and report the'
+        + ' peak RSS reduction of memory mapping them',
+    )
+    parser.add_argument(
+        '--compare', default=None, help='a previous run\'s JSON file'
+    )
+    args = parser.parse_args()
+
+    report = Benchmark(
+        output_dir=args.output_dir,
+        synthetic_sizes=args.synthetic_sizes,
+        repeats=args.repeats,
+        jobs=args.jobs,
+        compare_memory_map=args.compare_memory_map,
+    ).run(args.names)
+    for result in report['results']:
+        peak_rss = result['peak_rss']
+        print(
+            f"{result['name']:<36}{result['n_glyphs']:8,} glyphs"
+            + f"{result['time']:8.2f}s{result['glyphs_per_s']:10,.0f} glyphs/s"
+            + (f"{peak_rss / 1_000_000:8,.0f}MB RSS" if peak_rss else '')
+            + f"{result['size'] / 1_000:10,.0f}KB"
+            + (
+                f"{-result['peak_rss_reduction']:+8.1%} RSS"
+                + f"{-result['rss_anon_reduction']:+8.1%} private RSS"
+                + ' with mmap'
+                if 'rss_anon_reduction' in result
+                else ''
+            )
+            + f"{result['rebuild_time']:8.2f}s rebuild"
+            + (
+                f" ({result['n_recomposed_glyphs']:,} glyphs recomposed)"
+                if result['n_recomposed_glyphs']
+                else ''
+            )
+        )
+    print(f"Saved {report['path']}")
+
+    if args.compare:
+        with open(args.compare) as fin:
+            previous_report = json.load(fin)
+        for name, dt, previous_dt, speedup in Benchmark.compare(
+            report, previous_report
+        ):
+            print(f'{name:<36}{previous_dt:8.2f}s ->{dt:8.2f}s{speedup:8.2f}x')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+import os
+
+from double_fonts import FontCache, FontCatalog, FontService
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve WOFF2 double fonts for the characters of a text,'
+        + ' e.g. /font?font1=Noto+Sans&font2=Noto+Sans+Sinhala&text=abc'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument(
+        '--cache-dir',
+        default=os.path.join(
+            os.path.expanduser('~'), '.cache', 'double_fonts', 'service'
+        ),
+    )
+    parser.add_argument('--memory-mb', type=float, default=64)
+    parser.add_argument('--disk-mb', type=float, default=1_000)
+    parser.add_argument('--font-dirs', nargs='+', default=None)
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    cache = FontCache(
+        args.cache_dir,
+        max_memory_size=int(args.memory_mb * 1_000_000),
+        max_disk_size=int(args.disk_mb * 1_000_000),
+    )
+    service = FontService(
+        cache, catalog=FontCatalog(args.font_dirs), jobs=args.jobs
+    )
+    print(f'Serving on http://{args.host}:{args.port}')
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+
+from double_fonts import BatchBuilder, Coverage, DoubleFont, FontService
+from double_fonts.BatchBuilder import LAYOUTS
+
+
+def parse_grid(layout: str, params: list) -> dict:
+    # e.g. ['secondary_scale=0.6,0.7'], typed like the layout's defaults.
+    grid = {}
+    for param in params:
+        name, _, values = param.partition('=')
+        grid[name] = [
+            FontService.parse_layout_params(layout, {name: value})[name]
+            for value in values.split(',')
+        ]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build a double font for each point of a grid of layout'
+        + ' parameters, from one decode of the fonts.'
+    )
+    parser.add_argument('font1')
+    parser.add_argument('font2')
+    parser.add_argument('output_dir')
+    parser.add_argument('--layout', choices=LAYOUTS, default='stack')
+    parser.add_argument(
+        '--param',
+        action='append',
+        default=[],
+        help='NAME=VALUE,VALUE,... to sweep, e.g.'
+        + ' vertical_spacing_ratio=0,0.05,0.1; may be repeated.',
+    )
+    parser.add_argument(
+        '--set',
+        action='append',
+        default=[],
+        help='NAME=VALUE, a fixed layout parameter; may be repeated.',
+    )
+    parser.add_argument(
+        '--char-map', default=None, help='A JSON file with the char map.'
+    )
+    parser.add_argument('--family-name', default=None)
+    parser.add_argument(
+        '--text',
+        default=None,
+        help='Subset the variants to this text, and render a specimen of it.',
+    )
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+
+    char_map = None
+    if args.char_map:
+        with open(args.char_map, encoding='utf-8') as fin:
+            char_map = json.load(fin)
+    layout_params = FontService.parse_layout_params(
+        args.layout, dict(param.partition('=')[::2] for param in args.set)
+    )
+    report = DoubleFont(
+        BatchBuilder.get_font(args.font1),
+        BatchBuilder.get_font(args.font2),
+        layout=LAYOUTS[args.layout](**layout_params),
+        char_map=char_map,
+        family_name=args.family_name,
+    ).sweep(
+        args.output_dir,
+        parse_grid(args.layout, args.param),
+        jobs=args.jobs,
+        coverage=Coverage(text=args.text) if args.text else None,
+        specimen_texts=[args.text] if args.text else None,
+    )
+    for result in report['variants']:
+        print(
+            f"{result['output_path']:<72}"
+            + f"{result['stats']['n_glyphs']:8,} glyphs"
+        )
+    print(
+        f"Built {report['n_variants']} variants"
+        + f" in {report['build_time']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()